@@ -0,0 +1,585 @@
+"""
+InnoAisle analysis pipeline: footfall model, heat zones, forecast and layout suggestions
+"""
+
+import io
+from datetime import datetime
+
+import pandas as pd
+import numpy as np
+
+import footfall_engines
+from feature_encoding import default_encoding, encode_features, features_nbytes
+from forecasting import ForecastCache, fit_prophet, forecast_options, training_history, zone_forecasts
+from zone_analytics import detailed_zone_suggestions, rearrangement_suggestions
+
+# Parameters that shape the analysis output; part of the result cache key
+MODEL_PARAMS = {
+    'random_forest': {'n_estimators': 100, 'max_depth': 10, 'min_samples_split': 5, 'random_state': 42},
+    'hist_gradient_boosting': {'max_iter': 200, 'learning_rate': 0.1, 'max_leaf_nodes': 31,
+                               'early_stopping': False, 'random_state': 42},
+    'test_size': 0.2,
+    'prophet': {'yearly_seasonality': True, 'daily_seasonality': True},
+    'forecast_hours': 168,
+}
+
+
+# Columns every upload and ingested row needs for the full analysis
+REQUIRED_COLUMNS = ['timestamp', 'zone_id', 'footfall', 'zone_temp', 'sales_volume', 'phase', 'product_category',
+                    'day_of_week']
+
+REFRIGERATION_ZONES = ['Z1', 'Z2']
+# Footfall above which a refrigeration zone accrues a proximity penalty
+PENALTY_FOOTFALL_THRESHOLD = 60
+
+# Predicted footfall above which a reading counts towards a zone's heat probability
+HEAT_FOOTFALL_THRESHOLD = 60
+# Zones whose heat probability exceeds this get cooling suggestions
+HEAT_ZONE_PROBABILITY = 0.5
+
+# Cooling simulation for predicted heat zones
+BASE_COOLING_ENERGY = 50
+COOLING_FACTOR = 1.5
+# Energy added per unit of zone traffic score in the simulated energy usage
+ENERGY_FACTOR = 0.1
+
+# Prophet forecasts shared by requests whose fitted model and forecast range match
+forecast_cache = ForecastCache()
+
+# Pipeline stages in execution order, reported through the progress callback
+STAGES = ['parse', 'features', 'random_forest', 'heat_zones', 'rearrangement', 'prophet', 'zone_forecasts', 'layout', 'summary']
+
+
+def _report(progress, stage):
+    if progress is not None:
+        progress(stage)
+
+
+def _annotate(progress, **sizes):
+    # Input sizes for progress callbacks that record them (see instrumentation.StageRecorder)
+    annotate = getattr(progress, 'annotate', None)
+    if annotate is not None:
+        annotate(**sizes)
+
+
+def warm_up(log=print, fit=True):
+    """Import the model libraries and run tiny fits so the first request pays no start-up cost.
+
+    With fit=False only the imports are done (e.g. in a pre-fork server
+    master, so that workers share the loaded modules). Returns {phase: seconds}.
+    """
+    import logging
+    import time
+
+    phases = {}
+
+    def phase(name, fn):
+        started = time.perf_counter()
+        fn()
+        phases[name] = time.perf_counter() - started
+        log('[startup] warm-up %s: %.2fs' % (name, phases[name]))
+
+    def import_sklearn():
+        from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor  # noqa: F401
+        from sklearn.metrics import mean_squared_error, r2_score  # noqa: F401
+        from sklearn.model_selection import train_test_split  # noqa: F401
+
+    def import_prophet():
+        from prophet import Prophet  # noqa: F401
+
+    def fit_models():
+        from prophet import Prophet
+        from sklearn.ensemble import RandomForestRegressor
+
+        rng = np.random.default_rng(0)
+        RandomForestRegressor(n_estimators=2, max_depth=2).fit(rng.random((20, 3)), rng.random(20))
+        # The first Prophet fit loads the Stan backend
+        logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+        history = pd.DataFrame({'ds': pd.date_range('2024-01-01', periods=48, freq='h'), 'y': rng.random(48)})
+        Prophet(daily_seasonality=False, weekly_seasonality=False, yearly_seasonality=False).fit(history)
+
+    phase('sklearn_import', import_sklearn)
+    phase('prophet_import', import_prophet)
+    if fit:
+        phase('model_fit', fit_models)
+    return phases
+
+
+def check_columns(df):
+    """Raise ValueError naming the REQUIRED_COLUMNS missing from `df`"""
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError('Missing required columns: %s' % ', '.join(missing))
+    return df
+
+
+def load_csv(file):
+    df = pd.read_csv(file)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df.sort_values('timestamp')
+
+
+def proximity_penalty(zone_id, footfall):
+    """Per-row penalty for crowded refrigeration zones"""
+    is_refrigeration = zone_id.isin(REFRIGERATION_ZONES)
+    return np.where(is_refrigeration & (footfall > PENALTY_FOOTFALL_THRESHOLD), footfall * 2, 0)
+
+
+def compute_aggregates(df):
+    """Per-zone and hourly aggregates used by the rearrangement, forecast and layout stages.
+
+    The ingestion store builds the same structure from its rollups, so
+    analyze() never needs the full row history for these.
+    """
+    df = df[['timestamp', 'zone_id', 'footfall', 'zone_temp', 'product_category']].copy()
+    df['proximity_penalty'] = proximity_penalty(df['zone_id'], df['footfall'])
+    zone_traffic = df.groupby('zone_id')['footfall'].mean().reset_index()
+    zone_traffic.columns = ['zone', 'traffic_score']
+    total_penalty = df.groupby('zone_id')['proximity_penalty'].sum().reset_index()
+    total_penalty = total_penalty.rename(columns={'zone_id': 'zone'})
+    zone_traffic = zone_traffic.merge(total_penalty, on='zone', how='left').fillna(0)
+
+    # Group by hour and sum only the numeric column, not datetime
+    hourly_footfall = df[['timestamp', 'footfall']].rename(columns={'timestamp': 'ds', 'footfall': 'y'})
+    hourly_footfall['ds'] = hourly_footfall['ds'].dt.floor('h')
+    zone_hourly_footfall = hourly_footfall.assign(zone_id=df['zone_id'])
+    zone_hourly_footfall = zone_hourly_footfall.groupby(['zone_id', 'ds'], observed=True)['y'].sum().reset_index()
+    hourly_footfall = hourly_footfall.groupby('ds')['y'].sum().reset_index()
+
+    # Products per zone, most frequent first (ties broken by name, like Series.mode)
+    product_counts = df.groupby(['zone_id', 'product_category']).size().reset_index(name='count')
+    product_counts = product_counts.sort_values(['zone_id', 'count', 'product_category'], ascending=[True, False, True])
+    zone_products = product_counts.groupby('zone_id')['product_category'].agg(list).to_dict()
+
+    # Identify high-traffic times for Zone Z4
+    z4_data = df[df['zone_id'] == 'Z4'].copy()
+    z4_data['hour'] = z4_data['timestamp'].dt.hour
+    high_traffic_times = z4_data[z4_data['footfall'] > z4_data['footfall'].mean()]['hour'].value_counts().head(3).index.tolist()
+
+    return {
+        'zones': list(df['zone_id'].unique()),
+        'zone_traffic': zone_traffic,
+        'hourly_footfall': hourly_footfall,
+        'zone_hourly_footfall': zone_hourly_footfall,
+        'zone_products': zone_products,
+        'zone_temp_mean': df.groupby('zone_id')['zone_temp'].mean().to_dict(),
+        'z4_high_traffic_hours': high_traffic_times,
+    }
+
+
+def run_analysis(df, progress=None, models=None, aggregates=None, options=None, outputs=None):
+    result, _ = analyze(df, progress, models, aggregates, options, outputs)
+    return result
+
+
+# --- Pipeline stages ---
+# Each stage reads the request context (df, aggregates, options, models and
+# the results of the stages it depends on) and returns a dict; result keys
+# are copied from these dicts, internal values stay in the context.
+
+def _aggregates_stage(ctx):
+    aggregates = ctx['given_aggregates']
+    if aggregates is None:
+        aggregates = compute_aggregates(ctx['df'])
+    _annotate(ctx['progress'], zones=len(aggregates['zones']))
+    return {'aggregates': aggregates}
+
+
+def add_time_features(df):
+    """Hour, day of month and month columns of the footfall model, added in place"""
+    df['hour'] = df['timestamp'].dt.hour
+    df['day'] = df['timestamp'].dt.day
+    df['month'] = df['timestamp'].dt.month
+    return df
+
+
+def _features_stage(ctx):
+    df = add_time_features(ctx['df'])
+
+    # Encode categorical features as the registered model expects, or as requested when training
+    models = ctx['models']
+    if ctx['scoring']:
+        features = encode_features(df, models.get('encoding', 'dense'), models.get('vocabulary'),
+                                   models['feature_columns'])
+    else:
+        engine = ctx['options'].get('engine', footfall_engines.DEFAULT_ENGINE)
+        features = encode_features(df, ctx['options'].get('encoding') or default_encoding(engine, df))
+    _annotate(ctx['progress'], rows=len(df), features=len(features['feature_columns']),
+              feature_bytes=features_nbytes(features['X']))
+    return features
+
+
+def _footfall_model_stage(ctx):
+    from sklearn.metrics import mean_squared_error, r2_score
+    from sklearn.model_selection import train_test_split
+
+    features = ctx['features']
+    X, y, categories = features['X'], features['y'], features['categories']
+    models = ctx['models']
+    if ctx['scoring'] and not ctx['update']:
+        # Score every uploaded row with the registered model
+        X_test, y_test, categories_test = X, y, categories
+        y_pred = models['footfall'].predict(X_test)
+    else:
+        # Train-test split; every engine and mode is evaluated on the same held-out rows
+        X_train, X_test, y_train, y_test, _, categories_test = train_test_split(
+            X, y, categories, test_size=MODEL_PARAMS['test_size'], random_state=42
+        )
+
+        if ctx['update']:
+            # Warm start: only the new rows' training split reaches the registered model
+            engine = models.get('engine', 'random_forest')
+            model = footfall_engines.update(engine, MODEL_PARAMS[engine], models['footfall'], X_train, y_train,
+                                            features['categorical'])
+            ctx['models'] = dict(models, footfall=model)
+        else:
+            engine = ctx['options'].get('engine', footfall_engines.DEFAULT_ENGINE)
+            model = footfall_engines.fit(engine, MODEL_PARAMS[engine], X_train, y_train, features['categorical'])
+            models.update({
+                'footfall': model,
+                'feature_columns': features['feature_columns'],
+                'engine': engine,
+                'encoding': features['encoding'],
+                'vocabulary': features['vocabulary'],
+            })
+
+        # Make predictions
+        y_pred = model.predict(X_test)
+
+    # Evaluate
+    rmse = mean_squared_error(y_test, y_pred) ** 0.5
+    r2 = r2_score(y_test, y_pred)
+    return {'categories_test': categories_test, 'y_pred': y_pred, 'rmse': rmse, 'r2_score': r2}
+
+
+def _heat_zones_stage(ctx):
+    model_stage = ctx['footfall_model']
+    # Predictions next to the original categorical columns of the same rows
+    X_test_copy = pd.DataFrame({
+        'zone': model_stage['categories_test']['zone_id'].astype(str).to_numpy(),
+        'predicted_footfall': model_stage['y_pred'],
+    })
+
+    # Aggregate average predicted footfall per zone
+    zone_summary = X_test_copy.groupby('zone')['predicted_footfall'].mean().reset_index()
+
+    # Simulate heat zones
+    threshold_heat = HEAT_FOOTFALL_THRESHOLD
+    X_test_copy['is_heat_zone'] = X_test_copy['predicted_footfall'] > threshold_heat
+    heat_zone_summary = X_test_copy.groupby('zone')['is_heat_zone'].mean().reset_index()
+    heat_zone_summary['heat_zone_probability'] = heat_zone_summary['is_heat_zone']
+    heat_zone_summary = heat_zone_summary.drop(columns=['is_heat_zone'])
+
+    # Simulate cooling adjustment
+    X_test_copy['cooling_energy'] = BASE_COOLING_ENERGY + (X_test_copy['is_heat_zone'].astype(int) * COOLING_FACTOR)
+    cooling_summary = X_test_copy.groupby('zone')['cooling_energy'].mean().reset_index()
+
+    # Merge summaries for suggestions
+    suggested_changes = zone_summary.merge(heat_zone_summary, on='zone').merge(cooling_summary, on='zone')
+    suggested_changes = suggested_changes[suggested_changes['heat_zone_probability'] > HEAT_ZONE_PROBABILITY]
+    return {
+        'suggested_changes': suggested_changes,
+        'zone_summary': zone_summary.to_dict('records'),
+        'heat_zone_summary': heat_zone_summary.to_dict('records'),
+        'cooling_summary': cooling_summary.to_dict('records'),
+    }
+
+
+def _layout_suggestions_stage(ctx):
+    aggregates = ctx['aggregates']['aggregates']
+    suggested_changes = ctx['heat_zones']['suggested_changes']
+    high_traffic_times = aggregates['z4_high_traffic_hours']
+
+    # Detailed suggestions for Zone Z4
+    layout_suggestions = []
+    if not suggested_changes.empty:
+        for _, row in suggested_changes[suggested_changes['zone'] == 'Z4'].iterrows():
+            z4_products = aggregates['zone_products'].get('Z4', [])
+            shiftable_products = [prod for prod in z4_products if prod not in ['Dairy', 'Frozen']]
+            avg_temp_z4 = aggregates['zone_temp_mean'].get('Z4')
+            layout_suggestions.append({
+                'zone': row['zone'],
+                'predicted_footfall': row['predicted_footfall'],
+                'heat_zone_probability': row['heat_zone_probability'],
+                'cooling_energy': row['cooling_energy'],
+                'high_traffic_times': high_traffic_times,
+                'shiftable_products': shiftable_products,
+                'cooling_cycle': {
+                    'start_hour': min(high_traffic_times) if high_traffic_times else None,
+                    'end_hour': (max(high_traffic_times) + 1) if high_traffic_times else None,
+                    'temp_threshold': avg_temp_z4,
+                    'increase': COOLING_FACTOR,
+                    'base': BASE_COOLING_ENERGY
+                }
+            })
+    else:
+        layout_suggestions = [{'message': 'No zones currently identified as high heat zones. Layout appears efficient.'}]
+    return {'layout_suggestions': layout_suggestions}
+
+
+def _rearrangement_stage(ctx):
+    aggregates = ctx['aggregates']['aggregates']
+    # Rearrangement logic (proximity penalty), preferring nearby targets on the blueprint
+    positions = {zone: (layout['x'] + layout['width'] / 2, layout['y'] + layout['height'] / 2)
+                 for zone, layout in ctx['blueprint']['blueprint_layout'].items()}
+    suggested_arrangements, unassigned = rearrangement_suggestions(aggregates['zone_traffic'], aggregates['zone_products'],
+                                                                   REFRIGERATION_ZONES, positions)
+    return {'rearrangement_suggestions': suggested_arrangements, 'unassigned_rearrangements': unassigned}
+
+
+def _prophet_stage(ctx):
+    # Prophet is fitted on footfall summed per hour across zones
+    df_prophet = ctx['aggregates']['aggregates']['hourly_footfall']
+    forecast = ctx['options'].get('forecast') or forecast_options()
+    models = ctx['models']
+
+    if ctx['scoring'] and not (ctx['update'] and forecast['warm_start']):
+        # Forecast the 168 hours after the uploaded data with the registered model
+        model = models['prophet']
+    else:
+        # Train Prophet model, from the registered model's parameters when warm-starting
+        history = training_history(df_prophet, forecast['window_days'], forecast['downsample'])
+        _annotate(ctx['progress'], history_hours=len(history))
+        init = models.get('prophet') if ctx['scoring'] else ctx['prophet_init']
+        model, _ = fit_prophet(history, MODEL_PARAMS['prophet'], forecast['intervals'],
+                               init if forecast['warm_start'] else None)
+        if ctx['scoring']:
+            # Updates return a copy; the registry may be serving the original to other requests
+            ctx['models'] = dict(models, prophet=model)
+        else:
+            models['prophet'] = model
+
+    # Forecast next 7 days (168 hours), for the frontend
+    start = df_prophet['ds'].max() + pd.Timedelta(hours=1)
+    return {'prophet_forecast': forecast_cache.forecast(model, start, MODEL_PARAMS['forecast_hours'])}
+
+
+def _zone_forecasts_stage(ctx):
+    return {'zone_forecasts': zone_forecasts(
+        ctx['aggregates']['aggregates']['zone_hourly_footfall'], MODEL_PARAMS['forecast_hours'], MODEL_PARAMS['prophet'],
+        forecast=ctx['options'].get('forecast'),
+    )}
+
+
+# --- Sample Walmart-style blueprint mapping ---
+SAMPLE_BLUEPRINT_LAYOUT = {
+    "Dairy":            {"x": 20,  "y": 40,  "width": 80,  "height": 40,  "color": "green",  "isRefrigeration": True},
+    "Meat":             {"x": 20,  "y": 90,  "width": 80,  "height": 40,  "color": "green",  "isRefrigeration": True},
+    "Produce":          {"x": 20,  "y": 140, "width": 80,  "height": 40,  "color": "green"},
+    "Bakery":           {"x": 20,  "y": 190, "width": 80,  "height": 40,  "color": "green"},
+    "Grocery":          {"x": 110, "y": 40,  "width": 80,  "height": 190, "color": "green"},
+    "Electronics":      {"x": 200, "y": 40,  "width": 100, "height": 60,  "color": "blue"},
+    "Shoes":            {"x": 310, "y": 40,  "width": 80,  "height": 60,  "color": "blue"},
+    "Pharmacy":         {"x": 110, "y": 240, "width": 80,  "height": 40,  "color": "blue"},
+    "Health & Beauty":  {"x": 200, "y": 240, "width": 80,  "height": 40,  "color": "blue"},
+    "Customer Service": {"x": 290, "y": 240, "width": 80,  "height": 40,  "color": "yellow"},
+    "Checkouts":        {"x": 20,  "y": 290, "width": 350, "height": 30,  "color": "gray"},
+}
+
+
+def _blueprint_stage(ctx):
+    aggregates = ctx['aggregates']['aggregates']
+    # --- Generate blueprint_layout using sample mapping ---
+    unique_zones = aggregates['zones']
+    zone_categories = {zone: products[0] if products else '' for zone, products in aggregates['zone_products'].items()}
+    grid_cols = 4
+    grid_spacing_x = 150
+    grid_spacing_y = 120
+    default_width = 120
+    default_height = 80
+    blueprint_layout = {}
+    for idx, zone_id in enumerate(sorted(unique_zones)):
+        # Try to use product_category as the mapping key
+        product_cat = zone_categories.get(zone_id, '').title()
+        mapping = SAMPLE_BLUEPRINT_LAYOUT.get(product_cat)
+        if mapping:
+            layout = dict(mapping)
+            layout['zone_id'] = zone_id
+            layout['product_category'] = product_cat
+        else:
+            # Fallback to grid
+            row = idx // grid_cols
+            col = idx % grid_cols
+            x = 50 + col * grid_spacing_x
+            y = 100 + row * grid_spacing_y
+            layout = {
+                'zone_id': zone_id,
+                'x': x,
+                'y': y,
+                'width': default_width,
+                'height': default_height,
+                'isRefrigeration': False,
+                'product_category': product_cat,
+                'color': 'gray'
+            }
+        blueprint_layout[zone_id] = layout
+    return {'blueprint_layout': blueprint_layout}
+
+
+def _layout_moves_stage(ctx):
+    blueprint_layout = ctx['blueprint']['blueprint_layout']
+    suggested_arrangements = ctx['rearrangement']['rearrangement_suggestions']
+    # --- Generate suggested layout and moves based on rearrangement suggestions ---
+    suggested_layout = blueprint_layout.copy()
+    moves = []
+    # Only process if there are rearrangement suggestions
+    if suggested_arrangements:
+        # Make a mutable copy
+        suggested_layout = {k: dict(v) for k, v in blueprint_layout.items()}
+        # For each suggestion, move the 'from_zone' to the position of 'to_zone'
+        for suggestion in suggested_arrangements:
+            from_zone = suggestion['from_zone']
+            to_zone = suggestion['to_zone']
+            # Find the target zone's position
+            if to_zone in blueprint_layout:
+                to_pos = (blueprint_layout[to_zone]['x'], blueprint_layout[to_zone]['y'])
+            else:
+                # If not found, skip
+                continue
+            from_pos = (blueprint_layout[from_zone]['x'], blueprint_layout[from_zone]['y'])
+            # Move the from_zone to the to_zone's position
+            suggested_layout[from_zone]['x'] = to_pos[0]
+            suggested_layout[from_zone]['y'] = to_pos[1]
+            moves.append({
+                'zone_id': from_zone,
+                'from_x': from_pos[0],
+                'from_y': from_pos[1],
+                'to_x': to_pos[0],
+                'to_y': to_pos[1]
+            })
+    return {'suggested_layout': suggested_layout, 'layout_moves': moves}
+
+
+def _zone_traffic_stage(ctx):
+    zone_traffic = ctx['aggregates']['aggregates']['zone_traffic']
+    # Simulated validation - use actual footfall instead of predicted_footfall
+    simulated_energy = BASE_COOLING_ENERGY + (zone_traffic['traffic_score'] * ENERGY_FACTOR)
+    return {
+        'zone_traffic_forecast': zone_traffic.to_dict(orient='records'),
+        'simulated_energy_usage': float(simulated_energy.sum()),
+    }
+
+
+def _detailed_suggestions_stage(ctx):
+    aggregates = ctx['aggregates']['aggregates']
+    # Cooling and layout suggestions (collect as list of dicts for frontend)
+    return {'detailed_zone_suggestions': detailed_zone_suggestions(
+        aggregates['zones'], aggregates['zone_traffic'], REFRIGERATION_ZONES
+    )}
+
+
+# name -> (progress stage reported when it starts, dependencies, function).
+# Stages run in this order, so progress always moves forward through STAGES.
+PIPELINE = {
+    'aggregates': (None, [], _aggregates_stage),
+    'features': ('features', [], _features_stage),
+    'footfall_model': ('random_forest', ['features'], _footfall_model_stage),
+    'heat_zones': ('heat_zones', ['footfall_model'], _heat_zones_stage),
+    'layout_suggestions': ('heat_zones', ['heat_zones', 'aggregates'], _layout_suggestions_stage),
+    # The blueprint is cheap and has no progress stage of its own: rearrangement needs its positions
+    'blueprint': (None, ['aggregates'], _blueprint_stage),
+    'rearrangement': ('rearrangement', ['aggregates', 'blueprint'], _rearrangement_stage),
+    'prophet': ('prophet', ['aggregates'], _prophet_stage),
+    'zone_forecasts': ('zone_forecasts', ['aggregates'], _zone_forecasts_stage),
+    'layout_moves': ('layout', ['blueprint', 'rearrangement'], _layout_moves_stage),
+    'zone_traffic': ('summary', ['aggregates'], _zone_traffic_stage),
+    'detailed_suggestions': ('summary', ['aggregates'], _detailed_suggestions_stage),
+}
+
+# Result key -> the stage that produces it, in response order
+OUTPUTS = {
+    'rmse': 'footfall_model',
+    'r2_score': 'footfall_model',
+    'zone_summary': 'heat_zones',
+    'heat_zone_summary': 'heat_zones',
+    'cooling_summary': 'heat_zones',
+    'layout_suggestions': 'layout_suggestions',
+    'rearrangement_suggestions': 'rearrangement',
+    'unassigned_rearrangements': 'rearrangement',
+    'prophet_forecast': 'prophet',
+    'blueprint_layout': 'blueprint',
+    'suggested_layout': 'layout_moves',
+    'layout_moves': 'layout_moves',
+    'zone_forecasts': 'zone_forecasts',
+    'zone_traffic_forecast': 'zone_traffic',
+    'simulated_energy_usage': 'zone_traffic',
+    'detailed_zone_suggestions': 'detailed_suggestions',
+}
+# Outputs that are only computed when asked for explicitly (or switched on in options)
+OPTIONAL_OUTPUTS = ['zone_forecasts']
+
+
+def required_stages(outputs):
+    """The stages needed for `outputs`, dependencies included, in execution order"""
+    needed = set()
+    pending = [OUTPUTS[name] for name in outputs]
+    while pending:
+        stage = pending.pop()
+        if stage not in needed:
+            needed.add(stage)
+            pending.extend(PIPELINE[stage][1])
+    return [stage for stage in PIPELINE if stage in needed]
+
+
+def analyze(df, progress=None, models=None, aggregates=None, options=None, outputs=None, update=False,
+            prophet_init=None):
+    """Run the analysis and return (result, models).
+
+    When `models` comes from the model registry the footfall regressor and
+    Prophet are only used for inference, unless `update` is set: then the
+    footfall regressor is warm-started on `df` and the updated copy returned.
+    Otherwise the models this request fits are returned so the caller can
+    register them; {'engine': ..., 'encoding': ...} in `options` pick the
+    footfall engine and feature encoding. `aggregates` (see
+    compute_aggregates) defaults to being computed from `df`. `options`
+    switches optional outputs on: {'zone_forecasts': True} adds per-zone
+    Prophet forecasts, and its 'forecast' entry (see
+    forecasting.forecast_options) sets Prophet's history window, downsampling
+    and fit. With its warm_start, updates refit Prophet from the registered
+    model and new fits start from `prophet_init`. `outputs` limits the result
+    to these OUTPUTS keys; only the stages they depend on run.
+    """
+    options = options or {}
+    if outputs is None:
+        outputs = [name for name in OUTPUTS if name not in OPTIONAL_OUTPUTS or options.get(name)]
+    unknown = [name for name in outputs if name not in OUTPUTS]
+    if unknown:
+        raise ValueError('Unknown outputs: %s' % ', '.join(unknown))
+
+    ctx = {
+        'df': df,
+        'given_aggregates': aggregates,
+        'options': options,
+        'progress': progress,
+        'scoring': models is not None,
+        'update': update,
+        'models': models if models is not None else {},
+        'prophet_init': prophet_init,
+    }
+    reported = None
+    for stage in required_stages(outputs):
+        progress_stage, _, run = PIPELINE[stage]
+        if progress_stage is not None and progress_stage != reported:
+            _report(progress, progress_stage)
+            reported = progress_stage
+        ctx[stage] = run(ctx)
+    if reported != 'summary':
+        _report(progress, 'summary')
+
+    result = {'timestamp': datetime.now().isoformat()}
+    for name in OUTPUTS:
+        if name in outputs:
+            result[name] = ctx[OUTPUTS[name]][name]
+    return result, ctx['models']
+
+
+def analyze_bytes(data, progress=None, options=None, outputs=None):
+    """Run the analysis (all outputs by default) on raw CSV upload bytes"""
+    _report(progress, 'parse')
+    return run_analysis(load_csv(io.BytesIO(data)), progress, options=options, outputs=outputs)
+
+
+def analyze_file(path, progress=None, options=None):
+    """Run the full analysis on a CSV file on disk"""
+    _report(progress, 'parse')
+    return run_analysis(load_csv(path), progress, options=options)
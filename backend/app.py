@@ -1,372 +1,492 @@
-from flask import Flask, request, jsonify
-import pandas as pd
-import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, r2_score
-from sklearn.model_selection import train_test_split
+import time
+
+_STARTED = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import traceback
-from datetime import datetime
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
 
-# --- Prophet Forecast Section ---
-from prophet import Prophet
+import batch
+from analysis import (MODEL_PARAMS, OUTPUTS, STAGES, analyze, analyze_bytes, check_columns, load_csv, run_analysis,
+                      warm_up)
+from csv_stream import SAMPLE_ROWS, TIMESTAMP_FORMAT, HashingReader, stream_csv
+from evaluation import cross_validate, validate_models
+from feature_encoding import validate_encoding
+from footfall_engines import DEFAULT_ENGINE, pool_worker_init, validate_engine
+from forecasting import forecast_options, set_zone_executor
+from ingest_store import IngestStore
+from instrumentation import DeadlineExceeded, MetricsRegistry, StageRecorder, server_timing
+from jobs import JobManager
+from live import HEARTBEAT_SECONDS, LiveHub, parse_readings, server_sent_event
+from model_registry import ModelRegistry, validate_store_id
+from response_encoding import (
+    MIMETYPES, NotAcceptable, columnar, compress, encode, negotiate_encoding, negotiate_format, select_fields,
+)
+from result_cache import ResultCache, content_key
+from simulation import LayoutSimulator, build_profile
 
 app = Flask(__name__)
 CORS(app)
 
+# 'development' (python app.py: debugger and auto-reload) or 'production' (gunicorn, see gunicorn.conf.py)
+ENV = os.environ.get('INNOAISLE_ENV', 'development')
+DEBUG = ENV == 'development'
+# Seconds a /predict request may run; checked as each pipeline stage starts (0 = no limit)
+REQUEST_TIMEOUT = float(os.environ.get('INNOAISLE_REQUEST_TIMEOUT', 300))
+
+_CACHE_DIR = os.environ.get('INNOAISLE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+result_cache = ResultCache(
+    memory_items=int(os.environ.get('INNOAISLE_CACHE_MEMORY_ITEMS', 32)),
+    disk_dir=os.path.join(_CACHE_DIR, 'results') if os.environ.get('INNOAISLE_CACHE_DISK', '1') != '0' else None,
+    disk_max_bytes=int(os.environ.get('INNOAISLE_CACHE_DISK_MB', 512)) * 1024 * 1024,
+)
+
+model_registry = ModelRegistry(os.environ.get('INNOAISLE_MODEL_DIR', os.path.join(_CACHE_DIR, 'models')))
+# Registered models older than this are retrained on the next score request (0 = never)
+MODEL_MAX_AGE_HOURS = float(os.environ.get('INNOAISLE_MODEL_MAX_AGE_HOURS', 0))
+MODEL_KEEP_VERSIONS = int(os.environ.get('INNOAISLE_MODEL_KEEP_VERSIONS', 5))
+
+ingest_store = IngestStore(os.environ.get('INNOAISLE_STORE_DIR', os.path.join(_CACHE_DIR, 'stores')))
+# Days of raw rows used for the model stages when predicting from the store without an upload
+STORE_RECENT_DAYS = int(os.environ.get('INNOAISLE_STORE_RECENT_DAYS', 7))
+
+job_manager = JobManager(
+    max_workers=int(os.environ.get('INNOAISLE_JOB_WORKERS', min(4, os.cpu_count() or 1))),
+    retention_seconds=int(os.environ.get('INNOAISLE_JOB_RETENTION_SECONDS', 3600)),
+    stages=STAGES,
+    # Shared so any server worker process can report on any job
+    state_dir=os.path.join(_CACHE_DIR, 'jobs'),
+)
+
+# Layout simulators of recently used model versions, with their scored blocks
+_simulators = OrderedDict()
+_simulators_lock = threading.Lock()
+
+# Open /live event streams per server process. Each holds a server thread, so
+# production keeps half of INNOAISLE_THREADS free for other requests (0 = no limit)
+LIVE_MAX_STREAMS = int(os.environ.get('INNOAISLE_LIVE_MAX_STREAMS',
+                                      0 if DEBUG else max(1, int(os.environ.get('INNOAISLE_THREADS', 4)) // 2)))
+# Sliding windows of live sensor readings per store and zone, shared by every server process
+live_hub = LiveHub(state_dir=os.path.join(_CACHE_DIR, 'live'), max_streams=LIVE_MAX_STREAMS)
+
+# Multi-store batches and cross-validation folds fan out over every core by
+# default; the pool is created on first use
+BATCH_WORKERS = int(os.environ.get('INNOAISLE_BATCH_WORKERS', os.cpu_count() or 1))
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+
+def batch_executor():
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            _batch_executor = ProcessPoolExecutor(max_workers=BATCH_WORKERS, initializer=pool_worker_init)
+        return _batch_executor
+
+
+# Per-zone Prophet fits of zone_forecasts=1 share the batch pool
+set_zone_executor(batch_executor, BATCH_WORKERS)
+
+
+def size_pools(cores):
+    """Size the batch and job pools for `cores` CPUs, unless set in the environment.
+
+    Every gunicorn worker creates its own pools, so post_fork gives each
+    worker its share of the cores instead of letting all of them start one
+    process per core.
+    """
+    global BATCH_WORKERS
+    if 'INNOAISLE_BATCH_WORKERS' not in os.environ:
+        BATCH_WORKERS = cores
+    if 'INNOAISLE_JOB_WORKERS' not in os.environ:
+        job_manager.max_workers = min(4, cores)
+    set_zone_executor(batch_executor, BATCH_WORKERS)
+
+
+# Import and exercise sklearn/Prophet in a background thread at startup (0 = on first request)
+WARMUP = os.environ.get('INNOAISLE_WARMUP', '1') != '0'
+readiness = {'state': 'cold', 'phases': {}, 'error': None}
+
+
+def _run_warmup():
+    readiness['state'] = 'warming'
+    started = time.perf_counter()
+    try:
+        readiness['phases'] = warm_up()
+    except Exception as e:
+        print('Warm-up failed:', str(e))
+        print('Traceback:', traceback.format_exc())
+        readiness.update(state='failed', error=str(e))
+        return
+    readiness['state'] = 'ready'
+    print('[startup] warm-up finished in %.2fs (%.2fs after process start)' % (
+        time.perf_counter() - started, time.perf_counter() - _STARTED))
+
+
+def start_warmup():
+    if WARMUP and readiness['state'] == 'cold':
+        threading.Thread(target=_run_warmup, name='warm-up', daemon=True).start()
+
+
+metrics = MetricsRegistry()
+http_requests = metrics.counter('innoaisle_http_requests_total', 'HTTP requests by endpoint, method and status',
+                                ['endpoint', 'method', 'status'])
+http_latency = metrics.histogram('innoaisle_http_request_duration_seconds', 'HTTP request latency',
+                                 ['endpoint', 'method'])
+stage_latency = metrics.histogram('innoaisle_stage_duration_seconds', 'Wall time per analysis stage', ['stage'])
+stage_cpu = metrics.counter('innoaisle_stage_cpu_seconds_total', 'CPU time per analysis stage', ['stage'])
+predictions = metrics.counter('innoaisle_predictions_total', 'Predict requests by result cache outcome', ['cache'])
+predicted_rows = metrics.counter('innoaisle_predict_rows_total', 'Rows analysed by /predict (cache misses only)')
+live_readings = metrics.counter('innoaisle_live_readings_total', 'Sensor readings received by /live')
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    if 'request_started' in g:
+        http_latency.observe(time.perf_counter() - g.request_started, endpoint=endpoint, method=request.method)
+    http_requests.inc(endpoint=endpoint, method=request.method, status=str(response.status_code))
+
+    recorder = g.get('stage_recorder')
+    if recorder is not None:
+        summary = recorder.summary()
+        response.headers['Server-Timing'] = server_timing(summary)
+        for name, stage in summary['stages'].items():
+            stage_latency.observe(stage['wall_ms'] / 1000, stage=name)
+            stage_cpu.inc(stage['cpu_ms'] / 1000, stage=name)
+        if 'rows' in summary['input']:
+            predicted_rows.inc(summary['input']['rows'])
+    return response
+
+
+def analysis_options():
+    """Per-request analysis switches; they are part of the result cache key"""
+    return {
+        'zone_forecasts': request.values.get('zone_forecasts') == '1',
+        'engine': validate_engine(request.values.get('engine', DEFAULT_ENGINE)),
+        'encoding': validate_encoding(request.values['encoding']) if request.values.get('encoding') else None,
+        'forecast': forecast_options(
+            request.values.get('forecast_window_days'),
+            request.values.get('forecast_downsample'),
+            request.values.get('forecast_intervals'),
+            warm_start=request.values.get('forecast_warm_start') == '1',
+        ),
+    }
+
+
+def encoded_response(payload):
+    """Shape and encode a result per the request: fields=, orient=columns, format= / Accept, Accept-Encoding"""
+    payload = select_fields(payload, request.values.get('fields'))
+    orient = request.values.get('orient', 'records')
+    if orient not in ('records', 'columns'):
+        raise ValueError("orient must be 'records' or 'columns'")
+    if orient == 'columns':
+        payload = columnar(payload)
+    fmt = negotiate_format(request.values.get('format'), request.accept_mimetypes)
+    body = encode(payload, fmt)
+    encoding = negotiate_encoding(request.accept_encodings, len(body))
+    response = Response(compress(body, encoding), mimetype=MIMETYPES[fmt])
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.update(['Accept', 'Accept-Encoding'])
+    return response
+
+
+# Response keys added around the analysis outputs; also accepted by fields=
+RESPONSE_FIELDS = ['timestamp', 'cache_hit', 'timings', 'model', 'rows_parsed', 'rows_sampled']
+
+
+def requested_outputs():
+    """Analysis outputs named in fields=, or None for all; only their stages are run"""
+    fields = request.values.get('fields')
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in OUTPUTS and name not in RESPONSE_FIELDS]
+    if unknown:
+        raise ValueError('Unknown fields: %s (available: %s)' % (
+            ', '.join(unknown), ', '.join(list(OUTPUTS) + RESPONSE_FIELDS)))
+    return sorted(name for name in names if name in OUTPUTS)
+
+
+def _with_outputs(key_params, outputs):
+    # Partial results get their own cache entries; full results keep the original keys
+    return key_params if outputs is None else dict(key_params, outputs=outputs)
+
+
+def _model_info(meta, mode):
+    return {
+        'store_id': meta['store_id'],
+        'version': meta['version'],
+        'mode': mode,
+        'trained_at': meta['trained_at'],
+        'engine': meta.get('engine', 'random_forest'),
+    }
+
+
+def _model_is_stale(meta):
+    return MODEL_MAX_AGE_HOURS > 0 and time.time() - meta['trained_at'] > MODEL_MAX_AGE_HOURS * 3600
+
+
+def layout_simulator(store_id):
+    """(simulator, metadata) for the store's latest model version; raises LookupError without one"""
+    loaded = model_registry.load(store_id)
+    if loaded is None:
+        raise LookupError('No models registered for store %s' % store_id)
+    models, meta = loaded
+    if models.get('profile') is None:
+        raise ValueError('Model version %d of store %s has no layout profile; retrain it with mode=train'
+                         % (meta['version'], store_id))
+    key = (store_id, meta['version'])
+    with _simulators_lock:
+        simulator = _simulators.get(key)
+        if simulator is not None:
+            _simulators.move_to_end(key)
+            return simulator, meta
+    simulator = LayoutSimulator(models)
+    with _simulators_lock:
+        _simulators[key] = simulator
+        while len(_simulators) > model_registry.loaded_items:
+            _simulators.popitem(last=False)
+    return simulator, meta
+
+
+def predict_for_store(data, store_id, mode, source='upload', options=None, progress=None, outputs=None):
+    """Score with the store's registered model, update it, or train and register a new version.
+
+    With source='store' the upload (if any) is first appended to the
+    ingestion store, and zone/hourly aggregates come from its rollups; the
+    model stages then run on the uploaded rows, or on the most recent
+    ingested days when nothing was uploaded. mode='update' warm-starts the
+    registered footfall regressor on those rows and registers the result as a
+    new version. `outputs` only limits scoring; training and updates run
+    every stage so the full model set is registered. With the forecast
+    warm_start option, updates refit Prophet from the registered model too,
+    and training starts Prophet from the registered model's parameters.
+    """
+    if mode not in ('train', 'score', 'update'):
+        raise ValueError("mode must be 'train', 'score' or 'update'")
+    if source not in ('upload', 'store'):
+        raise ValueError("source must be 'upload' or 'store'")
+
+    key_params = {'params': MODEL_PARAMS, 'options': options, 'store_id': store_id}
+    if source == 'store':
+        if data:
+            if progress is not None:
+                progress('ingest')
+            ingest_store.append(store_id, load_csv(io.BytesIO(data)), content_key=content_key(data))
+        key_params.update(source='store', store_revision=ingest_store.revision(store_id))
+    elif not data:
+        raise ValueError('No CSV uploaded')
+
+    def load_inputs():
+        if progress is not None:
+            progress('parse')
+        if data:
+            df = load_csv(io.BytesIO(data))
+        else:
+            df = ingest_store.recent_rows(store_id, STORE_RECENT_DAYS)
+            if df is None:
+                raise ValueError('No rows ingested for store %s' % store_id)
+            # Stores may hold rows ingested before the full schema was required
+            check_columns(df)
+        aggregates = ingest_store.aggregates(store_id) if source == 'store' else None
+        return df, aggregates
+
+    def register(models, df, key, info_mode, extra=None):
+        if progress is not None:
+            progress('model_save')
+        if models.get('profile') is None:
+            # Updates keep the profile of the version they started from
+            models = dict(models, profile=build_profile(df))
+        meta = model_registry.save(store_id, models, dict(extra or {}, data_key=key, rows=len(df)))
+        model_registry.prune(store_id, keep=MODEL_KEEP_VERSIONS)
+        return _model_info(meta, info_mode)
+
+    if mode in ('score', 'update'):
+        if progress is not None:
+            progress('model_load')
+        loaded = model_registry.load(store_id)
+        if loaded is not None and not _model_is_stale(loaded[1]):
+            models, meta = loaded
+            if mode == 'update':
+                key = content_key(data, dict(key_params, mode='update', model_version=meta['version']))
+
+                def compute():
+                    df, aggregates = load_inputs()
+                    result, updated = analyze(df, progress, models=models, aggregates=aggregates, options=options,
+                                              update=True)
+                    return dict(result, model=register(updated, df, key, 'update', {
+                        'updated_from': meta['version'],
+                        'updates': meta.get('updates', 0) + 1,
+                    }))
+            else:
+                key = content_key(data, _with_outputs(dict(key_params, model_version=meta['version']), outputs))
+
+                def compute():
+                    df, aggregates = load_inputs()
+                    result = run_analysis(df, progress, models=models, aggregates=aggregates, options=options,
+                                          outputs=outputs)
+                    return dict(result, model=_model_info(meta, 'score'))
+
+            return result_cache.get_or_compute(key, compute)
+        # No model yet, or the registered one is past its max age: retrain
+
+    prophet_init = None
+    if options and options['forecast']['warm_start']:
+        # Start Prophet from the store's registered model, even one past its max age
+        loaded = model_registry.load(store_id)
+        if loaded is not None:
+            prophet_init = loaded[0]['prophet']
+            key_params['prophet_warm_start_version'] = loaded[1]['version']
+    key = content_key(data, key_params)
+
+    def train():
+        df, aggregates = load_inputs()
+        result, models = analyze(df, progress, aggregates=aggregates, options=options, prophet_init=prophet_init)
+        return dict(result, model=register(models, df, key, 'train'))
+
+    return result_cache.get_or_compute(key, train)
+
+
+def predict_streamed(source, options=None, progress=None, outputs=None):
+    """Chunk-parse an upload stream with the typed schema.
+
+    Aggregates cover every row; the model stages use a bounded uniform row
+    sample, so peak memory does not grow with the file size.
+    """
+    if progress is not None:
+        progress('parse')
+    reader = HashingReader(source)
+    df, aggregates, total_rows = stream_csv(reader)
+    key = content_key(reader.hexdigest().encode('ascii'), _with_outputs({
+        'params': MODEL_PARAMS,
+        'options': options,
+        'stream': {'sample_rows': SAMPLE_ROWS, 'timestamp_format': TIMESTAMP_FORMAT},
+    }, outputs))
+    return result_cache.get_or_compute(
+        key, lambda: dict(run_analysis(df, progress, aggregates=aggregates, options=options, outputs=outputs),
+                          rows_parsed=total_rows, rows_sampled=len(df))
+    )
+
+
 @app.route('/predict', methods=['POST'])
 def predict():
+    recorder = g.stage_recorder = StageRecorder(deadline=REQUEST_TIMEOUT)
     try:
-        file = request.files['file']
-        df = pd.read_csv(file)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp')
-
-        # Feature engineering
-        df['hour'] = df['timestamp'].dt.hour
-        df['day'] = df['timestamp'].dt.day
-        df['month'] = df['timestamp'].dt.month
-
-        # One-hot encode categorical features
-        df_encoded = pd.get_dummies(df, columns=['phase', 'product_category', 'day_of_week', 'zone_id'], drop_first=True)
-
-        # Define target and features
-        X = df_encoded.drop(columns=['timestamp', 'footfall'])
-        if 'zone_temp' not in X.columns:
-            X['zone_temp'] = df['zone_temp']
-        if 'sales_volume' not in X.columns:
-            X['sales_volume'] = df['sales_volume']
-        y = df_encoded['footfall']
-
-        # Train-test split
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-        # Train the model
-        model = RandomForestRegressor(n_estimators=100, max_depth=10, min_samples_split=5, random_state=42)
-        model.fit(X_train, y_train)
-
-        # Make predictions
-        y_pred = model.predict(X_test)
-
-        # Evaluate
-        rmse = mean_squared_error(y_test, y_pred) ** 0.5
-        r2 = r2_score(y_test, y_pred)
-
-        # Add predictions to a copy of the test set
-        X_test_copy = X_test.copy()
-        X_test_copy['predicted_footfall'] = y_pred
-
-        # Reconstruct original categorical columns
-        zone_columns = [col for col in X_test_copy.columns if col.startswith('zone_id_')]
-        X_test_copy['zone'] = X_test_copy[zone_columns].idxmax(axis=1).str.replace('zone_id_', '')
-        phase_columns = [col for col in X_test_copy.columns if col.startswith('phase_')]
-        X_test_copy['phase'] = X_test_copy[phase_columns].idxmax(axis=1).str.replace('phase_', '')
-        product_columns = [col for col in X_test_copy.columns if col.startswith('product_category_')]
-        X_test_copy['product_category'] = X_test_copy[product_columns].idxmax(axis=1).str.replace('product_category_', '')
-
-        # Aggregate average predicted footfall per zone
-        zone_summary = X_test_copy.groupby('zone')['predicted_footfall'].mean().reset_index()
-
-        # Simulate heat zones
-        threshold_heat = 60
-        X_test_copy['is_heat_zone'] = X_test_copy['predicted_footfall'] > threshold_heat
-        heat_zone_summary = X_test_copy.groupby('zone')['is_heat_zone'].mean().reset_index()
-        heat_zone_summary['heat_zone_probability'] = heat_zone_summary['is_heat_zone']
-        heat_zone_summary = heat_zone_summary.drop(columns=['is_heat_zone'])
-
-        # Identify high-traffic times for Zone Z4
-        z4_data = df[df['zone_id'] == 'Z4'].copy()
-        z4_data['hour'] = z4_data['timestamp'].dt.hour
-        high_traffic_times = z4_data[z4_data['footfall'] > z4_data['footfall'].mean()]['hour'].value_counts().head(3).index.tolist()
-
-        # Simulate cooling adjustment
-        base_cooling_energy = 50
-        cooling_factor = 1.5
-        X_test_copy['cooling_energy'] = base_cooling_energy + (X_test_copy['is_heat_zone'].astype(int) * cooling_factor)
-        cooling_summary = X_test_copy.groupby('zone')['cooling_energy'].mean().reset_index()
-
-        # Merge summaries for suggestions
-        suggested_changes = zone_summary.merge(heat_zone_summary, on='zone').merge(cooling_summary, on='zone')
-        suggested_changes = suggested_changes[suggested_changes['heat_zone_probability'] > 0.5]
-
-        # Rearrangement logic (proximity penalty)
-        refrigeration_zones = ['Z1', 'Z2']
-        df['is_refrigeration'] = df['zone_id'].isin(refrigeration_zones).astype(int)
-        df['proximity_penalty'] = df.apply(
-            lambda row: row['footfall'] * 2 if row['is_refrigeration'] == 1 and row['footfall'] > 60 else 0,
-            axis=1
-        )
-        zone_traffic = df.groupby('zone_id')['footfall'].mean().reset_index()
-        zone_traffic.columns = ['zone', 'traffic_score']
-        total_penalty = df.groupby('zone_id')['proximity_penalty'].sum().reset_index()
-        total_penalty = total_penalty.rename(columns={'zone_id': 'zone'})
-        zone_traffic = zone_traffic.merge(total_penalty, on='zone', how='left').fillna(0)
-
-        # Simulated validation - use actual footfall instead of predicted_footfall
-        base_cooling = 50
-        energy_factor = 0.1
-        simulated_energy = base_cooling + (zone_traffic['traffic_score'] * energy_factor)
-
-        # Suggest rearrangements
-        traffic_impact_factor = 0.2
-        max_safe_traffic = 70
-        max_capacity = 80
-        suggested_arrangements = []
-        for _, row in zone_traffic[zone_traffic['proximity_penalty'] > 0].iterrows():
-            current_zone = row['zone']
-            current_traffic = row['traffic_score']
-            current_penalty = row['proximity_penalty']
-            available_zones = zone_traffic[~zone_traffic['zone'].isin(refrigeration_zones + [current_zone])]
-            if not available_zones.empty:
-                target_zone = available_zones.loc[available_zones['traffic_score'].idxmin()]['zone']
-                target_traffic = available_zones.loc[available_zones['traffic_score'].idxmin()]['traffic_score']
-                traffic_impact = current_traffic * traffic_impact_factor
-                new_target_traffic = target_traffic + traffic_impact
-                common_product = df[df['zone_id'] == current_zone]['product_category'].mode()[0]
-                if new_target_traffic <= max_capacity:
-                    if new_target_traffic <= max_safe_traffic:
-                        suggestion = {
-                            'from_zone': current_zone,
-                            'to_zone': target_zone,
-                            'current_traffic': current_traffic,
-                            'target_traffic': target_traffic,
-                            'new_target_traffic': new_target_traffic,
-                            'penalty': current_penalty,
-                            'product': common_product,
-                            'type': 'safe'
-                        }
-                    else:
-                        suggestion = {
-                            'from_zone': current_zone,
-                            'to_zone': target_zone,
-                            'current_traffic': current_traffic,
-                            'target_traffic': target_traffic,
-                            'new_target_traffic': new_target_traffic,
-                            'penalty': current_penalty,
-                            'product': common_product,
-                            'type': 'warning'
-                        }
-                else:
-                    suggestion = {
-                        'from_zone': current_zone,
-                        'to_zone': target_zone,
-                        'current_traffic': current_traffic,
-                        'target_traffic': target_traffic,
-                        'new_target_traffic': new_target_traffic,
-                        'penalty': current_penalty,
-                        'product': common_product,
-                        'type': 'exceeds_capacity'
-                    }
-                suggested_arrangements.append(suggestion)
-
-        # Detailed suggestions for Zone Z4
-        layout_suggestions = []
-        if not suggested_changes.empty:
-            for _, row in suggested_changes.iterrows():
-                if row['zone'] == 'Z4':
-                    z4_products = df[df['zone_id'] == 'Z4']['product_category'].value_counts()
-                    shiftable_products = [prod for prod in z4_products.index if prod not in ['Dairy', 'Frozen']]
-                    avg_temp_z4 = df[df['zone_id'] == 'Z4']['zone_temp'].mean()
-                    layout_suggestions.append({
-                        'zone': row['zone'],
-                        'predicted_footfall': row['predicted_footfall'],
-                        'heat_zone_probability': row['heat_zone_probability'],
-                        'cooling_energy': row['cooling_energy'],
-                        'high_traffic_times': high_traffic_times,
-                        'shiftable_products': shiftable_products,
-                        'cooling_cycle': {
-                            'start_hour': min(high_traffic_times) if high_traffic_times else None,
-                            'end_hour': (max(high_traffic_times) + 1) if high_traffic_times else None,
-                            'temp_threshold': avg_temp_z4,
-                            'increase': cooling_factor,
-                            'base': base_cooling_energy
-                        }
-                    })
+        outputs = requested_outputs()
+        store_id = request.values.get('store_id')
+        if request.args.get('stream') == '1':
+            if store_id:
+                raise ValueError('stream=1 is not supported together with store_id')
+            # Multipart uploads are spooled to a temporary file by Werkzeug;
+            # any other body (e.g. text/csv) is parsed straight off the socket
+            source = request.files['file'].stream if 'file' in request.files else request.stream
+            result, cache_hit = predict_streamed(source, analysis_options(), recorder, outputs)
+        elif store_id:
+            data = request.files['file'].read() if 'file' in request.files else b''
+            mode = request.values.get('mode', 'train')
+            source = request.values.get('source', 'upload')
+            result, cache_hit = predict_for_store(data, validate_store_id(store_id), mode, source, analysis_options(),
+                                                  recorder, outputs)
         else:
-            layout_suggestions = [{'message': 'No zones currently identified as high heat zones. Layout appears efficient.'}]
-
-        # Prepare data for Prophet - fix the groupby issue
-        df_prophet = df[['timestamp', 'footfall']].copy()
-        df_prophet = df_prophet.rename(columns={'timestamp': 'ds', 'footfall': 'y'})
-        # Group by hour and sum only the numeric column, not datetime
-        df_prophet['ds'] = df_prophet['ds'].dt.floor('h')
-        df_prophet = df_prophet.groupby('ds')['y'].sum().reset_index()
-
-        # Train Prophet model
-        model = Prophet(yearly_seasonality=True, daily_seasonality=True)
-        model.fit(df_prophet)
-
-        # Forecast next 7 days (168 hours)
-        future = model.make_future_dataframe(periods=168, freq='H')
-        forecast = model.predict(future)
-
-        # Prepare forecast data for frontend (last 7 days)
-        forecast_json = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(168).copy()
-        forecast_json['ds'] = forecast_json['ds'].astype(str)  # Convert datetime to string for JSON
-        prophet_forecast = forecast_json.to_dict(orient='records')
-
-        # --- Sample Walmart-style blueprint mapping ---
-        sample_blueprint_layout = {
-            "Dairy":            {"x": 20,  "y": 40,  "width": 80,  "height": 40,  "color": "green",  "isRefrigeration": True},
-            "Meat":             {"x": 20,  "y": 90,  "width": 80,  "height": 40,  "color": "green",  "isRefrigeration": True},
-            "Produce":          {"x": 20,  "y": 140, "width": 80,  "height": 40,  "color": "green"},
-            "Bakery":           {"x": 20,  "y": 190, "width": 80,  "height": 40,  "color": "green"},
-            "Grocery":          {"x": 110, "y": 40,  "width": 80,  "height": 190, "color": "green"},
-            "Electronics":      {"x": 200, "y": 40,  "width": 100, "height": 60,  "color": "blue"},
-            "Shoes":            {"x": 310, "y": 40,  "width": 80,  "height": 60,  "color": "blue"},
-            "Pharmacy":         {"x": 110, "y": 240, "width": 80,  "height": 40,  "color": "blue"},
-            "Health & Beauty":  {"x": 200, "y": 240, "width": 80,  "height": 40,  "color": "blue"},
-            "Customer Service": {"x": 290, "y": 240, "width": 80,  "height": 40,  "color": "yellow"},
-            "Checkouts":        {"x": 20,  "y": 290, "width": 350, "height": 30,  "color": "gray"},
-        }
-        # --- Generate blueprint_layout using sample mapping ---
-        unique_zones = df['zone_id'].unique()
-        zone_categories = df.groupby('zone_id')['product_category'].agg(lambda x: x.mode()[0] if not x.mode().empty else '').to_dict()
-        grid_cols = 4
-        grid_spacing_x = 150
-        grid_spacing_y = 120
-        default_width = 120
-        default_height = 80
-        blueprint_layout = {}
-        for idx, zone_id in enumerate(sorted(unique_zones)):
-            # Try to use product_category as the mapping key
-            product_cat = zone_categories.get(zone_id, '').title()
-            mapping = sample_blueprint_layout.get(product_cat)
-            if mapping:
-                layout = dict(mapping)
-                layout['zone_id'] = zone_id
-                layout['product_category'] = product_cat
-            else:
-                # Fallback to grid
-                row = idx // grid_cols
-                col = idx % grid_cols
-                x = 50 + col * grid_spacing_x
-                y = 100 + row * grid_spacing_y
-                layout = {
-                    'zone_id': zone_id,
-                    'x': x,
-                    'y': y,
-                    'width': default_width,
-                    'height': default_height,
-                    'isRefrigeration': False,
-                    'product_category': product_cat,
-                    'color': 'gray'
-                }
-            blueprint_layout[zone_id] = layout
-
-        # --- Generate suggested layout and moves based on rearrangement suggestions ---
-        suggested_layout = blueprint_layout.copy()
-        moves = []
-        # Only process if there are rearrangement suggestions
-        if suggested_arrangements:
-            # Make a mutable copy
-            suggested_layout = {k: dict(v) for k, v in blueprint_layout.items()}
-            # For each suggestion, move the 'from_zone' to the position of 'to_zone'
-            for suggestion in suggested_arrangements:
-                from_zone = suggestion['from_zone']
-                to_zone = suggestion['to_zone']
-                # Find the target zone's position
-                if to_zone in blueprint_layout:
-                    to_pos = (blueprint_layout[to_zone]['x'], blueprint_layout[to_zone]['y'])
-                else:
-                    # If not found, skip
-                    continue
-                from_pos = (blueprint_layout[from_zone]['x'], blueprint_layout[from_zone]['y'])
-                # Move the from_zone to the to_zone's position
-                suggested_layout[from_zone]['x'] = to_pos[0]
-                suggested_layout[from_zone]['y'] = to_pos[1]
-                moves.append({
-                    'zone_id': from_zone,
-                    'from_x': from_pos[0],
-                    'from_y': from_pos[1],
-                    'to_x': to_pos[0],
-                    'to_y': to_pos[1]
-                })
-
-        # Prepare response
-        result = {
-            'timestamp': datetime.now().isoformat(),
-            'rmse': rmse,
-            'r2_score': r2,
-            'zone_summary': zone_summary.to_dict('records'),
-            'heat_zone_summary': heat_zone_summary.to_dict('records'),
-            'cooling_summary': cooling_summary.to_dict('records'),
-            'layout_suggestions': layout_suggestions,
-            'rearrangement_suggestions': suggested_arrangements,
-            'prophet_forecast': prophet_forecast,
-            'blueprint_layout': blueprint_layout,
-            'suggested_layout': suggested_layout,
-            'layout_moves': moves
-        }
-
-        # Add zone-level forecast and simulated energy usage
-        zone_traffic_json = zone_traffic.to_dict(orient='records')
-        result['zone_traffic_forecast'] = zone_traffic_json
-        result['simulated_energy_usage'] = float(simulated_energy.sum())
-
-        # Cooling and layout suggestions (collect as list of dicts for frontend)
-        detailed_suggestions = []
-        base_temp = 22.0  # Define base temperature
-        adjacency_zones = ['Z3', 'Z4']  # Define adjacency zones
-        
-        for zone in sorted(df['zone_id'].unique()):
-            # Get traffic from zone_traffic DataFrame
-            zone_traffic_row = zone_traffic[zone_traffic['zone'] == zone]
-            if not zone_traffic_row.empty:
-                traffic = zone_traffic_row['traffic_score'].iloc[0]
-            else:
-                traffic = 0
-                
-            is_refrigeration = zone in refrigeration_zones
-            adjacency_factor = 50 if zone in adjacency_zones and traffic > 50 else 0
-            penalty = traffic * 2 if is_refrigeration and traffic > 30 else adjacency_factor
-            
-            if is_refrigeration and traffic > 40:
-                adj_temp = base_temp - 2
-                suggestion = f"Increase cooling: Adjust temperature from {base_temp:.1f}°C to {adj_temp:.1f}°C."
-            elif is_refrigeration and traffic > 30:
-                suggestion = "Monitor cooling; consider adjustment if footfall exceeds 40."
-            elif traffic > 50 and not is_refrigeration and zone in adjacency_zones:
-                available_zones = [z for z in df['zone_id'].unique() if z not in refrigeration_zones + [zone]]
-                if available_zones:
-                    # Find target zone with minimum traffic
-                    target_zone = None
-                    min_traffic = float('inf')
-                    for z in available_zones:
-                        z_traffic_row = zone_traffic[zone_traffic['zone'] == z]
-                        if not z_traffic_row.empty:
-                            z_traffic = z_traffic_row['traffic_score'].iloc[0]
-                            if z_traffic < min_traffic:
-                                min_traffic = z_traffic
-                                target_zone = z
-                    
-                    if target_zone:
-                        target_traffic = min_traffic
-                        traffic_impact = traffic * traffic_impact_factor
-                        new_target_traffic = target_traffic + traffic_impact
-                        if new_target_traffic <= max_capacity:
-                            if new_target_traffic <= max_safe_traffic:
-                                suggestion = f"Suggest relocating high-traffic items to Zone {target_zone} (Current Traffic: {target_traffic:.2f}, New Traffic: {new_target_traffic:.2f}). Recommend redistributing items to balance traffic across zones."
-                            else:
-                                suggestion = f"Warning: Moving to Zone {target_zone} (Current Traffic: {target_traffic:.2f}, New Traffic: {new_target_traffic:.2f}) exceeds safe limit ({max_safe_traffic}) but within capacity ({max_capacity}). Consider partial move or redistribute items with monitoring."
-                        else:
-                            suggestion = f"No suitable zone found. New traffic ({new_target_traffic:.2f}) exceeds capacity ({max_capacity}). Suggest partial redistribution to balance traffic."
-                    else:
-                        suggestion = "No suitable target zone found."
-                else:
-                    suggestion = "No available zones for relocation."
-            else:
-                suggestion = "No adjustment needed."
-                
-            detailed_suggestions.append({
-                "zone": zone,
-                "predicted_footfall": float(traffic),
-                "penalty": float(penalty),
-                "suggestion": suggestion
-            })
-        result['detailed_zone_suggestions'] = detailed_suggestions
+            data = request.files['file'].read()
+            options = analysis_options()
+            key = content_key(data, _with_outputs({'params': MODEL_PARAMS, 'options': options}, outputs))
+            result, cache_hit = result_cache.get_or_compute(
+                key, lambda: analyze_bytes(data, recorder, options=options, outputs=outputs)
+            )
+        predictions.inc(cache='hit' if cache_hit else 'miss')
+        response = dict(result, cache_hit=cache_hit)
+        if request.values.get('timings') == '1':
+            response['timings'] = recorder.summary()
+        return encoded_response(response)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except NotAcceptable as e:
+        return jsonify({'error': str(e)}), 406
+    except DeadlineExceeded as e:
+        return jsonify({'error': str(e)}), 504
+    except Exception as e:
+        print('Error:', str(e))
+        print('Traceback:', traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
 
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    workdir = tempfile.mkdtemp(prefix='innoaisle-batch-')
+    try:
+        files = request.files.getlist('file') + request.files.getlist('files')
+        items = batch.collect_uploads(files, workdir)
+        options = analysis_options()
+    except ValueError as e:
+        batch.cleanup(workdir)
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        batch.cleanup(workdir)
+        print('Error:', str(e))
+        print('Traceback:', traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+    def cache_key(digest):
+        return content_key(digest.encode('ascii'), {'params': MODEL_PARAMS, 'options': options, 'batch': True})
+
+    records = batch.run_batch(items, batch_executor(), result_cache, cache_key, options)
+
+    if request.args.get('collect') == '1':
+        try:
+            collected = list(records)
+        finally:
+            batch.cleanup(workdir)
+        return jsonify({
+            'stores': {r['store_id']: {k: v for k, v in r.items() if k != 'store_id'} for r in collected},
+            'summary': batch.summarize(collected),
+        })
+
+    def generate():
+        collected = []
+        try:
+            for record in records:
+                collected.append(record)
+                yield json.dumps(record, default=str) + '\n'
+            yield json.dumps({'summary': batch.summarize(collected)}) + '\n'
+        finally:
+            batch.cleanup(workdir)
+
+    # One NDJSON line per store as it finishes, then a final summary line
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/evaluate', methods=['POST'])
+def evaluate():
+    try:
+        if 'file' not in request.files:
+            raise ValueError('No CSV uploaded')
+        data = request.files['file'].read()
+        options = analysis_options()
+        models = validate_models(request.values.get('models'))
+        result = cross_validate(
+            load_csv(io.BytesIO(data)), batch_executor(), result_cache,
+            lambda params: content_key(data, dict(params, params=MODEL_PARAMS)),
+            folds=request.values.get('folds'), models=models, options=options,
+        )
         return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print('Error:', str(e))
         print('Traceback:', traceback.format_exc())
@@ -376,5 +496,185 @@ def predict():
 def upload_csv():
     return predict()
 
+@app.route('/ingest', methods=['POST'])
+def ingest():
+    try:
+        store_id = validate_store_id(request.values.get('store_id'))
+        if 'file' in request.files:
+            data = request.files['file'].read()
+            summary = ingest_store.append(store_id, load_csv(io.BytesIO(data)), content_key=content_key(data))
+        else:
+            payload = request.get_json(silent=True) or {}
+            rows = payload.get('rows')
+            if not rows:
+                raise ValueError('Upload a CSV as "file" or post JSON {"rows": [...]}')
+            summary = ingest_store.append(store_id, pd.DataFrame(rows))
+        return jsonify(summary)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print('Error:', str(e))
+        print('Traceback:', traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/live/<store_id>/readings', methods=['POST'])
+def post_live_readings(store_id):
+    try:
+        event = live_hub.add(validate_store_id(store_id), parse_readings(request.get_json(silent=True)))
+        live_readings.inc(event['readings'])
+        return jsonify(event)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print('Error:', str(e))
+        print('Traceback:', traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/live/<store_id>', methods=['GET'])
+def get_live_snapshot(store_id):
+    try:
+        snapshot = live_hub.snapshot(validate_store_id(store_id))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if snapshot is None:
+        return jsonify({'error': 'No live readings for store %s' % store_id}), 404
+    return jsonify(snapshot)
+
+@app.route('/live/<store_id>/events', methods=['GET'])
+def live_events(store_id):
+    try:
+        store_id = validate_store_id(store_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not live_hub.open_stream():
+        response = jsonify({'error': 'Too many open live streams (%d); try again later' % live_hub.max_streams})
+        response.headers['Retry-After'] = str(HEARTBEAT_SECONDS)
+        return response, 503
+
+    def generate():
+        snapshot = live_hub.snapshot(store_id) or {'store_id': store_id, 'seq': 0, 'window': live_hub.window,
+                                                   'zones': [], 'heat_zones': 0}
+        yield server_sent_event('snapshot', snapshot)
+        seq = snapshot['seq']
+        while True:
+            events = live_hub.events_after(store_id, seq, HEARTBEAT_SECONDS)
+            if not events:
+                # Comment line: keeps proxies from closing an idle stream
+                yield ': keep-alive\n\n'
+                continue
+            for event in events:
+                yield server_sent_event('update', event)
+            seq = events[-1]['seq']
+
+    response = Response(generate(), mimetype='text/event-stream')
+    # Runs when the server closes the response, even if the stream never started
+    response.call_on_close(live_hub.close_stream)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/simulate', methods=['POST'])
+def simulate():
+    try:
+        store_id = validate_store_id(request.values.get('store_id'))
+        payload = request.get_json(silent=True) or {}
+        started = time.perf_counter()
+        simulator, meta = layout_simulator(store_id)
+        result = simulator.simulate(payload.get('candidates'))
+        result.update(store_id=store_id, model=dict(_model_info(meta, 'simulate'), stale=_model_is_stale(meta)),
+                      elapsed_s=time.perf_counter() - started)
+        return jsonify(result)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print('Error:', str(e))
+        print('Traceback:', traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/models/<store_id>', methods=['GET'])
+def list_models(store_id):
+    try:
+        versions = model_registry.versions(validate_store_id(store_id))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not versions:
+        return jsonify({'error': 'No models registered for store %s' % store_id}), 404
+    latest = model_registry.metadata(store_id)
+    return jsonify({
+        'store_id': store_id,
+        'versions': versions,
+        'latest': dict(latest, stale=_model_is_stale(latest)),
+    })
+
+@app.route('/jobs/predict', methods=['POST'])
+def submit_predict_job():
+    try:
+        if 'file' not in request.files:
+            raise ValueError('No CSV uploaded')
+        data = request.files['file'].read()
+        options = analysis_options()
+        key = content_key(data, {'params': MODEL_PARAMS, 'options': options})
+        cached = result_cache.get(key)
+        if cached is not None:
+            job_id = job_manager.complete(dict(cached, cache_hit=True))
+        else:
+            job_id = job_manager.submit(
+                analyze_bytes, (data,), {'options': options},
+                on_success=lambda result: result_cache.put(key, result),
+            )
+        job = job_manager.get(job_id, include_result=False)
+        job['status_url'] = '/jobs/%s' % job_id
+        return jsonify(job), 202
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print('Error:', str(e))
+        print('Traceback:', traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job id'}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    if job_manager.cancel(job_id):
+        return jsonify(job_manager.get(job_id))
+    job = job_manager.get(job_id, include_result=False)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job id'}), 404
+    return jsonify(dict(job, error='Only queued jobs can be cancelled')), 409
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({'status': 'ok', 'uptime_s': round(time.perf_counter() - _STARTED, 3)})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    if not WARMUP:
+        # No warm-up: ready as soon as the model libraries can be imported on demand
+        missing = [name for name in ('sklearn', 'prophet') if importlib.util.find_spec(name) is None]
+        if missing:
+            return jsonify({'status': 'not_ready', 'error': 'Missing packages: %s' % ', '.join(missing)}), 503
+        return jsonify({'status': 'ready', 'warmed': False})
+    if readiness['state'] != 'ready':
+        return jsonify({'status': readiness['state'], 'error': readiness['error']}), 503
+    return jsonify({'status': 'ready', 'warmed': True,
+                    'phases': {name: round(seconds, 3) for name, seconds in readiness['phases'].items()}})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    print('[startup] app imported in %.2fs' % (time.perf_counter() - _STARTED))
+    # With the debug reloader, only the child process that serves requests warms up
+    if not DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warmup()
+    app.run(debug=DEBUG, port=int(os.environ.get('INNOAISLE_PORT', 5000)))
\ No newline at end of file
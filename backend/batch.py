@@ -0,0 +1,125 @@
+"""
+Multi-store batch analysis: fan uploads out over a process pool and yield results as they finish
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import as_completed
+
+from analysis import HEAT_ZONE_PROBABILITY, analyze_file
+from csv_stream import HashingReader
+
+TOP_HEAT_STORES = 5
+
+
+def _store_id_from_name(name, taken):
+    store_id = os.path.splitext(os.path.basename(name))[0] or 'store'
+    candidate, n = store_id, 2
+    while candidate in taken:
+        candidate = '%s-%d' % (store_id, n)
+        n += 1
+    return candidate
+
+
+def _spool(source, workdir):
+    """Copy an upload to a temp file, hashing it on the way; returns (path, sha256 hex)"""
+    reader = HashingReader(source)
+    fd, path = tempfile.mkstemp(suffix='.csv', dir=workdir)
+    with os.fdopen(fd, 'wb') as out:
+        shutil.copyfileobj(reader, out)
+    return path, reader.hexdigest()
+
+
+def collect_uploads(files, workdir):
+    """Turn a zip archive and/or several CSV uploads into [(store_id, path, sha256)].
+
+    Store ids come from the file names (without extension).
+    """
+    items = []
+    taken = set()
+    for storage in files:
+        filename = storage.filename or ''
+        if filename.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(storage.stream)
+            except zipfile.BadZipFile:
+                raise ValueError('%s is not a valid zip archive' % filename)
+            with archive:
+                for member in archive.infolist():
+                    name = member.filename
+                    if member.is_dir() or not name.lower().endswith('.csv') or '__MACOSX' in name:
+                        continue
+                    with archive.open(member) as source:
+                        path, digest = _spool(source, workdir)
+                    store_id = _store_id_from_name(name, taken)
+                    taken.add(store_id)
+                    items.append((store_id, path, digest))
+        else:
+            path, digest = _spool(storage.stream, workdir)
+            store_id = _store_id_from_name(filename, taken)
+            taken.add(store_id)
+            items.append((store_id, path, digest))
+    if not items:
+        raise ValueError('No CSV files found in the upload')
+    return items
+
+
+def run_batch(items, executor, cache, cache_key, options=None):
+    """Yield one record per store as soon as its analysis is available.
+
+    Cached stores are yielded first; the rest complete in whatever order
+    the pool finishes them, so one large store never delays the others.
+    """
+    started = time.monotonic()
+    futures = {}
+    hits = []
+    # Submit every miss before yielding anything so the pool is busy while hits stream out
+    for store_id, path, digest in items:
+        key = cache_key(digest)
+        cached = cache.get(key)
+        if cached is not None:
+            hits.append({'store_id': store_id, 'status': 'ok', 'cache_hit': True, 'elapsed_s': 0.0, 'result': cached})
+        else:
+            futures[executor.submit(analyze_file, path, options=options)] = (store_id, key)
+    yield from hits
+
+    for future in as_completed(futures):
+        store_id, key = futures[future]
+        elapsed = round(time.monotonic() - started, 3)
+        try:
+            result = future.result()
+        except Exception as e:
+            print('Batch store %s failed:' % store_id, str(e))
+            yield {'store_id': store_id, 'status': 'error', 'elapsed_s': elapsed, 'error': str(e)}
+            continue
+        cache.put(key, result)
+        yield {'store_id': store_id, 'status': 'ok', 'cache_hit': False, 'elapsed_s': elapsed, 'result': result}
+
+
+def heat_zones(result):
+    return [row['zone'] for row in result.get('heat_zone_summary', [])
+            if row['heat_zone_probability'] > HEAT_ZONE_PROBABILITY]
+
+
+def summarize(records):
+    """Cross-store totals from the per-store records yielded by run_batch"""
+    succeeded = [r for r in records if r['status'] == 'ok']
+    ranking = sorted(
+        ({'store_id': r['store_id'], 'heat_zones': heat_zones(r['result'])} for r in succeeded),
+        key=lambda entry: (-len(entry['heat_zones']), entry['store_id']),
+    )
+    return {
+        'stores': len(records),
+        'succeeded': len(succeeded),
+        'failed': [r['store_id'] for r in records if r['status'] != 'ok'],
+        'total_simulated_energy_usage': float(sum(r['result']['simulated_energy_usage'] for r in succeeded)),
+        'top_heat_zone_stores': [dict(entry, heat_zone_count=len(entry['heat_zones']))
+                                 for entry in ranking[:TOP_HEAT_STORES]],
+    }
+
+
+def cleanup(workdir):
+    shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Compare footfall feature encodings: matrix memory, peak memory, encode and fit time
+
+Each case runs in a fresh process and encodes synthetic rows with dense
+one-hot (pd.get_dummies, the original encoding), sparse one-hot and ordinal
+codes, then fits each engine that accepts the encoding on the full matrix.
+
+Usage (from backend/):
+    python benchmarks/bench_encoding.py
+    python benchmarks/bench_encoding.py --rows 100000 --categories 10 1000 5000 --zones 8 500 --json encoding.json
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from feature_encoding import ENCODINGS  # noqa: E402
+from footfall_engines import ENGINES  # noqa: E402
+
+# Engines that accept each encoding
+ENCODING_ENGINES = {
+    'dense': ENGINES,
+    'sparse': ['random_forest'],
+    'ordinal': ENGINES,
+}
+
+
+def run_once(case):
+    """Runs in a fresh process so peak memory belongs to this encoding alone"""
+    import pandas as pd
+
+    from analysis import MODEL_PARAMS
+    from feature_encoding import encode_features, features_nbytes
+    from footfall_engines import fit
+    from synthetic import generate
+
+    df = generate(case['rows'], case['zones'], days=30, categories=case['categories'], seed=0)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df['hour'] = df['timestamp'].dt.hour
+    df['day'] = df['timestamp'].dt.day
+    df['month'] = df['timestamp'].dt.month
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    features = encode_features(df, case['encoding'])
+    encode_s = time.perf_counter() - started
+    encode_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = dict(case, encode_s=encode_s, encode_peak_mb=encode_peak / 2 ** 20,
+                  matrix_mb=features_nbytes(features['X']) / 2 ** 20,
+                  columns=len(features['feature_columns']), fit_s={})
+    for engine in ENCODING_ENGINES[case['encoding']]:
+        if engine not in case['engines']:
+            continue
+        started = time.perf_counter()
+        fit(engine, MODEL_PARAMS[engine], features['X'], features['y'], features['categorical'])
+        result['fit_s'][engine] = time.perf_counter() - started
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[50_000])
+    parser.add_argument('--categories', type=int, nargs='+', default=[8, 1000])
+    parser.add_argument('--zones', type=int, nargs='+', default=[8])
+    parser.add_argument('--encodings', nargs='+', choices=ENCODINGS, default=ENCODINGS)
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=ENGINES)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    results = []
+    print('%9s %6s %6s %-8s %8s %10s %10s %9s  %s' % (
+        'rows', 'cats', 'zones', 'encoding', 'columns', 'matrix_mb', 'encode_mb', 'encode_s', 'fit_s'))
+    for rows, categories, zones, encoding in itertools.product(args.rows, args.categories, args.zones,
+                                                              args.encodings):
+        case = {'rows': rows, 'categories': categories, 'zones': zones, 'encoding': encoding,
+                'engines': args.engines}
+        with context.Pool(1) as pool:
+            result = pool.apply(run_once, (case,))
+        results.append(result)
+        print('%9d %6d %6d %-8s %8d %10.1f %10.1f %9.3f  %s' % (
+            rows, categories, zones, encoding, result['columns'], result['matrix_mb'], result['encode_peak_mb'],
+            result['encode_s'], ' '.join('%s=%.2fs' % item for item in result['fit_s'].items())), flush=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'cpus': os.cpu_count(), 'cases': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Compare footfall model engines: fit time and accuracy as the data grows
+
+For each row count and engine this trains a model from scratch on all rows
+and, separately, trains on the oldest rows and warm-starts the model with the
+newest `--update-fraction` of them (mode=update). RMSE and R² come from the
+footfall model stage, so every engine and mode is scored the same way on a
+held-out 20% of the rows it was given.
+
+Usage (from backend/):
+    python benchmarks/bench_engines.py
+    python benchmarks/bench_engines.py --rows 10000 100000 1000000 --engines hist_gradient_boosting --json engines.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analysis import analyze  # noqa: E402
+from footfall_engines import ENGINES  # noqa: E402
+from synthetic import generate  # noqa: E402
+
+MODEL_OUTPUTS = ['rmse', 'r2_score']
+
+
+class ModelTimer:
+    """Progress callback that times the footfall model stage"""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._started = None
+
+    def __call__(self, stage):
+        if self._started is not None:
+            self.seconds += time.perf_counter() - self._started
+            self._started = None
+        if stage == 'random_forest':
+            self._started = time.perf_counter()
+
+
+def run(df, engine, models=None):
+    timer = ModelTimer()
+    result, models = analyze(df.copy(), timer, models=models, options={'engine': engine},
+                             outputs=MODEL_OUTPUTS, update=models is not None)
+    return {'fit_s': timer.seconds, 'rmse': result['rmse'], 'r2_score': result['r2_score']}, models
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--zones', type=int, default=8)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--categories', type=int, default=8)
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=ENGINES)
+    parser.add_argument('--update-fraction', type=float, default=0.2,
+                        help='newest share of the rows used for the warm-start update')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = []
+    print('%10s  %-24s %-7s %9s %9s %9s' % ('rows', 'engine', 'mode', 'fit_s', 'rmse', 'r2'))
+    for rows in args.rows:
+        df = generate(rows, args.zones, args.days, args.categories, args.seed)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        # Rows are in time order, so the newest rows form the update batch
+        split = int(len(df) * (1 - args.update_fraction))
+        history, recent = df.iloc[:split].reset_index(drop=True), df.iloc[split:].reset_index(drop=True)
+        for engine in args.engines:
+            full, _ = run(df, engine)
+            _, models = run(history, engine)
+            updated, _ = run(recent, engine, models)
+            for mode, metrics in (('full', full), ('update', updated)):
+                results.append(dict(metrics, rows=rows, engine=engine, mode=mode))
+                print('%10d  %-24s %-7s %9.3f %9.3f %9.3f' % (
+                    rows, engine, mode, metrics['fit_s'], metrics['rmse'], metrics['r2_score']))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'cpus': os.cpu_count(), 'cases': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Compare Prophet forecast settings: accuracy on held-out hours against fit and predict time
+
+The last `--horizon` hours of the hourly footfall series are held out. Every
+combination of history window, downsampling, interval mode (sampled or
+observation noise only) and warm start is fitted on the rest and scored on
+them: MAE, RMSE, MAPE and the share of held-out hours inside the forecast
+interval. Both interval modes fit the same MAP estimate, so they differ in
+predict_s and coverage rather than fit_s. Warm starts begin from a cold
+full fit made `--refit-hours` earlier, as a store's previous registered model
+would be. Run it on a store's own export (`--csv`) to pick its settings.
+
+Usage (from backend/):
+    python benchmarks/bench_forecasting.py
+    python benchmarks/bench_forecasting.py --days 90 365 --windows 0 28 56 --downsample 1 5 --json forecasting.json
+    python benchmarks/bench_forecasting.py --csv store.csv
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analysis import MODEL_PARAMS, compute_aggregates, load_csv  # noqa: E402
+from forecasting import FORECAST_INTERVALS, fit_prophet, predict_records, training_history  # noqa: E402
+from synthetic import generate  # noqa: E402
+
+
+def hourly_series(args, days):
+    if args.csv:
+        df = load_csv(args.csv)
+    else:
+        df = generate(args.rows_per_day * days, args.zones, days=days, seed=0)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return compute_aggregates(df)['hourly_footfall']
+
+
+def score(records, actual):
+    forecast = pd.DataFrame(records)
+    forecast['ds'] = pd.to_datetime(forecast['ds'])
+    joined = forecast.merge(actual, on='ds')
+    error = joined['yhat'] - joined['y']
+    nonzero = joined['y'] != 0
+    return {
+        'mae': float(error.abs().mean()),
+        'rmse': float(np.sqrt((error ** 2).mean())),
+        'mape': float((error[nonzero].abs() / joined['y'][nonzero]).mean() * 100),
+        'coverage': float(joined['y'].between(joined['yhat_lower'], joined['yhat_upper']).mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', help='score this upload instead of synthetic data (--days is ignored)')
+    parser.add_argument('--days', type=int, nargs='+', default=[90])
+    parser.add_argument('--rows-per-day', type=int, default=1000)
+    parser.add_argument('--zones', type=int, default=8)
+    parser.add_argument('--horizon', type=int, default=MODEL_PARAMS['forecast_hours'])
+    parser.add_argument('--refit-hours', type=int, default=24, help='age of the model a warm start begins from')
+    parser.add_argument('--windows', type=int, nargs='+', default=[0, 28], help='history days (0 = all)')
+    parser.add_argument('--downsample', type=int, nargs='+', default=[1, 5])
+    parser.add_argument('--intervals', nargs='+', choices=FORECAST_INTERVALS, default=FORECAST_INTERVALS)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = []
+    print('%5s %7s %10s %9s %5s %7s %8s %9s %8s %8s %7s %8s' % (
+        'days', 'window', 'downsample', 'intervals', 'warm', 'points', 'fit_s', 'predict_s', 'mae', 'rmse', 'mape',
+        'coverage'))
+    for days in ([None] if args.csv else args.days):
+        series = hourly_series(args, days)
+        cutoff = series['ds'].max() - pd.Timedelta(hours=args.horizon)
+        history, actual = series[series['ds'] <= cutoff], series[series['ds'] > cutoff]
+        start = cutoff + pd.Timedelta(hours=1)
+        previous, _ = fit_prophet(history[history['ds'] <= cutoff - pd.Timedelta(hours=args.refit_hours)],
+                                  MODEL_PARAMS['prophet'])
+        span_days = (series['ds'].max() - series['ds'].min()).days + 1
+
+        for window, downsample, intervals, warm in itertools.product(args.windows, args.downsample, args.intervals,
+                                                                     [False, True]):
+            points = training_history(history, window, downsample)
+            started = time.perf_counter()
+            model, warm_started = fit_prophet(points, MODEL_PARAMS['prophet'], intervals, previous if warm else None)
+            fit_s = time.perf_counter() - started
+            started = time.perf_counter()
+            records = predict_records(model, pd.date_range(start, periods=args.horizon, freq='h'))
+            predict_s = time.perf_counter() - started
+
+            result = dict(score(records, actual), days=span_days, window_days=window, downsample=downsample,
+                          intervals=intervals, warm_start=warm_started, points=len(points), fit_s=fit_s, predict_s=predict_s)
+            results.append(result)
+            print('%5d %7d %10d %9s %5s %7d %8.2f %9.3f %8.1f %8.1f %7.1f %8.2f' % (
+                span_days, window, downsample, intervals, 'yes' if warm_started else 'no', len(points), fit_s,
+                predict_s, result['mae'], result['rmse'], result['mape'], result['coverage']), flush=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'cpus': os.cpu_count(), 'horizon': args.horizon, 'cases': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Benchmark the full /predict pipeline stage by stage on synthetic store data
+
+Each case runs in a fresh process and records, per stage (parse, features,
+random_forest, heat_zones, rearrangement, prophet, layout, summary,
+serialize), wall time, CPU time and peak traced memory, plus the process
+peak RSS. Results are written as JSON; pass an earlier file to --compare to
+see per-stage changes between versions.
+
+Usage (from backend/):
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --rows 100000 1000000 --zones 8 50 --days 90 --json after.json
+    python benchmarks/bench_pipeline.py --rows 100000 --json after.json --compare before.json
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_csv  # noqa: E402
+
+
+class StageTimer:
+    """Progress callback that closes the previous stage whenever a new one starts"""
+
+    def __init__(self, trace_memory):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self._current = None
+
+    def __call__(self, stage):
+        self.finish()
+        self._current = stage
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def finish(self):
+        if self._current is None:
+            return
+        stage = {
+            'wall_s': time.perf_counter() - self._wall,
+            'cpu_s': time.process_time() - self._cpu,
+        }
+        if self.trace_memory:
+            stage['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        self.stages[self._current] = stage
+        self._current = None
+
+
+def run_once(case, trace_memory):
+    """Runs in a fresh process so peak RSS belongs to this case alone"""
+    import logging
+
+    from analysis import analyze_bytes
+
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    logging.getLogger('prophet').setLevel(logging.WARNING)
+    data = generate_csv(case['rows'], case['zones'], case['days'], case['categories'], seed=case['seed'])
+    if trace_memory:
+        tracemalloc.start()
+
+    timer = StageTimer(trace_memory)
+    started = time.perf_counter()
+    result = analyze_bytes(data, progress=timer, options={'zone_forecasts': case['zone_forecasts']})
+    timer('serialize')
+    body = json.dumps(result, default=str)
+    timer.finish()
+    total = time.perf_counter() - started
+
+    if trace_memory:
+        tracemalloc.stop()
+    return {
+        'total_s': total,
+        'stages': timer.stages,
+        'input_bytes': len(data),
+        'output_bytes': len(body),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_case(case, repeat, trace_memory):
+    context = multiprocessing.get_context('spawn')
+    runs = []
+    for _ in range(repeat):
+        with context.Pool(1) as pool:
+            runs.append(pool.apply(run_once, (case, trace_memory)))
+
+    # Report the median run per stage; memory is the worst seen
+    stages = {}
+    for name in runs[0]['stages']:
+        samples = [run['stages'][name] for run in runs]
+        stages[name] = {key: statistics.median(s[key] for s in samples) for key in ('wall_s', 'cpu_s')}
+        if trace_memory:
+            stages[name]['peak_traced_mb'] = max(s['peak_traced_mb'] for s in samples)
+    return dict(case,
+                total_s=statistics.median(run['total_s'] for run in runs),
+                stages=stages,
+                input_bytes=runs[0]['input_bytes'],
+                output_bytes=runs[0]['output_bytes'],
+                peak_rss_mb=max(run['peak_rss_mb'] for run in runs),
+                runs=runs)
+
+
+def environment():
+    import numpy
+    import pandas
+    import sklearn
+
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'recorded_at': datetime.now(timezone.utc).isoformat(),
+        'git_revision': revision,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'packages': {'numpy': numpy.__version__, 'pandas': pandas.__version__, 'scikit-learn': sklearn.__version__},
+    }
+
+
+def case_id(case):
+    return (case['rows'], case['zones'], case['days'], case['categories'], case['zone_forecasts'])
+
+
+def compare(results, baseline_path, threshold):
+    """Print per-stage wall time changes against an earlier run; returns the regressed cases"""
+    with open(baseline_path) as f:
+        baseline = {case_id(case): case for case in json.load(f)['cases']}
+    regressions = []
+    print('\nchange vs %s (regression threshold +%d%%)' % (baseline_path, threshold * 100))
+    for case in results:
+        before = baseline.get(case_id(case))
+        if before is None:
+            continue
+        print('  rows=%d zones=%d days=%d categories=%d' % case_id(case)[:4])
+        for name, stage in list(case['stages'].items()) + [('total', {'wall_s': case['total_s']})]:
+            old = before['stages'].get(name, {}).get('wall_s') if name != 'total' else before['total_s']
+            if not old:
+                continue
+            change = stage['wall_s'] / old - 1
+            flag = '  REGRESSION' if change > threshold and stage['wall_s'] - old > 0.01 else ''
+            print('    %-15s %9.4fs -> %9.4fs %+7.1f%%%s' % (name, old, stage['wall_s'], change * 100, flag))
+            if flag:
+                regressions.append((case_id(case), name))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--zones', type=int, nargs='+', default=[8])
+    parser.add_argument('--days', type=int, nargs='+', default=[30])
+    parser.add_argument('--categories', type=int, nargs='+', default=[8])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--zone-forecasts', action='store_true', help='also run the per-zone Prophet stage')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per case; stage times are the median')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip tracemalloc (it slows allocation-heavy stages down)')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', help='earlier --json output to compare stage times against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative slowdown reported as a regression by --compare (exit status 1)')
+    args = parser.parse_args()
+
+    results = []
+    for rows, zones, days, categories in itertools.product(args.rows, args.zones, args.days, args.categories):
+        case = {'rows': rows, 'zones': zones, 'days': days, 'categories': categories,
+                'seed': args.seed, 'zone_forecasts': args.zone_forecasts}
+        case = run_case(case, args.repeat, trace_memory=not args.no_memory)
+        results.append(case)
+        print('rows=%d zones=%d days=%d categories=%d  total %.3fs  peak RSS %.0f MB' % (
+            rows, zones, days, categories, case['total_s'], case['peak_rss_mb']))
+        for name, stage in case['stages'].items():
+            print('  %-15s %9.4fs wall %9.4fs cpu %s' % (
+                name, stage['wall_s'], stage['cpu_s'],
+                '%9.1f MB peak' % stage['peak_traced_mb'] if 'peak_traced_mb' in stage else ''))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'environment': environment(), 'cases': results}, f, indent=2)
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
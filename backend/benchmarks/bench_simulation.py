@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Measure layout simulation throughput: candidates per second, cold and with cached zone blocks
+
+Trains a footfall model on synthetic rows, builds the store profile the
+registry would save with it, then scores batches of random move sets. The
+cold pass starts from an empty block cache; the warm pass repeats the batch.
+
+Usage (from backend/):
+    python benchmarks/bench_simulation.py
+    python benchmarks/bench_simulation.py --zones 8 50 --candidates 100 1000 --json simulation.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from footfall_engines import ENGINES  # noqa: E402
+
+
+def train(rows, zones, engine):
+    import pandas as pd
+
+    from analysis import MODEL_PARAMS, add_time_features
+    from feature_encoding import default_encoding, encode_features
+    from footfall_engines import fit
+    from simulation import build_profile
+    from synthetic import generate
+
+    df = generate(rows, zones, days=30, seed=0)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    add_time_features(df)
+    features = encode_features(df, default_encoding(engine, df))
+    return {
+        'footfall': fit(engine, MODEL_PARAMS[engine], features['X'], features['y'], features['categorical']),
+        'feature_columns': features['feature_columns'],
+        'engine': engine,
+        'encoding': features['encoding'],
+        'vocabulary': features['vocabulary'],
+        'profile': build_profile(df),
+    }
+
+
+def candidates(zones, count, max_moves, seed):
+    rng = random.Random(seed)
+    names = ['Z%d' % (i + 1) for i in range(zones)]
+    return [{'moves': [dict(zip(('from_zone', 'to_zone'), rng.sample(names, 2)))
+                       for _ in range(rng.randint(1, max_moves))]} for _ in range(count)]
+
+
+def main():
+    from simulation import LayoutSimulator
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--zones', type=int, nargs='+', default=[8, 50])
+    parser.add_argument('--candidates', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--moves', type=int, default=3, help='maximum moves per candidate')
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=ENGINES)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = []
+    print('%-24s %6s %10s %8s %10s %10s %12s' % (
+        'engine', 'zones', 'candidates', 'blocks', 'cold_s', 'warm_s', 'cold_per_s'))
+    for engine, zones in itertools.product(args.engines, args.zones):
+        models = train(args.rows, zones, engine)
+        for count in args.candidates:
+            batch = candidates(zones, count, args.moves, seed=count)
+            simulator = LayoutSimulator(models)
+            started = time.perf_counter()
+            simulator.simulate(batch)
+            cold_s = time.perf_counter() - started
+            started = time.perf_counter()
+            simulator.simulate(batch)
+            warm_s = time.perf_counter() - started
+            result = {'engine': engine, 'zones': zones, 'candidates': count, 'blocks': len(simulator._blocks),
+                      'cold_s': cold_s, 'warm_s': warm_s}
+            results.append(result)
+            print('%-24s %6d %10d %8d %10.3f %10.3f %12.0f' % (
+                engine, zones, count, result['blocks'], cold_s, warm_s, count / cold_s), flush=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'cpus': os.cpu_count(), 'rows': args.rows, 'cases': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorised zone analytics against the original row-wise implementation
+
+Rearrangement moves are now assigned globally, so they are checked against
+the original greedy moves for the same sources and products rather than
+the same targets. --assignment-zones times the assignment solver alone on
+stores where half of the zones are penalised refrigeration zones.
+
+Usage (from backend/):
+    python benchmarks/bench_zone_analytics.py
+    python benchmarks/bench_zone_analytics.py --rows 100000 1000000 --zones 4 100 500 --json out.json
+    python benchmarks/bench_zone_analytics.py --rows --assignment-zones 100 500 1000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analysis import REFRIGERATION_ZONES, compute_aggregates  # noqa: E402
+from synthetic import generate  # noqa: E402
+from zone_analytics import (  # noqa: E402
+    MAX_CAPACITY, MAX_SAFE_TRAFFIC, TRAFFIC_IMPACT_FACTOR,
+    detailed_zone_suggestions, rearrangement_suggestions,
+)
+
+
+def make_rows(rows, zones, seed=0):
+    df = generate(rows, zones, days=90, categories=7, seed=seed)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df
+
+
+# --- Original implementation, kept as the reference for timing and output checks ---
+
+def legacy_zone_traffic(df):
+    df = df.copy()
+    df['is_refrigeration'] = df['zone_id'].isin(REFRIGERATION_ZONES).astype(int)
+    df['proximity_penalty'] = df.apply(
+        lambda row: row['footfall'] * 2 if row['is_refrigeration'] == 1 and row['footfall'] > 60 else 0,
+        axis=1
+    )
+    zone_traffic = df.groupby('zone_id')['footfall'].mean().reset_index()
+    zone_traffic.columns = ['zone', 'traffic_score']
+    total_penalty = df.groupby('zone_id')['proximity_penalty'].sum().reset_index()
+    total_penalty = total_penalty.rename(columns={'zone_id': 'zone'})
+    return zone_traffic.merge(total_penalty, on='zone', how='left').fillna(0)
+
+
+def legacy_rearrangement(df, zone_traffic):
+    suggestions = []
+    for _, row in zone_traffic[zone_traffic['proximity_penalty'] > 0].iterrows():
+        current_zone = row['zone']
+        available_zones = zone_traffic[~zone_traffic['zone'].isin(REFRIGERATION_ZONES + [current_zone])]
+        if not available_zones.empty:
+            target = available_zones.loc[available_zones['traffic_score'].idxmin()]
+            new_target_traffic = target['traffic_score'] + row['traffic_score'] * TRAFFIC_IMPACT_FACTOR
+            if new_target_traffic > MAX_CAPACITY:
+                kind = 'exceeds_capacity'
+            elif new_target_traffic > MAX_SAFE_TRAFFIC:
+                kind = 'warning'
+            else:
+                kind = 'safe'
+            suggestions.append({
+                'from_zone': current_zone,
+                'to_zone': target['zone'],
+                'penalty': row['proximity_penalty'],
+                'product': df[df['zone_id'] == current_zone]['product_category'].mode()[0],
+                'type': kind,
+            })
+    return suggestions
+
+
+def legacy_detailed(df, zone_traffic):
+    suggestions = []
+    for zone in sorted(df['zone_id'].unique()):
+        zone_traffic_row = zone_traffic[zone_traffic['zone'] == zone]
+        traffic = zone_traffic_row['traffic_score'].iloc[0] if not zone_traffic_row.empty else 0
+        target_zone = None
+        if traffic > 50 and zone not in REFRIGERATION_ZONES and zone in ['Z3', 'Z4']:
+            min_traffic = float('inf')
+            for z in [z for z in df['zone_id'].unique() if z not in REFRIGERATION_ZONES + [zone]]:
+                z_traffic_row = zone_traffic[zone_traffic['zone'] == z]
+                if not z_traffic_row.empty and z_traffic_row['traffic_score'].iloc[0] < min_traffic:
+                    min_traffic = z_traffic_row['traffic_score'].iloc[0]
+                    target_zone = z
+        suggestions.append({'zone': zone, 'predicted_footfall': float(traffic), 'target': target_zone})
+    return suggestions
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, time.perf_counter() - start
+
+
+def run_case(rows, zones, legacy):
+    df = make_rows(rows, zones)
+    case = {'rows': rows, 'zones': zones}
+
+    aggregates, case['aggregates_s'] = timed(compute_aggregates, df)
+    zone_traffic = aggregates['zone_traffic']
+    (moves, unassigned), case['rearrangement_s'] = timed(rearrangement_suggestions, zone_traffic, aggregates['zone_products'], REFRIGERATION_ZONES)
+    detailed, case['detailed_s'] = timed(detailed_zone_suggestions, aggregates['zones'], zone_traffic, REFRIGERATION_ZONES)
+
+    if legacy:
+        legacy_traffic, case['legacy_zone_traffic_s'] = timed(legacy_zone_traffic, df)
+        legacy_moves, case['legacy_rearrangement_s'] = timed(legacy_rearrangement, df, legacy_traffic)
+        legacy_details, case['legacy_detailed_s'] = timed(legacy_detailed, df, legacy_traffic)
+        pd.testing.assert_frame_equal(legacy_traffic, zone_traffic, check_dtype=False)
+        assert [(m['from_zone'], m['product']) for m in moves + unassigned] == \
+               [(m['from_zone'], m['product']) for m in legacy_moves]
+        assert len({m['to_zone'] for m in moves}) == len(moves)
+        assert [d['predicted_footfall'] for d in detailed] == [d['predicted_footfall'] for d in legacy_details]
+    return case
+
+
+def run_assignment_case(zones, seed=0):
+    """Rearrangement on `zones` zones, the first half penalised refrigeration zones"""
+    rng = np.random.default_rng(seed)
+    names = ['Z%d' % (i + 1) for i in range(zones)]
+    refrigeration = names[:zones // 2]
+    zone_traffic = pd.DataFrame({
+        'zone': names,
+        'traffic_score': rng.uniform(20, 90, zones),
+        'proximity_penalty': [100.0] * len(refrigeration) + [0.0] * (zones - len(refrigeration)),
+    })
+    zone_products = {name: ['Category'] for name in names}
+    positions = {name: tuple(rng.uniform(0, 1000, 2)) for name in names}
+    (moves, unassigned), seconds = timed(rearrangement_suggestions, zone_traffic, zone_products, refrigeration, positions)
+    assert len({m['to_zone'] for m in moves}) == len(moves)
+    kinds = pd.Series([m['type'] for m in moves]).value_counts().to_dict()
+    return {'zones': zones, 'moves': len(moves), 'unassigned': len(unassigned), 'assignment_s': seconds, 'types': kinds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='*', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--zones', type=int, nargs='+', default=[4, 50, 200, 500])
+    parser.add_argument('--legacy-max-rows', type=int, default=100_000,
+                        help='skip the (slow) original implementation above this many rows')
+    parser.add_argument('--assignment-zones', type=int, nargs='*', default=[100, 500],
+                        help='zone counts for the rearrangement assignment timing')
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    results = []
+    header = '%10s %6s %12s %12s %12s %14s %14s' % ('rows', 'zones', 'aggregates', 'rearrange', 'detailed',
+                                                  'legacy_traffic', 'legacy_detail')
+    print(header)
+    for rows in args.rows:
+        for zones in args.zones:
+            case = run_case(rows, zones, legacy=rows <= args.legacy_max_rows)
+            results.append(case)
+            print('%10d %6d %11.4fs %11.4fs %11.4fs %13s %13s' % (
+                rows, zones, case['aggregates_s'], case['rearrangement_s'], case['detailed_s'],
+                '%.4fs' % case['legacy_zone_traffic_s'] if 'legacy_zone_traffic_s' in case else '-',
+                '%.4fs' % case['legacy_detailed_s'] if 'legacy_detailed_s' in case else '-',
+            ))
+
+    for zones in args.assignment_zones:
+        case = run_assignment_case(zones)
+        results.append(case)
+        print('assignment zones=%d moves=%d %.4fs %s' % (zones, case['moves'], case['assignment_s'], case['types']))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
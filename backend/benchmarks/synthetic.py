@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Synthetic store sensor data in the upload schema, for benchmarks at production scale
+
+Usage (from backend/):
+    python benchmarks/synthetic.py --rows 1000000 --zones 50 --days 90 --categories 12 -o big.csv
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['timestamp', 'zone_id', 'footfall', 'zone_temp', 'sales_volume', 'phase', 'product_category', 'day_of_week']
+# Blueprint categories first so small runs map onto the sample layout
+BASE_CATEGORIES = ['Dairy', 'Meat', 'Produce', 'Bakery', 'Grocery', 'Electronics', 'Shoes', 'Pharmacy',
+                   'Health & Beauty', 'Frozen', 'Drinks', 'Vegetables']
+
+
+def category_names(categories):
+    names = BASE_CATEGORIES[:categories]
+    return names + ['Category %d' % (i + 1) for i in range(categories - len(names))]
+
+
+def generate(rows, zones=8, days=30, categories=8, seed=0, start='2024-01-01'):
+    """Rows spread over `days` with hourly and per-zone footfall patterns.
+
+    Each zone has a dominant product category and a base popularity; footfall
+    peaks around midday and early evening, and temperature rises with footfall.
+    Z1 and Z2 are chilled, like the refrigeration zones in sample_data.csv.
+    """
+    rng = np.random.default_rng(seed)
+    zone_ids = np.array(['Z%d' % (i + 1) for i in range(zones)])
+    names = np.array(category_names(categories))
+
+    seconds = np.sort(rng.integers(0, days * 24 * 3600, rows))
+    timestamp = pd.Timestamp(start) + pd.to_timedelta(seconds, unit='s')
+    hour = (seconds // 3600) % 24
+    zone = rng.integers(0, zones, rows)
+
+    popularity = rng.uniform(0.6, 1.4, zones)
+    daily_shape = 35 + 25 * np.exp(-((hour - 13) ** 2) / 8) + 20 * np.exp(-((hour - 18) ** 2) / 6)
+    footfall = np.clip(rng.normal(daily_shape * popularity[zone], 8), 0, None).round().astype(int)
+
+    # 70% of a zone's rows belong to its dominant category, the rest are random
+    dominant = rng.integers(0, categories, zones)
+    category = np.where(rng.random(rows) < 0.7, dominant[zone], rng.integers(0, categories, rows))
+
+    return pd.DataFrame({
+        'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+        'zone_id': zone_ids[zone],
+        'footfall': footfall,
+        'zone_temp': (np.where(zone < 2, 2.0, 18.0) + footfall * 0.05 + rng.normal(0, 1.5, rows)).round(1),
+        'sales_volume': (footfall * rng.uniform(8, 25, rows)).round().astype(int),
+        'phase': np.select([hour < 12, hour < 17], ['morning', 'afternoon'], 'evening'),
+        'product_category': names[category],
+        'day_of_week': timestamp.day_name(),
+    }, columns=COLUMNS)
+
+
+def generate_csv(rows, zones=8, days=30, categories=8, seed=0):
+    """The same data as `generate`, encoded like an uploaded CSV"""
+    return generate(rows, zones, days, categories, seed).to_csv(index=False).encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--zones', type=int, default=8)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--categories', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help='CSV file to write (default: stdout)')
+    args = parser.parse_args()
+
+    df = generate(args.rows, args.zones, args.days, args.categories, args.seed)
+    df.to_csv(args.output or sys.stdout, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Streaming, schema-typed CSV parsing with one-pass aggregates and bounded memory
+"""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from analysis import check_columns
+from ingest_store import ROLLUP_KEYS, aggregates_from_rollups, coarsen_rollup, merge_rollups, product_counts, rollup_rows
+
+# Declared upload schema: categoricals for the repeated labels, 32-bit floats
+# for the measures (NaN-safe), and a fixed timestamp format
+CSV_DTYPES = {
+    'zone_id': 'category',
+    'phase': 'category',
+    'product_category': 'category',
+    'day_of_week': 'category',
+    'footfall': 'float32',
+    'zone_temp': 'float32',
+    'sales_volume': 'float32',
+}
+CATEGORICAL_COLUMNS = [col for col, dtype in CSV_DTYPES.items() if dtype == 'category']
+TIMESTAMP_FORMAT = os.environ.get('INNOAISLE_TIMESTAMP_FORMAT', '%Y-%m-%d %H:%M:%S')
+CHUNK_ROWS = int(os.environ.get('INNOAISLE_STREAM_CHUNK_ROWS', 100_000))
+# Rows kept (uniformly sampled) for the model stages; aggregates always see every row
+SAMPLE_ROWS = int(os.environ.get('INNOAISLE_STREAM_SAMPLE_ROWS', 200_000))
+
+
+class HashingReader:
+    """File-like wrapper that hashes bytes as they are read, so the cache key
+    is known once parsing finishes without holding the upload in memory"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._digest = hashlib.sha256()
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self._digest.update(data)
+        self.bytes_read += len(data)
+        return data
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+
+def parse_timestamps(values):
+    try:
+        return pd.to_datetime(values, format=TIMESTAMP_FORMAT)
+    except ValueError:
+        # Not in the declared format: fall back to (slower) ISO 8601 parsing
+        return pd.to_datetime(values, format='ISO8601')
+
+
+class StreamingAggregator:
+    """Folds chunks into hourly/daily rollups and keeps a bounded uniform row sample"""
+
+    def __init__(self, sample_rows=SAMPLE_ROWS, seed=42):
+        self.sample_rows = sample_rows
+        self.rows = 0
+        self._rng = np.random.default_rng(seed)
+        self._sample = None
+        self._pending = {'hourly': [], 'daily': [], 'products': []}
+        self._rollups = {'hourly': None, 'daily': None, 'products': None}
+        self._keys = {'hourly': ROLLUP_KEYS, 'daily': ROLLUP_KEYS, 'products': ['zone_id', 'product_category']}
+
+    def add(self, chunk):
+        self.rows += len(chunk)
+        hourly = rollup_rows(chunk, 'h')
+        self._add_rollup('hourly', hourly)
+        self._add_rollup('daily', coarsen_rollup(hourly, 'D'))
+        self._add_rollup('products', product_counts(chunk))
+        self._add_sample(chunk)
+
+    def _add_rollup(self, name, update):
+        pending = self._pending[name]
+        pending.append(update)
+        compacted = self._rollups[name]
+        # Compact once the partial rollups outgrow the compacted one (amortised O(rows))
+        if sum(len(part) for part in pending) > max(100_000, len(compacted) if compacted is not None else 0):
+            self._compact(name)
+
+    def _compact(self, name):
+        pending = self._pending[name]
+        if not pending:
+            return
+        combined = pd.concat(pending, ignore_index=True)
+        self._rollups[name] = merge_rollups(self._rollups[name], combined, self._keys[name])
+        self._pending[name] = []
+
+    def _add_sample(self, chunk):
+        # Priority sampling: keep the rows with the largest random keys
+        chunk = chunk.assign(_key=self._rng.random(len(chunk)))
+        if self._sample is not None:
+            chunk = pd.concat([self._sample, chunk], ignore_index=True)
+        if len(chunk) > self.sample_rows:
+            chunk = chunk.nlargest(self.sample_rows, '_key')
+        for col in CATEGORICAL_COLUMNS:
+            if col in chunk and chunk[col].dtype != 'category':
+                chunk[col] = chunk[col].astype('category')
+        self._sample = chunk
+
+    def sample(self):
+        """The retained rows in timestamp order"""
+        if self._sample is None:
+            raise ValueError('CSV contains no rows')
+        return self._sample.drop(columns='_key').sort_values('timestamp').reset_index(drop=True)
+
+    def aggregates(self):
+        for name in self._rollups:
+            self._compact(name)
+        return aggregates_from_rollups(self._rollups['hourly'], self._rollups['daily'], self._rollups['products'])
+
+
+def stream_csv(source, chunk_rows=CHUNK_ROWS, sample_rows=SAMPLE_ROWS):
+    """Parse a CSV file-like in chunks; returns (sample_rows_df, aggregates, total_rows)"""
+    aggregator = StreamingAggregator(sample_rows=sample_rows)
+    for chunk in pd.read_csv(source, dtype=CSV_DTYPES, chunksize=chunk_rows):
+        check_columns(chunk)
+        chunk['timestamp'] = parse_timestamps(chunk['timestamp'])
+        aggregator.add(chunk)
+    return aggregator.sample(), aggregator.aggregates(), aggregator.rows
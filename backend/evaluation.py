@@ -0,0 +1,182 @@
+"""
+Time-ordered model evaluation: rolling-origin cross-validation folds fitted across a process pool
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import footfall_engines
+from analysis import MODEL_PARAMS, add_time_features, compute_aggregates
+from feature_encoding import default_encoding, encode_features
+from forecasting import fit_prophet, forecast_options, predict_records, training_history
+
+CV_MODELS = ['footfall', 'prophet']
+CV_FOLDS = int(os.environ.get('INNOAISLE_CV_FOLDS', 5))
+MAX_CV_FOLDS = 20
+# Share of the time span every fold trains on before the first test window
+CV_INITIAL_FRACTION = 0.5
+
+
+def validate_folds(folds):
+    try:
+        folds = int(CV_FOLDS if folds is None else folds)
+    except (TypeError, ValueError):
+        raise ValueError('folds must be an integer')
+    if not 2 <= folds <= MAX_CV_FOLDS:
+        raise ValueError('folds must be between 2 and %d' % MAX_CV_FOLDS)
+    return folds
+
+
+def validate_models(models):
+    models = CV_MODELS if not models else [name.strip() for name in models.split(',') if name.strip()]
+    unknown = [name for name in models if name not in CV_MODELS]
+    if unknown or not models:
+        raise ValueError('models must be a comma-separated subset of: %s' % ', '.join(CV_MODELS))
+    return models
+
+
+def rolling_origin_folds(timestamps, folds, initial_fraction=CV_INITIAL_FRACTION):
+    """(origin, end) of each fold's test window, in time order.
+
+    The span after the first `initial_fraction` of the data is cut into
+    `folds` consecutive hour-aligned windows. Fold i trains on everything
+    before its origin and is tested on [origin, end), so no fold sees the
+    future of its test rows.
+    """
+    first, last = timestamps.min(), timestamps.max()
+    start = (first + (last - first) * initial_fraction).floor('h')
+    end = last.floor('h') + pd.Timedelta(hours=1)
+    edges = [(start + (end - start) * i / folds).floor('h') for i in range(folds)] + [end]
+    windows = list(zip(edges[:-1], edges[1:]))
+    if start <= first or any(origin >= end for origin, end in windows):
+        raise ValueError('Not enough history for %d time-ordered folds; upload a longer period or use fewer folds'
+                         % folds)
+    return windows
+
+
+def _footfall_fold(train, test, engine, encoding):
+    """Runs in a worker process: fit the footfall regressor on one fold's training rows"""
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    train, test = add_time_features(train.copy()), add_time_features(test.copy())
+    started = time.perf_counter()
+    features = encode_features(train, encoding or default_encoding(engine, train))
+    model = footfall_engines.fit(engine, MODEL_PARAMS[engine], features['X'], features['y'],
+                                 features['categorical'])
+    fit_s = time.perf_counter() - started
+    started = time.perf_counter()
+    test_features = encode_features(test, features['encoding'], features['vocabulary'], features['feature_columns'])
+    predicted = model.predict(test_features['X'])
+    predict_s = time.perf_counter() - started
+    actual = test_features['y']
+    return {
+        'rmse': float(mean_squared_error(actual, predicted) ** 0.5),
+        'mae': float(mean_absolute_error(actual, predicted)),
+        'r2_score': float(r2_score(actual, predicted)) if len(actual) > 1 else None,
+        'fit_s': fit_s,
+        'predict_s': predict_s,
+    }
+
+
+def _prophet_fold(train, test, forecast):
+    """Runs in a worker process: fit Prophet on one fold's hourly footfall"""
+    started = time.perf_counter()
+    history = training_history(train, forecast['window_days'], forecast['downsample'])
+    model, _ = fit_prophet(history, MODEL_PARAMS['prophet'], forecast['intervals'])
+    fit_s = time.perf_counter() - started
+    started = time.perf_counter()
+    predicted = pd.DataFrame(predict_records(model, test['ds']))
+    predict_s = time.perf_counter() - started
+    actual = test['y'].to_numpy()
+    error = predicted['yhat'].to_numpy() - actual
+    nonzero = actual != 0
+    return {
+        'rmse': float(np.sqrt((error ** 2).mean())),
+        'mae': float(np.abs(error).mean()),
+        'mape': float((np.abs(error[nonzero]) / actual[nonzero]).mean() * 100) if nonzero.any() else None,
+        'coverage': float(((actual >= predicted['yhat_lower']) & (actual <= predicted['yhat_upper'])).mean()),
+        'fit_s': fit_s,
+        'predict_s': predict_s,
+    }
+
+
+def _aggregate(folds):
+    """Mean and standard deviation of each metric across folds, plus total fit time"""
+    folds = [fold for fold in folds if 'metrics' in fold]
+    if not folds:
+        return None
+    metrics = {}
+    for name in folds[0]['metrics']:
+        values = [fold['metrics'][name] for fold in folds if fold['metrics'][name] is not None]
+        if values:
+            metrics[name] = {'mean': float(np.mean(values)), 'std': float(np.std(values))}
+    metrics['fit_s_total'] = float(sum(fold['metrics']['fit_s'] for fold in folds))
+    return metrics
+
+
+def cross_validate(df, executor, cache, cache_key, folds=None, models=None, options=None):
+    """Rolling-origin cross-validation of the footfall regressor and/or Prophet.
+
+    Every (model, fold) pair not found in `cache` under cache_key(params) is
+    fitted in `executor`; cached folds cost nothing, so re-evaluating
+    unchanged data with the same settings only reads the cache. The keys
+    depend on the data, fold count and only the options the model uses.
+    Returns per-fold metrics and timings plus their aggregates per model; a
+    fold whose fit fails carries an `error` instead and is left out of them.
+    """
+    started = time.perf_counter()
+    options = options or {}
+    folds = validate_folds(folds)
+    models = models or CV_MODELS
+    forecast = options.get('forecast') or forecast_options()
+    engine = options.get('engine', footfall_engines.DEFAULT_ENGINE)
+    windows = rolling_origin_folds(df['timestamp'], folds)
+    hourly = compute_aggregates(df)['hourly_footfall'] if 'prophet' in models else None
+
+    pending = []
+    records = []
+    for model in models:
+        settings = {'engine': engine, 'encoding': options.get('encoding')} if model == 'footfall' else forecast
+        for i, (origin, end) in enumerate(windows):
+            frame = df if model == 'footfall' else hourly
+            time_column = 'timestamp' if model == 'footfall' else 'ds'
+            train = frame[frame[time_column] < origin]
+            test = frame[(frame[time_column] >= origin) & (frame[time_column] < end)]
+            record = {
+                'model': model,
+                'fold': i,
+                'train_rows': len(train),
+                'test_rows': len(test),
+                'test_start': str(origin),
+                'test_end': str(end),
+            }
+            key = cache_key({'cv': {'folds': folds, 'fold': i, 'model': model, 'settings': settings}})
+            cached = cache.get(key)
+            if cached is not None:
+                record.update(metrics=cached, cache_hit=True)
+            elif model == 'footfall':
+                pending.append((record, key, executor.submit(_footfall_fold, train, test, engine,
+                                                             options.get('encoding'))))
+            else:
+                pending.append((record, key, executor.submit(_prophet_fold, train, test, forecast)))
+            records.append(record)
+
+    for record, key, future in pending:
+        try:
+            record.update(metrics=future.result(), cache_hit=False)
+        except Exception as e:
+            print('%s fold %d failed:' % (record['model'], record['fold']), str(e))
+            record.update(error=str(e), cache_hit=False)
+            continue
+        cache.put(key, record['metrics'])
+
+    return {
+        'folds': records,
+        'aggregate': {model: _aggregate([r for r in records if r['model'] == model]) for model in models},
+        'fold_count': folds,
+        'cache_hits': sum(record['cache_hit'] for record in records),
+        'elapsed_s': time.perf_counter() - started,
+    }
@@ -0,0 +1,120 @@
+"""
+Footfall model features: dense or sparse one-hot, or ordinal codes for native categorical support
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ['phase', 'product_category', 'day_of_week', 'zone_id']
+# Columns that are neither features nor categories
+EXCLUDED_COLUMNS = ['timestamp', 'footfall']
+ENCODINGS = ['dense', 'sparse', 'ordinal']
+# Unset: ordinal codes for gradient boosting, which splits them natively, and
+# one-hot for the random forest, sparse once there are SPARSE_MIN_LEVELS levels
+FEATURE_ENCODING = os.environ.get('INNOAISLE_FEATURE_ENCODING')
+# Below this many one-hot columns the forest fits faster on the dense matrix
+# (benchmarks/bench_encoding.py); above it sparse is faster and far smaller
+SPARSE_MIN_LEVELS = 500
+# Histogram gradient boosting handles categorical features with at most this
+# many levels (its max_bins); larger ones are split on their codes as numbers
+MAX_NATIVE_CATEGORIES = 255
+
+
+def validate_encoding(encoding):
+    if encoding not in ENCODINGS:
+        raise ValueError('encoding must be one of: %s' % ', '.join(ENCODINGS))
+    return encoding
+
+
+def default_encoding(engine, df):
+    if FEATURE_ENCODING:
+        return FEATURE_ENCODING
+    if engine == 'hist_gradient_boosting':
+        return 'ordinal'
+    levels = sum(df[col].nunique() for col in CATEGORICAL_COLUMNS)
+    return 'sparse' if levels >= SPARSE_MIN_LEVELS else 'dense'
+
+
+def _numeric_columns(df):
+    return [col for col in df.columns if col not in CATEGORICAL_COLUMNS and col not in EXCLUDED_COLUMNS]
+
+
+def encode_features(df, encoding, vocabulary=None, feature_columns=None):
+    """Encode `df` for the footfall model.
+
+    Returns a dict with:
+      encoding        as passed
+      X               DataFrame (dense, ordinal) or CSR matrix (sparse)
+      y               footfall
+      categories      the original categorical columns, row-aligned with X
+      feature_columns column names of X
+      vocabulary      {column: levels}, used to encode later uploads the same way
+      categorical     per-column flags for native categorical support (ordinal only)
+
+    Pass the `vocabulary` and `feature_columns` of a registered model to
+    score new rows: unseen levels are dropped (one-hot) or missing (ordinal).
+    """
+    validate_encoding(encoding)
+    categories = df[CATEGORICAL_COLUMNS].astype('category')
+    features = {'encoding': encoding, 'y': df['footfall'], 'categories': categories, 'categorical': None}
+
+    if encoding == 'dense':
+        # One-hot encode categorical features. Against a registered model's
+        # columns every level is kept: dropping the first level present in
+        # these rows would lose a column the model was trained with whenever
+        # its own first level is missing from them
+        df_encoded = pd.get_dummies(df, columns=CATEGORICAL_COLUMNS, drop_first=feature_columns is None)
+        X = df_encoded.drop(columns=EXCLUDED_COLUMNS)
+        if 'zone_temp' not in X.columns:
+            X['zone_temp'] = df['zone_temp']
+        if 'sales_volume' not in X.columns:
+            X['sales_volume'] = df['sales_volume']
+        if feature_columns is not None:
+            # Unseen dummy columns are dropped and missing ones filled with 0
+            X = X.reindex(columns=feature_columns, fill_value=0)
+        features.update(X=X, feature_columns=list(X.columns), vocabulary=None)
+        return features
+
+    if vocabulary is None:
+        vocabulary = {col: categories[col].cat.categories.tolist() for col in CATEGORICAL_COLUMNS}
+    # Level codes per column; -1 marks levels missing from the vocabulary
+    codes = {col: pd.Categorical(df[col], categories=vocabulary[col]).codes for col in CATEGORICAL_COLUMNS}
+    numeric = _numeric_columns(df)
+
+    if encoding == 'sparse':
+        from scipy import sparse
+
+        # Same columns and values as the dense get_dummies(drop_first=True) matrix
+        blocks = [sparse.csr_matrix(df[numeric].to_numpy(dtype=np.float32))]
+        names = list(numeric)
+        rows = np.arange(len(df))
+        for col in CATEGORICAL_COLUMNS:
+            levels = vocabulary[col][1:]
+            present = codes[col] >= 1
+            blocks.append(sparse.csr_matrix(
+                (np.ones(present.sum(), dtype=np.float32), (rows[present], codes[col][present] - 1)),
+                shape=(len(df), len(levels)),
+            ))
+            names.extend('%s_%s' % (col, level) for level in levels)
+        X = sparse.hstack(blocks, format='csr')
+        if feature_columns is not None and names != list(feature_columns):
+            raise ValueError('Sparse features do not match the registered model; retrain it')
+        features.update(X=X, feature_columns=names, vocabulary=vocabulary)
+        return features
+
+    X = df[numeric].copy()
+    for col in CATEGORICAL_COLUMNS:
+        X[col] = np.where(codes[col] >= 0, codes[col], np.nan).astype(np.float32)
+    features.update(X=X, feature_columns=list(X.columns), vocabulary=vocabulary,
+                    categorical=[col in CATEGORICAL_COLUMNS and len(vocabulary[col]) <= MAX_NATIVE_CATEGORIES
+                                 for col in X.columns])
+    return features
+
+
+def features_nbytes(X):
+    """Memory held by an encoded feature matrix"""
+    if hasattr(X, 'memory_usage'):
+        return int(X.memory_usage(deep=True).sum())
+    return int(X.data.nbytes + X.indices.nbytes + X.indptr.nbytes)
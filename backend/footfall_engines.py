@@ -0,0 +1,103 @@
+"""
+Footfall regressors: a parallel random forest or histogram gradient boosting, with warm-start updates
+"""
+
+import copy
+import os
+
+ENGINES = ['random_forest', 'hist_gradient_boosting']
+DEFAULT_ENGINE = os.environ.get('INNOAISLE_FOOTFALL_ENGINE', 'random_forest')
+# Cores used by random forest fits and predictions (-1 = all). Only the
+# single-process dev server keeps all of them by default: gunicorn workers
+# split the cores (see gunicorn.conf.py) and pool workers use one each.
+MODEL_JOBS = int(os.environ.get('INNOAISLE_MODEL_JOBS', -1))
+
+# Trees fitted on each update's rows; beyond the cap the oldest trees are
+# dropped, so the forest follows the most recent uploads
+UPDATE_TREES = 25
+MAX_TREES = 300
+# Boosting iterations fitted on the residuals of each update's rows
+UPDATE_ITERATIONS = 50
+
+
+def set_model_jobs(jobs):
+    """Use `jobs` cores per fit in this process, unless INNOAISLE_MODEL_JOBS is set"""
+    global MODEL_JOBS
+    if 'INNOAISLE_MODEL_JOBS' not in os.environ:
+        MODEL_JOBS = jobs
+
+
+def pool_worker_init():
+    """ProcessPoolExecutor initializer: the pool already runs a fit per core"""
+    set_model_jobs(1)
+
+
+def validate_engine(engine):
+    if engine not in ENGINES:
+        raise ValueError('engine must be one of: %s' % ', '.join(ENGINES))
+    return engine
+
+
+class ResidualBoosting:
+    """A gradient boosting model plus corrections fitted to later uploads' residuals.
+
+    HistGradientBoostingRegressor's own warm start re-bins the training data,
+    which only works when it is the same data, so updates are stacked instead.
+    """
+
+    def __init__(self, base, corrections=()):
+        self.base = base
+        self.corrections = list(corrections)
+
+    def predict(self, X):
+        prediction = self.base.predict(X)
+        for correction in self.corrections:
+            prediction = prediction + correction.predict(X)
+        return prediction
+
+
+def _boosting(params, X, categorical):
+    from sklearn.ensemble import HistGradientBoostingRegressor
+
+    if hasattr(X, 'tocsc'):
+        raise ValueError('hist_gradient_boosting needs dense or ordinal features, not encoding=sparse')
+    # Ordinal category codes (see feature_encoding) are split on natively
+    return HistGradientBoostingRegressor(**dict(params, categorical_features=categorical))
+
+
+def fit(engine, params, X, y, categorical=None):
+    """Train a new footfall regressor; `params` are MODEL_PARAMS[engine].
+
+    `categorical` flags the columns of X holding category codes.
+    """
+    validate_engine(engine)
+    if engine == 'hist_gradient_boosting':
+        return _boosting(params, X, categorical).fit(X, y)
+    from sklearn.ensemble import RandomForestRegressor
+
+    return RandomForestRegressor(n_jobs=MODEL_JOBS, **params).fit(X, y)
+
+
+def update(engine, params, model, X, y, categorical=None):
+    """Return a copy of `model` updated with only the rows in X, y.
+
+    The random forest grows UPDATE_TREES trees on the new rows (warm start);
+    gradient boosting fits UPDATE_ITERATIONS iterations to the residuals of
+    the current model on them. `model` itself is left untouched, since the
+    registry may be serving it to other requests.
+    """
+    validate_engine(engine)
+    if engine == 'hist_gradient_boosting':
+        if not isinstance(model, ResidualBoosting):
+            model = ResidualBoosting(model)
+        correction = _boosting(dict(params, max_iter=UPDATE_ITERATIONS), X, categorical)
+        correction.fit(X, y - model.predict(X))
+        return ResidualBoosting(model.base, model.corrections + [correction])
+
+    model = copy.deepcopy(model)
+    model.set_params(warm_start=True, n_jobs=MODEL_JOBS, n_estimators=len(model.estimators_) + UPDATE_TREES)
+    model.fit(X, y)
+    if len(model.estimators_) > MAX_TREES:
+        model.estimators_ = model.estimators_[-MAX_TREES:]
+        model.set_params(n_estimators=MAX_TREES)
+    return model
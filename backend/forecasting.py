@@ -0,0 +1,261 @@
+"""
+Prophet footfall forecasts: bounded training history, warm starts, cached predictions and per-zone fits
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+import pandas as pd
+
+# How forecast intervals are made: 'sampled' simulates trend changes and noise
+# (Prophet's default); 'noise' uses the fitted observation noise only
+FORECAST_INTERVALS = ['sampled', 'noise']
+# Defaults of the forecast= options of /predict (see forecast_options)
+FORECAST_WINDOW_DAYS = int(os.environ.get('INNOAISLE_FORECAST_WINDOW_DAYS', 0))
+FORECAST_DOWNSAMPLE = int(os.environ.get('INNOAISLE_FORECAST_DOWNSAMPLE', 1))
+FORECAST_INTERVAL_MODE = os.environ.get('INNOAISLE_FORECAST_INTERVALS', 'sampled')
+# Hours older than this many days before the last observation are downsampled
+FORECAST_FULL_RESOLUTION_DAYS = int(os.environ.get('INNOAISLE_FORECAST_FULL_RESOLUTION_DAYS', 28))
+# Forecasts kept in memory, keyed by fitted model and forecast start
+FORECAST_CACHE_ITEMS = int(os.environ.get('INNOAISLE_FORECAST_CACHE_ITEMS', 64))
+# Normal quantile of Prophet's default 80% interval, for intervals='noise'
+_INTERVAL_Z = 1.2816
+
+ZONE_FORECAST_TIMEOUT = float(os.environ.get('INNOAISLE_ZONE_FORECAST_TIMEOUT', 60))
+# Zones with fewer hourly observations than this skip Prophet and use the fallback
+ZONE_MIN_HISTORY_HOURS = int(os.environ.get('INNOAISLE_ZONE_MIN_HISTORY_HOURS', 48))
+# (executor provider, workers) zone fits are submitted to; see set_zone_executor
+_zone_executor = None
+
+
+def _future_index(series, horizon):
+    return pd.date_range(series['ds'].max() + pd.Timedelta(hours=1), periods=horizon, freq='h')
+
+
+def _records(ds, yhat, lower, upper):
+    return pd.DataFrame({
+        'ds': ds.astype(str),
+        'yhat': yhat,
+        'yhat_lower': lower,
+        'yhat_upper': upper,
+    }).to_dict(orient='records')
+
+
+def fallback_forecast(series, horizon):
+    """Seasonal-naive forecast: mean and spread of the zone's footfall per hour of day"""
+    future = _future_index(series, horizon)
+    by_hour = series.groupby(series['ds'].dt.hour)['y'].agg(['mean', 'std'])
+    overall_mean = series['y'].mean()
+    mean = by_hour['mean'].reindex(future.hour).fillna(overall_mean).to_numpy()
+    spread = by_hour['std'].reindex(future.hour).fillna(0).to_numpy()
+    return _records(future, mean, mean - 1.28 * spread, mean + 1.28 * spread)
+
+
+def forecast_options(window_days=None, downsample=None, intervals=None, warm_start=False):
+    """Validated Prophet settings; unset values take the INNOAISLE_FORECAST_* defaults.
+
+    window_days  train on the last this many days of history only (0 = all)
+    downsample   keep every n-th hour of history older than FORECAST_FULL_RESOLUTION_DAYS
+    intervals    'sampled' simulates trend changes and noise for the intervals;
+                 'noise' skips that sampling and uses the fitted observation
+                 noise. The fit itself (a MAP estimate) is the same for both
+    warm_start   initialise the fit from the store's registered Prophet model
+    """
+    try:
+        window_days = int(FORECAST_WINDOW_DAYS if window_days is None else window_days)
+        downsample = int(FORECAST_DOWNSAMPLE if downsample is None else downsample)
+    except (TypeError, ValueError):
+        raise ValueError('forecast_window_days and forecast_downsample must be integers')
+    if window_days < 0 or downsample < 1:
+        raise ValueError('forecast_window_days must be >= 0 and forecast_downsample >= 1')
+    intervals = intervals or FORECAST_INTERVAL_MODE
+    if intervals not in FORECAST_INTERVALS:
+        raise ValueError('forecast_intervals must be one of: %s' % ', '.join(FORECAST_INTERVALS))
+    return {'window_days': window_days, 'downsample': downsample, 'intervals': intervals,
+            'warm_start': bool(warm_start)}
+
+
+def training_history(series, window_days=0, downsample=1, full_resolution_days=FORECAST_FULL_RESOLUTION_DAYS):
+    """The (ds, y) points Prophet is fitted on.
+
+    Keeps the last `window_days` days (0 = all) and, before the last
+    `full_resolution_days`, only hours whose index is a multiple of
+    `downsample`. With a downsample sharing no factor with 24 (5, 7, 11...)
+    the kept hours still cycle through every hour of the day and week.
+    """
+    last = series['ds'].max()
+    if window_days:
+        series = series[series['ds'] > last - pd.Timedelta(days=window_days)]
+    if downsample > 1:
+        hours = (series['ds'] - pd.Timestamp(0)) // pd.Timedelta(hours=1)
+        recent = series['ds'] > last - pd.Timedelta(days=full_resolution_days)
+        series = series[recent | (hours % downsample == 0)]
+    return series.reset_index(drop=True)
+
+
+def warm_start_params(model):
+    """A fitted model's parameters in the form Prophet.fit(init=...) takes"""
+    params = {name: model.params[name][0][0] for name in ['k', 'm', 'sigma_obs']}
+    params.update({name: model.params[name][0] for name in ['delta', 'beta']})
+    return params
+
+
+def fit_prophet(series, prophet_params, intervals='sampled', init=None):
+    """Fit Prophet on `series`, warm-started from the fitted model `init` if given.
+
+    Returns (model, warm_started). Prophet's trend parameters are relative
+    to the first history timestamp, so `init` is only used when the history
+    still starts there (no window, or the window has not moved); a warm
+    start that does not match the new model (e.g. a different number of
+    changepoints) also falls back to a cold fit.
+    """
+    from prophet import Prophet
+
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    if intervals == 'noise':
+        prophet_params = dict(prophet_params, uncertainty_samples=0)
+    if init is not None and init.start == series['ds'].min():
+        try:
+            return Prophet(**prophet_params).fit(series, init=warm_start_params(init)), True
+        except Exception as e:
+            print('Prophet warm start failed, fitting from scratch:', str(e))
+    return Prophet(**prophet_params).fit(series), False
+
+
+def predict_records(model, ds):
+    forecast = model.predict(pd.DataFrame({'ds': ds}))
+    yhat = forecast['yhat'].to_numpy()
+    if 'yhat_lower' in forecast:
+        return _records(forecast['ds'], yhat, forecast['yhat_lower'].to_numpy(), forecast['yhat_upper'].to_numpy())
+    # No interval samples: the interval is the fitted observation noise
+    spread = _INTERVAL_Z * float(np.ravel(model.params['sigma_obs'])[0]) * model.y_scale
+    return _records(forecast['ds'], yhat, yhat - spread, yhat + spread)
+
+
+def _fingerprint(model):
+    digest = hashlib.sha1()
+    for name in sorted(model.params):
+        digest.update(name.encode('utf-8'))
+        digest.update(np.ascontiguousarray(model.params[name]).tobytes())
+    digest.update(repr((model.start, model.t_scale, model.y_scale, model.uncertainty_samples,
+                        model.interval_width)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ForecastCache:
+    """Prophet predictions keyed by the fitted model's parameters, scaling and the forecast range.
+
+    Refitting on unchanged history, or scoring several uploads that end at
+    the same hour with a registered model, reuses the earlier forecast
+    instead of predicting (and sampling intervals) again.
+    """
+
+    def __init__(self, items=FORECAST_CACHE_ITEMS):
+        self.items = items
+        self._forecasts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def forecast(self, model, start, horizon):
+        """Records for the `horizon` hours from `start`"""
+        key = (_fingerprint(model), str(start), horizon)
+        with self._lock:
+            if key in self._forecasts:
+                self._forecasts.move_to_end(key)
+                return list(self._forecasts[key])
+        records = predict_records(model, pd.date_range(start, periods=horizon, freq='h'))
+        with self._lock:
+            self._forecasts[key] = records
+            while len(self._forecasts) > self.items:
+                self._forecasts.popitem(last=False)
+        return list(records)
+
+
+def _fit_zone(series, horizon, prophet_params, forecast=None):
+    """Fit Prophet on one zone's hourly footfall (in a pool worker, or inline when serial)"""
+    forecast = forecast or forecast_options()
+    history = training_history(series, forecast['window_days'], forecast['downsample'])
+    model, _ = fit_prophet(history, prophet_params, forecast['intervals'])
+    return predict_records(model, _future_index(series, horizon))
+
+
+def set_zone_executor(provider, workers):
+    """Fit zones in the executor `provider()` returns, `workers` at a time.
+
+    Servers pass their shared process pool. Without one, and inside pool
+    worker processes (job, batch or evaluation workers), zones are fitted
+    one after another in the calling process instead of in a nested pool.
+    """
+    global _zone_executor
+    _zone_executor = (provider, workers)
+
+
+def _in_pool_worker():
+    return multiprocessing.parent_process() is not None
+
+
+def zone_forecasts(zone_hourly, horizon, prophet_params, timeout=ZONE_FORECAST_TIMEOUT,
+                   min_history=ZONE_MIN_HISTORY_HOURS, forecast=None):
+    """Forecast `horizon` hours per zone from a (zone_id, ds, y) frame.
+
+    Zones are fitted in the executor given to set_zone_executor, or serially
+    (see there). Each zone gets `timeout` seconds once its turn comes; zones
+    with short history, failed fits or timeouts fall back to the
+    seasonal-naive forecast instead of holding up the batch. A fit that
+    times out in the executor still runs to completion there, and serial
+    fits cannot be interrupted, so serial zones whose turn comes after the
+    time budget are not started. `forecast` (see forecast_options) bounds
+    each zone's training history.
+    """
+    results = {}
+    pending = []
+    for zone, series in zone_hourly.groupby('zone_id', observed=True, sort=True):
+        series = series[['ds', 'y']].reset_index(drop=True)
+        if len(series) < min_history:
+            results[zone] = {'method': 'fallback', 'reason': 'insufficient_history',
+                             'forecast': fallback_forecast(series, horizon)}
+        else:
+            pending.append((zone, series))
+
+    if not pending:
+        return results
+
+    serial = _zone_executor is None or _in_pool_worker()
+    workers = 1 if serial else _zone_executor[1]
+    wave = max(1, min(workers, len(pending)))
+    started = time.monotonic()
+    if serial:
+        futures = [(zone, series, None) for zone, series in pending]
+    else:
+        executor = _zone_executor[0]()
+        futures = [(zone, series, executor.submit(_fit_zone, series, horizon, prophet_params, forecast))
+                   for zone, series in pending]
+    for i, (zone, series, future) in enumerate(futures):
+        # Zones run in waves of `workers`; zone i's deadline is the end of its wave
+        deadline = started + timeout * (i // wave + 1)
+        try:
+            if future is None:
+                # Serial fits cannot be interrupted, so a zone whose turn is past the budget is not started
+                if i and time.monotonic() > started + timeout * i:
+                    raise FutureTimeoutError()
+                records = _fit_zone(series, horizon, prophet_params, forecast)
+            else:
+                records = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            results[zone] = {'method': 'prophet', 'forecast': records}
+        except FutureTimeoutError:
+            if future is not None:
+                # Only frees the slot if the fit has not started yet
+                future.cancel()
+            results[zone] = {'method': 'fallback', 'reason': 'timeout',
+                             'forecast': fallback_forecast(series, horizon)}
+        except Exception as e:
+            print('Zone %s forecast failed:' % zone, str(e))
+            results[zone] = {'method': 'fallback', 'reason': 'fit_failed',
+                             'forecast': fallback_forecast(series, horizon)}
+    return results
@@ -0,0 +1,58 @@
+"""
+Gunicorn settings for the production backend
+
+Usage (from backend/):
+    python -m gunicorn -c gunicorn.conf.py app:app
+
+or `python start_servers.py --mode production` from the repository root.
+Send SIGHUP to the master to replace the workers gracefully (e.g. after a
+deploy) and SIGTERM to stop; in-flight requests get `graceful_timeout`
+seconds to finish.
+"""
+
+import os
+
+# Read by app.py when the master preloads it: no debugger, no reloader
+os.environ.setdefault('INNOAISLE_ENV', 'production')
+
+bind = os.environ.get('INNOAISLE_BIND', '127.0.0.1:5000')
+# Analyses are CPU-bound: one process per core, threads for the I/O-bound endpoints
+workers = int(os.environ.get('INNOAISLE_WORKERS', os.cpu_count() or 1))
+threads = int(os.environ.get('INNOAISLE_THREADS', 4))
+worker_class = 'gthread'
+# A worker whose main loop stops answering the master for this long is killed
+# and replaced. Under gthread this is a hang check, not a request deadline:
+# requests are bounded by INNOAISLE_REQUEST_TIMEOUT in app.py
+timeout = int(os.environ.get('INNOAISLE_WORKER_TIMEOUT', 300))
+graceful_timeout = int(os.environ.get('INNOAISLE_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+# Recycle workers after this many requests (0 = never), staggered by the jitter
+max_requests = int(os.environ.get('INNOAISLE_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+# Load the app in the master so workers are forked with it already imported
+preload_app = True
+accesslog = '-'
+
+
+def when_ready(server):
+    # Runs in the master before the first worker is forked: import sklearn and
+    # Prophet once so every worker shares those pages instead of loading its own
+    from analysis import warm_up
+
+    warm_up(log=server.log.info, fit=False)
+
+
+def post_fork(server, worker):
+    # Split the cores between the workers instead of letting each fit, and each
+    # worker's batch and job pools, use all of them
+    from footfall_engines import set_model_jobs
+    from app import size_pools, start_warmup
+
+    cores = max(1, (os.cpu_count() or 1) // server.num_workers)
+    set_model_jobs(cores)
+    size_pools(cores)
+
+    # The warm-up thread must start after the fork; threads do not survive it
+
+    start_warmup()
@@ -0,0 +1,249 @@
+"""
+Append-only columnar store for sensor rows with incrementally maintained per-zone rollups
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from analysis import check_columns, proximity_penalty
+from model_registry import validate_store_id
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialised within a process
+    fcntl = None
+
+ROLLUP_KEYS = ['zone_id', 'period']
+ROLLUP_VALUES = ['rows', 'footfall_sum', 'zone_temp_sum', 'zone_temp_count', 'sales_volume_sum', 'penalty_sum']
+# Content hashes of recent appends, used to ignore re-submitted payloads
+_SEEN_KEYS_LIMIT = 256
+
+
+def rollup_rows(df, freq):
+    """Sum the rollup measures of raw rows per zone and `freq` period ('h' or 'D')"""
+    frame = pd.DataFrame({
+        'zone_id': df['zone_id'].astype(str),
+        'period': df['timestamp'].dt.floor(freq),
+        'rows': 1,
+        'footfall_sum': df['footfall'].astype(float),
+        'zone_temp_sum': df['zone_temp'].astype(float).fillna(0) if 'zone_temp' in df else 0.0,
+        'zone_temp_count': df['zone_temp'].notna().astype(int) if 'zone_temp' in df else 0,
+        'sales_volume_sum': df['sales_volume'].astype(float).fillna(0) if 'sales_volume' in df else 0.0,
+        'penalty_sum': proximity_penalty(df['zone_id'], df['footfall']).astype(float),
+    })
+    return frame.groupby(ROLLUP_KEYS, as_index=False, observed=True)[ROLLUP_VALUES].sum()
+
+
+def coarsen_rollup(rollup, freq):
+    """Re-aggregate a rollup to a coarser period, e.g. hourly to daily"""
+    coarse = rollup.assign(period=rollup['period'].dt.floor(freq))
+    return coarse.groupby(ROLLUP_KEYS, as_index=False, observed=True)[ROLLUP_VALUES].sum()
+
+
+def merge_rollups(existing, update, keys):
+    """Add `update` into `existing`; only the keys present in either are touched"""
+    if existing is None or existing.empty:
+        return update.reset_index(drop=True)
+    values = [col for col in update.columns if col not in keys]
+    return pd.concat([existing, update], ignore_index=True).groupby(keys, as_index=False)[values].sum()
+
+
+def aggregates_from_rollups(hourly, daily, products=None):
+    """Build the analysis.compute_aggregates() structure from rollup frames.
+
+    All values are exact except Z4's high-traffic hours, which compare
+    hourly means (rather than single rows) with the zone's overall mean.
+    """
+    per_zone = daily.groupby('zone_id')[ROLLUP_VALUES].sum()
+    zone_traffic = pd.DataFrame({
+        'zone': per_zone.index,
+        'traffic_score': (per_zone['footfall_sum'] / per_zone['rows']).values,
+        'proximity_penalty': per_zone['penalty_sum'].values,
+    })
+    zone_temp_mean = (per_zone['zone_temp_sum'] / per_zone['zone_temp_count'].replace(0, np.nan)).to_dict()
+
+    hourly_footfall = hourly.groupby('period', as_index=False)['footfall_sum'].sum()
+    hourly_footfall.columns = ['ds', 'y']
+    zone_hourly_footfall = hourly[['zone_id', 'period', 'footfall_sum']].rename(columns={'period': 'ds', 'footfall_sum': 'y'})
+    zone_hourly_footfall = zone_hourly_footfall.sort_values(['zone_id', 'ds']).reset_index(drop=True)
+
+    zone_products = {}
+    if products is not None:
+        products = products.sort_values(['zone_id', 'count', 'product_category'], ascending=[True, False, True])
+        zone_products = products.groupby('zone_id')['product_category'].agg(list).to_dict()
+
+    high_traffic_times = []
+    z4 = hourly[hourly['zone_id'] == 'Z4']
+    if not z4.empty:
+        z4_mean = z4['footfall_sum'].sum() / z4['rows'].sum()
+        busy = z4[z4['footfall_sum'] / z4['rows'] > z4_mean]
+        high_traffic_times = busy['period'].dt.hour.value_counts().head(3).index.tolist()
+
+    return {
+        'zones': list(per_zone.index),
+        'zone_traffic': zone_traffic,
+        'hourly_footfall': hourly_footfall,
+        'zone_hourly_footfall': zone_hourly_footfall,
+        'zone_products': zone_products,
+        'zone_temp_mean': zone_temp_mean,
+        'z4_high_traffic_hours': high_traffic_times,
+    }
+
+
+def product_counts(df):
+    """Row counts per zone and product category"""
+    counts = df.groupby(['zone_id', 'product_category'], observed=True).size().reset_index(name='count')
+    counts[['zone_id', 'product_category']] = counts[['zone_id', 'product_category']].astype(str)
+    return counts
+
+
+def _read_parquet(path):
+    try:
+        return pd.read_parquet(path)
+    except OSError:
+        return None
+
+
+def _write_parquet(df, path):
+    tmp_path = '%s.%s.tmp' % (path, uuid.uuid4().hex)
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+class IngestStore:
+    """Per-store layout under <root>/<store_id>/:
+
+    rows/date=YYYY-MM-DD/part-*.parquet   raw rows, one part per append and day
+    rollups/hourly/month=YYYY-MM.parquet  per zone and hour, split by month
+    rollups/daily.parquet                 per zone and day
+    rollups/products.parquet              row counts per zone and product category
+    meta.json                             revision counter and totals
+
+    An append only reads and rewrites the rollup partitions its rows fall
+    into, so its cost follows the size of the append, not of the history.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _store_dir(self, store_id):
+        return os.path.join(self.root, validate_store_id(store_id))
+
+    def _lock_for(self, store_id):
+        with self._locks_guard:
+            return self._locks.setdefault(store_id, threading.Lock())
+
+    def meta(self, store_id):
+        path = os.path.join(self._store_dir(store_id), 'meta.json')
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except OSError:
+            return {'store_id': store_id, 'revision': 0, 'total_rows': 0, 'seen_keys': []}
+
+    def revision(self, store_id):
+        return self.meta(store_id)['revision']
+
+    def append(self, store_id, df, content_key=None):
+        """Append raw rows and fold them into the rollups; returns a summary dict"""
+        df = check_columns(df).copy()
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+
+        store_dir = self._store_dir(store_id)
+        os.makedirs(store_dir, exist_ok=True)
+        with self._lock_for(store_id):
+            handle = open(os.path.join(store_dir, '.lock'), 'w')
+            try:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_EX)
+                meta = self.meta(store_id)
+                if content_key is not None and content_key in meta['seen_keys']:
+                    return dict(self._summary(meta), appended_rows=0, duplicate=True)
+                self._append_rows(store_dir, df)
+                self._update_rollups(store_dir, df)
+                meta['revision'] += 1
+                meta['total_rows'] += len(df)
+                meta['last_append_at'] = time.time()
+                if content_key is not None:
+                    meta['seen_keys'] = (meta['seen_keys'] + [content_key])[-_SEEN_KEYS_LIMIT:]
+                with open(os.path.join(store_dir, 'meta.json.tmp'), 'w') as f:
+                    json.dump(meta, f)
+                os.replace(os.path.join(store_dir, 'meta.json.tmp'), os.path.join(store_dir, 'meta.json'))
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+                handle.close()
+        return dict(self._summary(meta), appended_rows=len(df), duplicate=False)
+
+    def _summary(self, meta):
+        return {'store_id': meta['store_id'], 'revision': meta['revision'], 'total_rows': meta['total_rows']}
+
+    def _append_rows(self, store_dir, df):
+        part = 'part-%d-%s.parquet' % (time.time_ns(), uuid.uuid4().hex[:8])
+        for day, rows in df.groupby(df['timestamp'].dt.strftime('%Y-%m-%d')):
+            partition_dir = os.path.join(store_dir, 'rows', 'date=%s' % day)
+            os.makedirs(partition_dir, exist_ok=True)
+            _write_parquet(rows, os.path.join(partition_dir, part))
+
+    def _update_rollups(self, store_dir, df):
+        rollup_dir = os.path.join(store_dir, 'rollups')
+        hourly_dir = os.path.join(rollup_dir, 'hourly')
+        os.makedirs(hourly_dir, exist_ok=True)
+
+        hourly = rollup_rows(df, 'h')
+        for month, update in hourly.groupby(hourly['period'].dt.strftime('%Y-%m')):
+            path = os.path.join(hourly_dir, 'month=%s.parquet' % month)
+            _write_parquet(merge_rollups(_read_parquet(path), update, ROLLUP_KEYS), path)
+
+        path = os.path.join(rollup_dir, 'daily.parquet')
+        _write_parquet(merge_rollups(_read_parquet(path), coarsen_rollup(hourly, 'D'), ROLLUP_KEYS), path)
+
+        if 'product_category' in df:
+            path = os.path.join(rollup_dir, 'products.parquet')
+            _write_parquet(merge_rollups(_read_parquet(path), product_counts(df), ['zone_id', 'product_category']), path)
+
+    def rollup(self, store_id, name):
+        """Return the 'hourly', 'daily' or 'products' rollup as a DataFrame (None if empty)"""
+        rollup_dir = os.path.join(self._store_dir(store_id), 'rollups')
+        if name == 'hourly':
+            hourly_dir = os.path.join(rollup_dir, 'hourly')
+            if not os.path.isdir(hourly_dir):
+                return None
+            parts = [_read_parquet(os.path.join(hourly_dir, f)) for f in sorted(os.listdir(hourly_dir))
+                     if f.endswith('.parquet')]
+            return pd.concat(parts, ignore_index=True) if parts else None
+        if name not in ('daily', 'products'):
+            raise ValueError('Unknown rollup %r' % name)
+        return _read_parquet(os.path.join(rollup_dir, name + '.parquet'))
+
+    def recent_rows(self, store_id, days=7):
+        """Raw rows of the last `days` ingested calendar days"""
+        rows_dir = os.path.join(self._store_dir(store_id), 'rows')
+        if not os.path.isdir(rows_dir):
+            return None
+        partitions = sorted(name for name in os.listdir(rows_dir) if name.startswith('date='))[-days:]
+        parts = []
+        for partition in partitions:
+            partition_dir = os.path.join(rows_dir, partition)
+            parts.extend(_read_parquet(os.path.join(partition_dir, f)) for f in sorted(os.listdir(partition_dir))
+                         if f.endswith('.parquet'))
+        if not parts:
+            return None
+        return pd.concat(parts, ignore_index=True).sort_values('timestamp')
+
+    def aggregates(self, store_id):
+        """Build the analysis.compute_aggregates() structure from the rollups"""
+        daily = self.rollup(store_id, 'daily')
+        hourly = self.rollup(store_id, 'hourly')
+        if daily is None or hourly is None:
+            return None
+        return aggregates_from_rollups(hourly, daily, self.rollup(store_id, 'products'))
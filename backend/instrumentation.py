@@ -0,0 +1,184 @@
+"""
+Per-stage timing and a small Prometheus-format metrics registry
+"""
+
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Seconds; covers cache hits (milliseconds) up to large uploads (minutes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = None
+
+
+def rss_bytes():
+    """Current resident set size, or the peak where /proc is unavailable"""
+    if _PAGE_SIZE is not None:
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * _PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            pass
+    if resource is None:
+        return 0
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class StageRecorder:
+    """Progress callback that times each stage until the next one starts.
+
+    Records wall time, process CPU time (including joblib and other worker
+    threads) and the change in process RSS per stage, plus input sizes
+    reported through `annotate`. CPU time and RSS are process-wide, so
+    concurrent requests blur them.
+
+    With a `deadline` (seconds), starting a stage after it has passed raises
+    DeadlineExceeded, so a request overruns it by at most one stage.
+    """
+
+    def __init__(self, deadline=None):
+        self.started = time.perf_counter()
+        self.deadline = deadline
+        self.stages = {}
+        self.sizes = {}
+        self._current = None
+
+    def __call__(self, stage):
+        self.finish()
+        if self.deadline and time.perf_counter() - self.started > self.deadline:
+            raise DeadlineExceeded('Request exceeded its %gs deadline before the %s stage' % (self.deadline, stage))
+        self._current = stage
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._rss = rss_bytes()
+
+    def annotate(self, **sizes):
+        self.sizes.update(sizes)
+
+    def finish(self):
+        if self._current is None:
+            return
+        rss = rss_bytes()
+        stage = self.stages.setdefault(self._current, {'wall_ms': 0.0, 'cpu_ms': 0.0, 'rss_delta_mb': 0.0})
+        stage['wall_ms'] += (time.perf_counter() - self._wall) * 1000
+        stage['cpu_ms'] += (time.process_time() - self._cpu) * 1000
+        stage['rss_delta_mb'] += (rss - self._rss) / 2 ** 20
+        stage['rss_mb'] = rss / 2 ** 20
+        self._current = None
+
+    def summary(self):
+        self.finish()
+        return {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'stages': {name: {key: round(value, 3) for key, value in stage.items()}
+                       for name, stage in self.stages.items()},
+            'input': dict(self.sizes),
+        }
+
+
+def server_timing(summary):
+    """Server-Timing response header value for a StageRecorder summary"""
+    entries = ['%s;dur=%.1f' % (name, stage['wall_ms']) for name, stage in summary['stages'].items()]
+    entries.append('total;dur=%.1f' % summary['total_ms'])
+    return ', '.join(entries)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (name, _escape(value)) for name, value in pairs)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help), '# TYPE %s counter' % self.name]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append('%s%s %s' % (self.name, _labels(self.labels, key), repr(float(value))))
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self._lock:
+            series = self._series.setdefault(key, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help), '# TYPE %s histogram' % self.name]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series['buckets']):
+                    lines.append('%s_bucket%s %d' % (self.name, _labels(self.labels, key, [('le', repr(float(bound)))]), count))
+                lines.append('%s_bucket%s %d' % (self.name, _labels(self.labels, key, [('le', '+Inf')]), series['count']))
+                lines.append('%s_sum%s %s' % (self.name, _labels(self.labels, key), repr(series['sum'])))
+                lines.append('%s_count%s %d' % (self.name, _labels(self.labels, key), series['count']))
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
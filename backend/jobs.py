@@ -0,0 +1,278 @@
+"""
+Background job manager: runs analyses in a bounded pool of worker processes
+"""
+
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from footfall_engines import pool_worker_init
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+_JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _write_json(path, value):
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'w') as f:
+        json.dump(value, f, default=str)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class _ProgressReporter:
+    """Picklable progress callback that writes into a manager-backed dict"""
+
+    def __init__(self, job_id, shared, path=None):
+        self.job_id = job_id
+        self.shared = shared
+        self.path = path
+
+    def __call__(self, stage):
+        progress = {'stage': stage, 'updated_at': time.time()}
+        self.shared[self.job_id] = progress
+        if self.path is not None:
+            _write_json(self.path, progress)
+
+
+def _run_in_worker(fn, args, kwargs, reporter):
+    return fn(*args, progress=reporter, **kwargs)
+
+
+class JobManager:
+    """Queues jobs and dispatches at most `max_workers` of them to worker processes.
+
+    Jobs wait in our own queue until a worker is free, so a queued job can
+    always be cancelled. Finished jobs are kept for `retention_seconds`.
+
+    With `state_dir`, job snapshots and progress are also written to disk so
+    that other server processes sharing the directory can report on them;
+    only the process that accepted a job can cancel it.
+    """
+
+    def __init__(self, max_workers=2, retention_seconds=3600, stages=None, state_dir=None):
+        self.max_workers = max_workers
+        self.retention_seconds = retention_seconds
+        self.stages = list(stages or [])
+        self.state_dir = state_dir
+        if state_dir is not None:
+            os.makedirs(state_dir, exist_ok=True)
+        self._jobs = {}
+        self._pending = deque()
+        self._running = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._manager = None
+        self._progress = None
+
+    def _ensure_pool(self):
+        # Created lazily so importing the app never forks worker processes
+        if self._executor is None:
+            self._manager = multiprocessing.Manager()
+            self._progress = self._manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=pool_worker_init)
+
+    def _replace_pool(self, broken):
+        # A worker that died (e.g. killed for memory) breaks the whole pool and
+        # every later submit would fail, so start a new one; once per broken pool
+        if self._executor is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=pool_worker_init)
+
+    def submit(self, fn, args, kwargs=None, on_success=None):
+        """Queue fn(*args, progress=..., **kwargs) and return the new job id"""
+        job_id = uuid.uuid4().hex
+        job = {
+            'job_id': job_id,
+            'status': QUEUED,
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None,
+            '_call': (fn, args, kwargs or {}, on_success),
+        }
+        with self._lock:
+            self._purge_expired()
+            self._ensure_pool()
+            self._jobs[job_id] = job
+            self._pending.append(job_id)
+            self._persist(job)
+            self._dispatch()
+        return job_id
+
+    def complete(self, result):
+        """Record an already-available result (e.g. a cache hit) as a finished job"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._purge_expired()
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'status': SUCCEEDED,
+                'submitted_at': now,
+                'started_at': now,
+                'finished_at': now,
+                'result': result,
+                'error': None,
+                '_call': None,
+            }
+            self._persist(self._jobs[job_id])
+        return job_id
+
+    def _dispatch(self):
+        while self._pending and self._running < self.max_workers:
+            job = self._jobs[self._pending.popleft()]
+            fn, args, kwargs, _ = job['_call']
+            job['status'] = RUNNING
+            job['started_at'] = time.time()
+            self._running += 1
+            self._persist(job)
+            reporter = _ProgressReporter(job['job_id'], self._progress, self._state_path(job['job_id'], 'progress'))
+            try:
+                future = self._executor.submit(_run_in_worker, fn, args, kwargs, reporter)
+            except BrokenProcessPool:
+                self._replace_pool(self._executor)
+                future = self._executor.submit(_run_in_worker, fn, args, kwargs, reporter)
+            future.add_done_callback(
+                lambda f, job_id=job['job_id'], executor=self._executor: self._on_done(job_id, f, executor))
+
+    def _on_done(self, job_id, future, executor=None):
+        on_success = None
+        result = None
+        with self._lock:
+            self._running -= 1
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job['finished_at'] = time.time()
+                try:
+                    result = future.result()
+                    job['status'] = SUCCEEDED
+                    job['result'] = result
+                    on_success = job['_call'][3]
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool):
+                        self._replace_pool(executor)
+                    print('Job %s failed:' % job_id, str(e))
+                    print('Traceback:', ''.join(traceback.format_exception(type(e), e, e.__traceback__)))
+                    job['status'] = FAILED
+                    job['error'] = str(e)
+                job['_call'] = None
+                self._persist(job)
+            self._progress.pop(job_id, None)
+            self._dispatch()
+        if on_success is not None:
+            on_success(result)
+
+    def cancel(self, job_id):
+        """Cancel a queued job; returns False if it is already running or finished"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] != QUEUED:
+                return False
+            self._pending.remove(job_id)
+            job['status'] = CANCELLED
+            job['finished_at'] = time.time()
+            job['_call'] = None
+            self._persist(job)
+            return True
+
+    def get(self, job_id, include_result=True):
+        """Return a JSON-serialisable snapshot of the job, or None if unknown"""
+        with self._lock:
+            self._purge_expired()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return self._get_persisted(job_id, include_result)
+            snapshot = {k: v for k, v in job.items() if not k.startswith('_') and k != 'result'}
+            if job['status'] == QUEUED:
+                snapshot['queue_position'] = list(self._pending).index(job_id)
+            progress = self._progress.get(job_id) if self._progress is not None else None
+        snapshot['progress'] = self._progress_block(job['status'], progress)
+        if include_result and job['status'] == SUCCEEDED:
+            snapshot['result'] = job['result']
+        return snapshot
+
+    def _state_path(self, job_id, kind='json'):
+        if self.state_dir is None:
+            return None
+        return os.path.join(self.state_dir, '%s.%s' % (job_id, kind))
+
+    def _persist(self, job):
+        if self.state_dir is not None:
+            _write_json(self._state_path(job['job_id']), {k: v for k, v in job.items() if not k.startswith('_')})
+
+    def _remove_persisted(self, job_id):
+        for kind in ('json', 'progress'):
+            path = self._state_path(job_id, kind)
+            try:
+                if path is not None:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _get_persisted(self, job_id, include_result):
+        """Snapshot of a job accepted by another process sharing state_dir"""
+        if self.state_dir is None or not _JOB_ID.match(job_id):
+            return None
+        snapshot = _read_json(self._state_path(job_id))
+        if snapshot is None:
+            return None
+        if snapshot['status'] in FINISHED_STATES and snapshot['finished_at'] < time.time() - self.retention_seconds:
+            self._remove_persisted(job_id)
+            return None
+        progress = _read_json(self._state_path(job_id, 'progress'))
+        snapshot['progress'] = self._progress_block(snapshot['status'], progress)
+        if not include_result or snapshot['status'] != SUCCEEDED:
+            snapshot.pop('result', None)
+        return snapshot
+
+    def _progress_block(self, status, progress):
+        stage = progress['stage'] if progress else None
+        if status == SUCCEEDED:
+            completed = list(self.stages)
+        elif stage in self.stages:
+            completed = self.stages[:self.stages.index(stage)]
+        else:
+            completed = []
+        total = len(self.stages) or 1
+        return {
+            'stage': stage,
+            'completed_stages': completed,
+            'percent': round(100.0 * len(completed) / total, 1),
+        }
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['status'] in FINISHED_STATES and job['finished_at'] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+            self._remove_persisted(job_id)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
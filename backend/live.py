@@ -0,0 +1,324 @@
+"""
+Live sensor readings: per-zone sliding windows with incremental heat and cooling signals
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # Windows: updates are only serialised within a process
+    fcntl = None
+
+from analysis import BASE_COOLING_ENERGY, COOLING_FACTOR, HEAT_FOOTFALL_THRESHOLD, HEAT_ZONE_PROBABILITY
+
+# Readings kept per zone (360 = 30 minutes at one reading every 5 seconds)
+LIVE_WINDOW = int(os.environ.get('INNOAISLE_LIVE_WINDOW', 360))
+# Seconds between keep-alive comments on idle event streams
+HEARTBEAT_SECONDS = 15
+# Update events kept per store for streams that fall behind
+EVENT_BACKLOG = 256
+# Seconds between checks of the shared reading logs by open event streams
+LIVE_POLL_SECONDS = float(os.environ.get('INNOAISLE_LIVE_POLL_SECONDS', 0.5))
+# A store's log is compacted once it holds this many times the readings its windows keep
+LOG_COMPACT_FACTOR = 4
+
+FIELDS = ('footfall', 'zone_temp', 'sales_volume')
+
+
+class ZoneWindow:
+    """Ring buffer of one zone's latest readings.
+
+    Running sums and the count of readings above the heat threshold are
+    updated as readings enter and leave, so a reading costs O(1) however
+    large the window is. The sums are recomputed each time the buffer wraps
+    to stop floating-point drift.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.values = {field: [0.0] * size for field in FIELDS}
+        self.sums = dict.fromkeys(FIELDS, 0.0)
+        self.hot = [False] * size
+        self.hot_count = 0
+        self.count = 0
+        self.position = 0
+        self.last_reading = None
+
+    def push(self, reading):
+        i = self.position
+        if self.count == self.size:
+            for field in FIELDS:
+                self.sums[field] -= self.values[field][i]
+            self.hot_count -= self.hot[i]
+        else:
+            self.count += 1
+        for field in FIELDS:
+            self.values[field][i] = reading[field]
+            self.sums[field] += reading[field]
+        self.hot[i] = reading['footfall'] > HEAT_FOOTFALL_THRESHOLD
+        self.hot_count += self.hot[i]
+        self.last_reading = reading['timestamp']
+        self.position = (i + 1) % self.size
+        if self.position == 0:
+            for field in FIELDS:
+                self.sums[field] = math.fsum(self.values[field])
+
+    def retained(self):
+        """The buffered readings, oldest first"""
+        start = self.position if self.count == self.size else 0
+        return [{field: self.values[field][(start + k) % self.size] for field in FIELDS}
+                for k in range(self.count)]
+
+    def summary(self, zone):
+        # Same heat and cooling rules as the heat zone stage of /predict, over observed footfall
+        probability = self.hot_count / self.count
+        return {
+            'zone': zone,
+            'readings': self.count,
+            'footfall': self.sums['footfall'] / self.count,
+            'zone_temp': self.sums['zone_temp'] / self.count,
+            'sales_volume': self.sums['sales_volume'] / self.count,
+            'heat_zone_probability': probability,
+            'cooling_energy': BASE_COOLING_ENERGY + probability * COOLING_FACTOR,
+            'cooling_active': probability > HEAT_ZONE_PROBABILITY,
+            'last_reading': self.last_reading,
+        }
+
+
+def parse_readings(payload):
+    """Validate {"readings": [...]} (or a bare list) of {zone_id, footfall, zone_temp, sales_volume, timestamp}"""
+    readings = payload.get('readings') if isinstance(payload, dict) else payload
+    if not isinstance(readings, list) or not readings:
+        raise ValueError('Post JSON {"readings": [{"zone_id": ..., "footfall": ...}, ...]}')
+    parsed = []
+    now = time.time()
+    for i, reading in enumerate(readings):
+        if not isinstance(reading, dict) or not reading.get('zone_id'):
+            raise ValueError('Reading %d has no zone_id' % i)
+        try:
+            values = {field: float(reading.get(field, 0) or 0) for field in FIELDS}
+        except (TypeError, ValueError):
+            raise ValueError('Reading %d has a non-numeric footfall, zone_temp or sales_volume' % i)
+        if not all(math.isfinite(value) for value in values.values()):
+            raise ValueError('Reading %d has a non-finite value' % i)
+        values['zone_id'] = str(reading['zone_id'])
+        values['timestamp'] = reading.get('timestamp') or now
+        parsed.append(values)
+    return parsed
+
+
+class _StoreLog:
+    """One store's zone windows and events, and how far this process has read its log"""
+
+    def __init__(self, window):
+        self.window = window
+        self.zones = {}
+        self.seq = 0
+        self.events = deque(maxlen=EVENT_BACKLOG)
+        self.handle = None
+        self.inode = None
+        self.offset = 0
+        # Readings in the current log file, compacted ones included
+        self.logged = 0
+
+
+class LiveHub:
+    """Per-store zone windows and the recent update events that event streams follow.
+
+    With a `state_dir`, each store has an append-only log of reading
+    batches shared by every server process. A POST appends one line under
+    a file lock, so it costs O(readings) rather than O(zones x window);
+    every process applies the lines it has not seen yet to its own windows,
+    and open streams check the log's size every LIVE_POLL_SECONDS without
+    taking the lock. Once the log holds LOG_COMPACT_FACTOR times the
+    readings the windows keep, it is replaced by one line with just those.
+    Without a `state_dir`, state stays in this process. At most
+    `max_streams` event streams (0 = no limit) are open in this process at
+    a time, since each holds a server thread.
+    """
+
+    def __init__(self, window=LIVE_WINDOW, state_dir=None, max_streams=0):
+        self.window = window
+        self.state_dir = state_dir
+        self.max_streams = max_streams
+        self._stores = {}
+        self._streams = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+
+    def _path(self, store_id, suffix):
+        return os.path.join(self.state_dir, store_id + suffix)
+
+    def _apply(self, store_id, store, entry):
+        """Apply one log entry, returning its update event (None for compacted or already seen entries)"""
+        store.logged += len(entry['readings'])
+        if entry['seq'] <= store.seq:
+            return None
+        if entry.get('compacted'):
+            # Only read when this process missed the entries it replaced
+            store.zones = {}
+        changed = {}
+        for reading in entry['readings']:
+            window = store.zones.get(reading['zone_id'])
+            if window is None:
+                window = store.zones[reading['zone_id']] = ZoneWindow(store.window)
+            window.push(reading)
+            changed[reading['zone_id']] = window
+        store.seq = entry['seq']
+        if entry.get('compacted'):
+            return None
+        event = {
+            'store_id': store_id,
+            'seq': store.seq,
+            'readings': len(entry['readings']),
+            'zones': [window.summary(zone) for zone, window in changed.items()],
+            'heat_zones': sum(zone.hot_count / zone.count > HEAT_ZONE_PROBABILITY for zone in store.zones.values()),
+            'updated_at': entry['updated_at'],
+        }
+        store.events.append(event)
+        return event
+
+    def _tail(self, store_id, store):
+        """Apply the complete lines appended to the open log since the last read"""
+        store.handle.seek(store.offset)
+        data = store.handle.read()
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            self._apply(store_id, store, json.loads(line))
+        store.offset += end
+
+    def _sync(self, store_id):
+        """The store's state with every logged entry applied, or None before its first reading; call with the lock held"""
+        store = self._stores.get(store_id)
+        if not self.state_dir:
+            return store
+        try:
+            stat = os.stat(self._path(store_id, '.jsonl'))
+        except OSError:
+            stat = None
+        if store is not None and store.handle is not None:
+            if stat is not None and stat.st_ino == store.inode and stat.st_size == store.offset:
+                return store
+            # Finish the open file first: a compacted log only replaces entries already in it
+            self._tail(store_id, store)
+            if stat is None or stat.st_ino == store.inode:
+                return store
+            store.handle.close()
+            store.handle = None
+        if stat is None:
+            return store
+        try:
+            handle = open(self._path(store_id, '.jsonl'), 'rb')
+        except OSError:
+            return store
+        if store is None:
+            store = self._stores[store_id] = _StoreLog(self.window)
+        store.handle, store.inode, store.offset, store.logged = handle, os.fstat(handle.fileno()).st_ino, 0, 0
+        self._tail(store_id, store)
+        return store
+
+    def _append(self, store_id, store, entry):
+        path = self._path(store_id, '.jsonl')
+        with open(path, 'ab') as f:
+            if store is not None and os.fstat(f.fileno()).st_ino == store.inode and f.tell() != store.offset:
+                # Drop the partial line of a writer that died mid-append
+                f.truncate(store.offset)
+            f.write(json.dumps(entry, default=str).encode() + b'\n')
+
+    def _compact(self, store_id, store):
+        """Replace the store's log by one entry holding the readings its windows keep"""
+        readings = [dict(values, zone_id=zone, timestamp=window.last_reading)
+                    for zone, window in store.zones.items() for values in window.retained()]
+        path = self._path(store_id, '.jsonl')
+        tmp = self._path(store_id, '.jsonl.%d.tmp' % os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(json.dumps({'seq': store.seq, 'compacted': True, 'readings': readings}, default=str).encode()
+                    + b'\n')
+        os.replace(tmp, path)
+
+    def add(self, store_id, readings):
+        """Apply parsed readings and publish an update event; returns the event"""
+        with self._lock:
+            if not self.state_dir:
+                store = self._stores.get(store_id)
+                if store is None:
+                    store = self._stores[store_id] = _StoreLog(self.window)
+                event = self._apply(store_id, store, {'seq': store.seq + 1, 'readings': readings,
+                                                      'updated_at': time.time()})
+                self._changed.notify_all()
+                return event
+            with open(self._path(store_id, '.lock'), 'w') as handle:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    store = self._sync(store_id)
+                    seq = (store.seq if store is not None else 0) + 1
+                    self._append(store_id, store, {'seq': seq, 'readings': readings, 'updated_at': time.time()})
+                    store = self._sync(store_id)
+                    event = next(event for event in reversed(store.events) if event['seq'] == seq)
+                    retained = sum(window.count for window in store.zones.values())
+                    if store.logged > LOG_COMPACT_FACTOR * max(retained, self.window):
+                        self._compact(store_id, store)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(handle, fcntl.LOCK_UN)
+            self._changed.notify_all()
+        return event
+
+    def snapshot(self, store_id):
+        """Summaries of every zone seen for the store, or None"""
+        with self._lock:
+            store = self._sync(store_id)
+            if store is None:
+                return None
+            summaries = [store.zones[zone].summary(zone) for zone in sorted(store.zones)]
+            seq = store.seq
+        return {
+            'store_id': store_id,
+            'seq': seq,
+            'window': self.window,
+            'zones': summaries,
+            'heat_zones': sum(zone['cooling_active'] for zone in summaries),
+        }
+
+    def events_after(self, store_id, seq, timeout):
+        """Update events for the store newer than `seq`, waiting up to `timeout` seconds for one.
+
+        Only the last EVENT_BACKLOG events are kept; a stream that falls
+        further behind skips the older ones.
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                store = self._sync(store_id)
+                if store is not None and store.seq > seq:
+                    return [event for event in store.events if event['seq'] > seq]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                # Readings posted to other processes only show up in the log
+                self._changed.wait(min(remaining, LIVE_POLL_SECONDS) if self.state_dir else remaining)
+
+    def open_stream(self):
+        """Reserve an event stream slot; False when max_streams are already open"""
+        with self._lock:
+            if self.max_streams and self._streams >= self.max_streams:
+                return False
+            self._streams += 1
+            return True
+
+    def close_stream(self):
+        with self._lock:
+            self._streams -= 1
+
+
+def server_sent_event(name, data):
+    return 'event: %s\ndata: %s\n\n' % (name, json.dumps(data, default=str))
+
@@ -0,0 +1,143 @@
+"""
+Local, versioned on-disk registry of trained footfall and Prophet models
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are only serialised within a process
+    fcntl = None
+
+_STORE_ID_RE = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+
+def validate_store_id(store_id):
+    if not store_id or not _STORE_ID_RE.match(store_id) or store_id.startswith('.'):
+        raise ValueError('Invalid store_id %r: use letters, digits, ".", "_" or "-"' % store_id)
+    return store_id
+
+
+class ModelRegistry:
+    """Stores models under <root>/<store_id>/v<NNNN>/.
+
+    Each version holds the footfall regressor (joblib), the Prophet model
+    (Prophet's JSON serialisation), the store's typical-week profile for
+    layout simulation (parquet) and meta.json with the feature encoding, its
+    columns and category levels, plus training metadata.
+    """
+
+    def __init__(self, root, loaded_items=8):
+        self.root = root
+        self.loaded_items = loaded_items
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _store_dir(self, store_id):
+        return os.path.join(self.root, validate_store_id(store_id))
+
+    def versions(self, store_id):
+        store_dir = self._store_dir(store_id)
+        if not os.path.isdir(store_dir):
+            return []
+        return sorted(int(name[1:]) for name in os.listdir(store_dir)
+                      if name.startswith('v') and name[1:].isdigit())
+
+    def metadata(self, store_id, version=None):
+        """Return meta.json of the given (default: latest) version, or None"""
+        if version is None:
+            versions = self.versions(store_id)
+            if not versions:
+                return None
+            version = versions[-1]
+        path = os.path.join(self._store_dir(store_id), 'v%04d' % version, 'meta.json')
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except OSError:
+            return None
+
+    def save(self, store_id, models, metadata=None):
+        """Persist a newly trained model set and return its metadata"""
+        from prophet.serialize import model_to_json
+
+        store_dir = self._store_dir(store_id)
+        os.makedirs(store_dir, exist_ok=True)
+        # The file lock (released when the handle closes) keeps version numbers
+        # unique across server worker processes
+        with self._lock, open(os.path.join(store_dir, '.lock'), 'w') as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            versions = self.versions(store_id)
+            version = (versions[-1] + 1) if versions else 1
+            tmp_dir = os.path.join(store_dir, '.tmp-v%04d-%d' % (version, os.getpid()))
+            os.makedirs(tmp_dir)
+            joblib.dump(models['footfall'], os.path.join(tmp_dir, 'footfall.joblib'))
+            with open(os.path.join(tmp_dir, 'prophet.json'), 'w') as f:
+                f.write(model_to_json(models['prophet']))
+            if models.get('profile') is not None:
+                models['profile'].to_parquet(os.path.join(tmp_dir, 'profile.parquet'), index=False)
+            meta = dict(metadata or {})
+            meta.update({
+                'store_id': store_id,
+                'version': version,
+                'trained_at': time.time(),
+                'feature_columns': list(models['feature_columns']),
+                'footfall_model': type(models['footfall']).__name__,
+                'engine': models.get('engine', 'random_forest'),
+                'encoding': models.get('encoding', 'dense'),
+                'vocabulary': models.get('vocabulary'),
+            })
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump(meta, f, indent=2)
+            # Rename into place so readers never see a half-written version
+            os.rename(tmp_dir, os.path.join(store_dir, 'v%04d' % version))
+        return meta
+
+    def load(self, store_id, version=None):
+        """Return (models, metadata) for the given (default: latest) version, or None"""
+        from prophet.serialize import model_from_json
+
+        meta = self.metadata(store_id, version)
+        if meta is None:
+            return None
+        cache_key = (store_id, meta['version'])
+        with self._lock:
+            if cache_key in self._loaded:
+                self._loaded.move_to_end(cache_key)
+                return self._loaded[cache_key], meta
+        version_dir = os.path.join(self._store_dir(store_id), 'v%04d' % meta['version'])
+        with open(os.path.join(version_dir, 'prophet.json')) as f:
+            prophet_model = model_from_json(f.read())
+        profile_path = os.path.join(version_dir, 'profile.parquet')
+        models = {
+            'footfall': joblib.load(os.path.join(version_dir, 'footfall.joblib')),
+            'prophet': prophet_model,
+            'feature_columns': meta['feature_columns'],
+            # Versions registered before engines were selectable are random forests
+            'engine': meta.get('engine', 'random_forest'),
+            'encoding': meta.get('encoding', 'dense'),
+            'vocabulary': meta.get('vocabulary'),
+            # Versions registered before layout simulation have no profile
+            'profile': pd.read_parquet(profile_path) if os.path.exists(profile_path) else None,
+        }
+        with self._lock:
+            self._loaded[cache_key] = models
+            while len(self._loaded) > self.loaded_items:
+                self._loaded.popitem(last=False)
+        return models, meta
+
+    def prune(self, store_id, keep=5):
+        """Delete all but the newest `keep` versions of a store"""
+        for version in self.versions(store_id)[:-keep]:
+            shutil.rmtree(os.path.join(self._store_dir(store_id), 'v%04d' % version), ignore_errors=True)
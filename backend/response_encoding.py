@@ -0,0 +1,115 @@
+"""
+Response shaping for analysis results: field selection, columnar tables, MessagePack and compression
+"""
+
+import gzip
+import json
+
+try:
+    import msgpack
+except ImportError:  # format=msgpack is rejected with 406
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # only gzip is offered
+    brotli = None
+
+MIMETYPES = {'json': 'application/json', 'msgpack': 'application/msgpack'}
+# Bodies smaller than this are sent uncompressed; the headers would eat the gain
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+# Brotli's higher qualities compress slightly better but are far slower
+BROTLI_QUALITY = 5
+# Maps of zone_id -> record that orient=columns turns into tables
+LAYOUT_MAPS = ('blueprint_layout', 'suggested_layout')
+
+
+class NotAcceptable(Exception):
+    """The client asked for an encoding this server cannot produce"""
+
+
+def select_fields(payload, fields):
+    """Keep only the comma-separated top-level keys in `fields` (None keeps everything)"""
+    if not fields:
+        return payload
+    wanted = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in wanted if name not in payload]
+    if unknown:
+        raise ValueError('Unknown fields: %s (available: %s)' % (', '.join(unknown), ', '.join(sorted(payload))))
+    return {name: payload[name] for name in wanted}
+
+
+def _is_records(value):
+    return isinstance(value, list) and len(value) > 0 and all(isinstance(item, dict) for item in value)
+
+
+def records_to_columns(records):
+    """[{a: 1, b: 2}, {a: 3}] -> {a: [1, 3], b: [2, None]}, columns in first-seen order"""
+    columns = {}
+    for record in records:
+        for key in record:
+            columns.setdefault(key, None)
+    return {key: [record.get(key) for record in records] for key in columns}
+
+
+def _columnar(value):
+    if _is_records(value):
+        return records_to_columns([{key: _columnar(item) for key, item in record.items()} for record in value])
+    if isinstance(value, dict):
+        return {key: _columnar(item) for key, item in value.items()}
+    return value
+
+
+def columnar(payload):
+    """Turn every list of records (at any depth) and the layout maps into column arrays"""
+    shaped = {}
+    for key, value in payload.items():
+        if key in LAYOUT_MAPS and isinstance(value, dict) and all(isinstance(v, dict) for v in value.values()):
+            value = list(value.values())
+        shaped[key] = _columnar(value)
+    return shaped
+
+
+def negotiate_format(requested, accept):
+    """`requested` is the format= parameter, `accept` werkzeug's parsed Accept header"""
+    if requested:
+        if requested not in MIMETYPES:
+            raise ValueError("format must be one of: %s" % ', '.join(MIMETYPES))
+        fmt = requested
+    else:
+        best = accept.best_match(['application/json', 'application/msgpack', 'application/x-msgpack'],
+                                 default='application/json')
+        fmt = 'json' if best == 'application/json' else 'msgpack'
+    if fmt == 'msgpack' and msgpack is None:
+        raise NotAcceptable('MessagePack responses need the msgpack package')
+    return fmt
+
+
+def negotiate_encoding(accept_encodings, size):
+    """Best supported Content-Encoding for a body of `size` bytes, or None"""
+    if size < MIN_COMPRESS_BYTES:
+        return None
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return accept_encodings.best_match(offered)
+
+
+def _default(value):
+    # numpy scalars (np.int64 is not an int subclass); anything else is stringified
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def encode(payload, fmt):
+    if fmt == 'msgpack':
+        return msgpack.packb(payload, default=_default)
+    return json.dumps(payload, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
@@ -0,0 +1,216 @@
+"""
+Two-tier (memory + disk) cache for analysis results, keyed by content hash
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process request merging only
+    fcntl = None
+
+
+def content_key(data, params=None):
+    """Hash raw upload bytes together with the parameters that shape the result"""
+    digest = hashlib.sha256()
+    digest.update(data)
+    if params is not None:
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class _InFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    """LRU memory tier in front of a size-bounded disk tier.
+
+    Concurrent requests for the same key are merged: the first caller
+    computes, the others wait for its result.
+    """
+
+    def __init__(self, memory_items=32, disk_dir=None, disk_max_bytes=512 * 1024 * 1024):
+        self.memory_items = memory_items
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    # --- memory tier ---
+    def _memory_get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        return None
+
+    def _memory_put(self, key, value):
+        if self.memory_items <= 0:
+            return
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    # --- disk tier ---
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key + '.pkl')
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)  # mtime doubles as last-access time for eviction
+            return value
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _disk_put(self, key, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = '%s.%d.%d.tmp' % (path, os.getpid(), threading.get_ident())
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        names = os.listdir(self.disk_dir)
+        for name in names:
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._reap_locks(names)
+
+    def _reap_locks(self, names):
+        """Remove lock files of keys without a cached entry that nobody holds"""
+        if fcntl is None:
+            return
+        for name in names:
+            if not name.endswith('.lock') or os.path.exists(self._disk_path(name[:-len('.lock')])):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                fd = os.open(path, os.O_WRONLY)
+            except OSError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                # Unlinked while held: _disk_lock notices and locks the new file instead
+                os.remove(path)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+
+    def _disk_lock(self, key):
+        """Cross-process lock so identical uploads in other workers wait too"""
+        if not self.disk_dir or fcntl is None:
+            return None
+        path = os.path.join(self.disk_dir, key + '.lock')
+        while True:
+            handle = open(path, 'w')
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                if os.stat(path).st_ino == os.fstat(handle.fileno()).st_ino:
+                    return handle
+            except OSError:
+                pass
+            # The file was reaped while we waited for it; lock the current one
+            handle.close()
+
+    def _disk_unlock(self, handle):
+        # The lock file stays until eviction reaps it: unlinking it here would
+        # race with processes that opened it and are waiting for the lock
+        if handle is None:
+            return
+        fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
+
+    # --- public API ---
+    def get(self, key):
+        value = self._memory_get(key)
+        if value is not None:
+            return value
+        value = self._disk_get(key)
+        if value is not None:
+            self._memory_put(key, value)
+        return value
+
+    def put(self, key, value):
+        self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def get_or_compute(self, key, compute):
+        """Return (value, cache_hit), running compute() at most once per key"""
+        value = self.get(key)
+        if value is not None:
+            return value, True
+
+        with self._lock:
+            inflight = self._inflight.get(key)
+            owner = inflight is None
+            if owner:
+                inflight = _InFlight()
+                self._inflight[key] = inflight
+
+        if not owner:
+            inflight.event.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.value, True
+
+        handle = None
+        try:
+            handle = self._disk_lock(key)
+            value = self._disk_get(key)
+            hit = value is not None
+            if hit:
+                self._memory_put(key, value)
+            else:
+                value = compute()
+                self.put(key, value)
+            inflight.value = value
+            return value, hit
+        except Exception as e:
+            inflight.error = e
+            raise
+        finally:
+            self._disk_unlock(handle)
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.event.set()
@@ -0,0 +1,204 @@
+"""
+What-if layout simulation: score batches of candidate layouts against a registered footfall model
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from analysis import (BASE_COOLING_ENERGY, COOLING_FACTOR, ENERGY_FACTOR, HEAT_FOOTFALL_THRESHOLD,
+                      HEAT_ZONE_PROBABILITY, add_time_features, proximity_penalty)
+from feature_encoding import encode_features
+
+# Columns that belong to a zone's products and move with them; the rest
+# (temperature, time slot, ...) belong to the zone's location
+PRODUCT_COLUMNS = ['product_category', 'sales_volume']
+# Candidates accepted per request
+MAX_CANDIDATES = 1000
+# Scored (location, products) blocks kept per simulator before the cache is reset
+MAX_CACHED_BLOCKS = 100_000
+
+
+def build_profile(df):
+    """A typical week of the store: one row per zone, day of week and hour.
+
+    Numeric columns are the zone's means for that slot (or its overall means
+    where the slot was never observed), the phase is the most common one for
+    the hour and every row of a zone carries its dominant product category.
+    Columns come in the order of `df`, so the rows encode exactly like the
+    uploads the model was trained on. Registered with each model version.
+    """
+    df = df.copy()
+    if 'hour' not in df.columns:
+        add_time_features(df)
+    zones = sorted(df['zone_id'].astype(str).unique())
+    days = df['day_of_week'].astype(str).unique().tolist()
+    hours = sorted(df['hour'].unique())
+    keys = ['zone_id', 'day_of_week', 'hour']
+    df['zone_id'] = df['zone_id'].astype(str)
+    df['day_of_week'] = df['day_of_week'].astype(str)
+
+    numeric = [col for col in df.select_dtypes('number').columns if col not in keys]
+    grid = pd.MultiIndex.from_product([zones, days, hours], names=keys)
+    profile = df.groupby(keys)[numeric].mean().reindex(grid).reset_index()
+    zone_means = df.groupby('zone_id')[numeric].mean()
+    fallback = zone_means.reindex(profile['zone_id']).fillna(df[numeric].mean())
+    profile[numeric] = profile[numeric].fillna(pd.DataFrame(fallback.to_numpy(), index=profile.index, columns=numeric))
+
+    latest = df['timestamp'].max()
+    profile['timestamp'] = latest
+    profile['day'] = latest.day
+    profile['month'] = latest.month
+    phases = df.groupby('hour')['phase'].agg(lambda phase: phase.value_counts().index[0])
+    profile['phase'] = profile['hour'].map(phases)
+    counts = df.groupby(['zone_id', 'product_category']).size().reset_index(name='count')
+    counts = counts.sort_values(['zone_id', 'count', 'product_category'], ascending=[True, False, True])
+    profile['product_category'] = profile['zone_id'].map(counts.drop_duplicates('zone_id').set_index('zone_id')
+                                                          ['product_category'])
+    return profile[list(df.columns)]
+
+
+class LayoutSimulator:
+    """Scores candidate layouts with one registered model version.
+
+    A candidate assigns each zone (a location) the products of some zone,
+    through moves that swap two zones' products, and optionally overrides
+    the product category a zone holds. Only zones whose (location, products,
+    category) block differs from the current layout are predicted; blocks are
+    shared between candidates and cached, so a batch costs one model call on
+    its new blocks and its totals are the baseline plus per-zone differences.
+    """
+
+    def __init__(self, models):
+        self.models = models
+        self.profile = models['profile']
+        self.zones = list(pd.unique(self.profile['zone_id']))
+        self.slots = len(self.profile) // len(self.zones)
+        self._zone_index = {zone: i for i, zone in enumerate(self.zones)}
+        self._categories = self.profile['product_category'].iloc[::self.slots].tolist()
+        vocabulary = (models.get('vocabulary') or {}).get('product_category')
+        if vocabulary is None:
+            prefix = 'product_category_'
+            vocabulary = [col[len(prefix):] for col in models['feature_columns'] if col.startswith(prefix)]
+        self._known_categories = set(vocabulary) | set(self._categories)
+        self._blocks = {}
+        self._lock = threading.Lock()
+        self._current = [(i, i, None) for i in range(len(self.zones))]
+        self.baseline = self._stats(self._current)
+
+    def _predict(self, keys):
+        """Footfall predictions for blocks not yet cached, in one model call"""
+        rows = np.arange(self.slots)
+        location = np.concatenate([zone * self.slots + rows for zone, _, _ in keys])
+        products = np.concatenate([source * self.slots + rows for _, source, _ in keys])
+        frame = self.profile.iloc[location].reset_index(drop=True)
+        for col in PRODUCT_COLUMNS:
+            frame[col] = self.profile[col].to_numpy()[products]
+        overridden = np.repeat([category is not None for _, _, category in keys], self.slots)
+        if overridden.any():
+            categories = np.repeat([category for _, _, category in keys], self.slots)
+            frame.loc[overridden, 'product_category'] = categories[overridden]
+        models = self.models
+        features = encode_features(frame, models.get('encoding', 'dense'), models.get('vocabulary'),
+                                   models['feature_columns'])
+        predicted = models['footfall'].predict(features['X']).reshape(len(keys), self.slots)
+        penalty = proximity_penalty(frame['zone_id'], predicted.ravel()).reshape(len(keys), self.slots)
+        # Same heat and cooling rules as the heat zone stage of /predict, over the profile's slots
+        return np.column_stack([predicted.mean(axis=1), (predicted > HEAT_FOOTFALL_THRESHOLD).mean(axis=1),
+                                penalty.sum(axis=1)])
+
+    def _stats(self, keys):
+        """[predicted footfall, heat zone probability, proximity penalty] per block"""
+        with self._lock:
+            missing = list(dict.fromkeys(key for key in keys if key not in self._blocks))
+            if missing:
+                if len(self._blocks) + len(missing) > MAX_CACHED_BLOCKS:
+                    self._blocks = {}
+                self._blocks.update(zip(missing, self._predict(missing)))
+            return np.array([self._blocks[key] for key in keys]).reshape(len(keys), 3)
+
+    def _zone(self, zone, description):
+        if zone not in self._zone_index:
+            raise ValueError('%s: unknown zone %r (known: %s)' % (description, zone, ', '.join(self.zones)))
+        return self._zone_index[zone]
+
+    def _changed_blocks(self, candidate, description):
+        """(location, product source, category override) of each zone the candidate changes"""
+        if not isinstance(candidate, dict):
+            raise ValueError('%s must be an object with "moves" and/or "layout"' % description)
+        sources = list(range(len(self.zones)))
+        for move in candidate.get('moves') or []:
+            if not isinstance(move, dict):
+                raise ValueError('%s: moves must be {"from_zone": ..., "to_zone": ...}' % description)
+            i = self._zone(str(move.get('from_zone')), description)
+            j = self._zone(str(move.get('to_zone')), description)
+            sources[i], sources[j] = sources[j], sources[i]
+        overrides = {}
+        layout = candidate.get('layout') or {}
+        if not isinstance(layout, dict):
+            raise ValueError('%s: layout must map zone ids to product categories' % description)
+        for zone, category in layout.items():
+            if category not in self._known_categories:
+                raise ValueError('%s: unknown product category %r for zone %s' % (description, category, zone))
+            overrides[self._zone(str(zone), description)] = category
+        blocks = []
+        for location, source in enumerate(sources):
+            category = overrides.get(location)
+            if category == self._categories[source]:
+                category = None
+            if source != location or category is not None:
+                blocks.append((location, source, category))
+        return blocks
+
+    def _totals(self, stats):
+        footfall, probability, penalty = stats[:, 0], stats[:, 1], stats[:, 2]
+        return {
+            'predicted_footfall': float(footfall.mean()),
+            'heat_zones': int((probability > HEAT_ZONE_PROBABILITY).sum()),
+            'cooling_energy': float((BASE_COOLING_ENERGY + probability * COOLING_FACTOR).sum()),
+            'proximity_penalty': float(penalty.sum()),
+            'simulated_energy_usage': float((BASE_COOLING_ENERGY + footfall * ENERGY_FACTOR).sum()),
+        }
+
+    def _zones(self, blocks, stats):
+        return [{
+            'zone': self.zones[location],
+            'products_from': self.zones[source],
+            'product_category': category or self._categories[source],
+            'predicted_footfall': float(stats[i, 0]),
+            'heat_zone_probability': float(stats[i, 1]),
+            'cooling_energy': float(BASE_COOLING_ENERGY + stats[i, 1] * COOLING_FACTOR),
+            'proximity_penalty': float(stats[i, 2]),
+        } for i, (location, source, category) in enumerate(blocks)]
+
+    def simulate(self, candidates):
+        """Totals for the current layout and each candidate, with the zones each candidate changes"""
+        if not isinstance(candidates, list) or not candidates:
+            raise ValueError('Post JSON {"candidates": [{"moves": [...], "layout": {...}}, ...]}')
+        if len(candidates) > MAX_CANDIDATES:
+            raise ValueError('At most %d candidates per request' % MAX_CANDIDATES)
+        changed = [self._changed_blocks(candidate, 'Candidate %d' % i) for i, candidate in enumerate(candidates)]
+        keys = [key for blocks in changed for key in blocks]
+        stats = self._stats(keys) if keys else np.empty((0, 3))
+
+        baseline_totals = self._totals(self.baseline)
+        results = []
+        offset = 0
+        for i, (candidate, blocks) in enumerate(zip(candidates, changed)):
+            block_stats = stats[offset:offset + len(blocks)]
+            offset += len(blocks)
+            zone_stats = self.baseline.copy()
+            zone_stats[[location for location, _, _ in blocks]] = block_stats
+            totals = self._totals(zone_stats)
+            results.append(dict(
+                totals,
+                name=candidate.get('name', 'candidate-%d' % i),
+                energy_change=totals['simulated_energy_usage'] - baseline_totals['simulated_energy_usage'],
+                changed_zones=self._zones(blocks, block_stats),
+            ))
+        return {
+            'slots': self.slots,
+            'baseline': dict(baseline_totals, zones=self._zones(self._current, self.baseline)),
+            'candidates': results,
+        }
@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Import the backend modules directly, as app.py does, and keep the app's
+# caches and stores out of backend/.cache
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('INNOAISLE_CACHE_DIR', tempfile.mkdtemp(prefix='innoaisle-tests-'))
+os.environ.setdefault('INNOAISLE_WARMUP', '0')
+
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                          'sample_data.csv')
+
+
+@pytest.fixture
+def sample_csv():
+    """Bytes of the repository's sample upload"""
+    with open(SAMPLE_CSV, 'rb') as f:
+        return f.read()
@@ -0,0 +1,45 @@
+import io
+import json
+import zipfile
+
+import app as server
+import batch
+
+
+def upload(files, query=''):
+    return server.app.test_client().post('/predict/batch' + query, content_type='multipart/form-data',
+                                         data={'files': [(io.BytesIO(data), name) for name, data in files]})
+
+
+def test_collect_reports_every_store_and_failures(sample_csv):
+    response = upload([('north.csv', sample_csv), ('south.csv', sample_csv), ('broken.csv', b'zone_id\nZ1\n')],
+                      '?collect=1&zone_forecasts=1')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert set(body['stores']) == {'north', 'south', 'broken'}
+    assert body['stores']['broken']['status'] == 'error'
+    assert body['stores']['north']['result']['zone_forecasts']
+    summary = body['summary']
+    assert (summary['stores'], summary['succeeded'], summary['failed']) == (3, 2, ['broken'])
+    assert summary['total_simulated_energy_usage'] == 2 * body['stores']['north']['result']['simulated_energy_usage']
+
+
+def test_stream_yields_one_line_per_store_then_a_summary(sample_csv):
+    upload([('repeat.csv', sample_csv)])
+    lines = [json.loads(line) for line in upload([('repeat.csv', sample_csv)]).get_data(as_text=True).splitlines()]
+    assert lines[0]['store_id'] == 'repeat' and lines[0]['cache_hit']
+    assert lines[-1]['summary']['succeeded'] == 1
+
+
+def test_zip_members_get_distinct_store_ids(tmp_path, sample_csv):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as z:
+        z.writestr('a/store.csv', sample_csv)
+        z.writestr('b/store.csv', sample_csv)
+        z.writestr('__MACOSX/a/._store.csv', b'')
+    archive.seek(0)
+    storage = type('Upload', (), {'filename': 'stores.zip', 'stream': archive})
+    items = batch.collect_uploads([storage], str(tmp_path))
+    assert [store_id for store_id, _, _ in items] == ['store', 'store-2']
+    assert items[0][2] == items[1][2]
+    assert upload([('empty.zip', b'not a zip')]).status_code == 400
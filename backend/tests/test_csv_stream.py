@@ -0,0 +1,28 @@
+import io
+
+import pandas as pd
+import pytest
+
+import app as server
+from analysis import compute_aggregates, load_csv
+from csv_stream import stream_csv
+
+
+def test_streamed_aggregates_match_the_full_parse(sample_csv):
+    sample, aggregates, rows = stream_csv(io.BytesIO(sample_csv), chunk_rows=7)
+    df = load_csv(io.BytesIO(sample_csv))
+    expected = compute_aggregates(df)
+    assert rows == len(sample) == len(df)
+    pd.testing.assert_frame_equal(
+        aggregates['zone_traffic'].sort_values('zone').reset_index(drop=True),
+        expected['zone_traffic'].sort_values('zone').reset_index(drop=True),
+        check_dtype=False, check_categorical=False, rtol=1e-5,
+    )
+
+
+def test_missing_columns_are_a_validation_error():
+    with pytest.raises(ValueError, match='phase'):
+        stream_csv(io.BytesIO(b'timestamp,zone_id,footfall\n2024-01-01 10:00:00,Z1,70\n'))
+    response = server.app.test_client().post('/predict?stream=1', data=b'timestamp,zone_id\n',
+                                             content_type='text/csv')
+    assert response.status_code == 400
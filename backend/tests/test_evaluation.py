@@ -0,0 +1,51 @@
+import io
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+import app as server
+from evaluation import rolling_origin_folds, validate_folds, validate_models
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from synthetic import generate_csv  # noqa: E402
+
+
+def test_folds_tile_the_second_half_in_time_order():
+    timestamps = pd.Series(pd.date_range('2024-01-01', periods=10 * 24, freq='h'))
+    windows = rolling_origin_folds(timestamps, 4)
+    assert windows[0][0] == pd.Timestamp('2024-01-05 23:00')
+    assert windows[-1][1] == timestamps.max() + pd.Timedelta(hours=1)
+    assert all(end == origin for (_, end), (origin, _) in zip(windows, windows[1:]))
+    with pytest.raises(ValueError, match='Not enough history'):
+        rolling_origin_folds(timestamps.head(3), 4)
+
+
+def test_folds_and_models_are_validated():
+    assert validate_folds('3') == 3
+    for bad in ('1', '21', 'many'):
+        with pytest.raises(ValueError):
+            validate_folds(bad)
+    assert validate_models('prophet') == ['prophet']
+    with pytest.raises(ValueError):
+        validate_models('footfall,lstm')
+
+
+def test_evaluate_scores_every_fold_and_caches_them():
+    data = generate_csv(1500, zones=4, days=14, seed=1)
+    client = server.app.test_client()
+
+    def evaluate():
+        return client.post('/evaluate?folds=2', data={'file': (io.BytesIO(data), 'cv.csv')},
+                           content_type='multipart/form-data')
+
+    body = evaluate().get_json()
+    assert [(fold['model'], fold['fold']) for fold in body['folds']] == \
+           [('footfall', 0), ('footfall', 1), ('prophet', 0), ('prophet', 1)]
+    assert all('metrics' in fold and fold['train_rows'] > 0 for fold in body['folds'])
+    assert set(body['aggregate']['prophet']) >= {'rmse', 'mae', 'mape', 'coverage', 'fit_s_total'}
+    assert body['cache_hits'] == 0
+    assert evaluate().get_json()['cache_hits'] == 4
+    assert client.post('/evaluate?folds=1', data={'file': (io.BytesIO(data), 'cv.csv')},
+                       content_type='multipart/form-data').status_code == 400
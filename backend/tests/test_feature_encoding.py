@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from analysis import load_csv
+from conftest import SAMPLE_CSV
+from feature_encoding import default_encoding, encode_features, features_nbytes
+
+
+@pytest.fixture
+def df():
+    return load_csv(SAMPLE_CSV).reset_index(drop=True)
+
+
+def test_sparse_matches_the_dense_one_hot_matrix(df):
+    dense = encode_features(df, 'dense')
+    sparse = encode_features(df, 'sparse')
+    assert sparse['feature_columns'] == dense['feature_columns']
+    np.testing.assert_array_equal(sparse['X'].toarray(), dense['X'].to_numpy(dtype=np.float32))
+    assert features_nbytes(sparse['X']) > 0
+
+
+def test_later_uploads_are_encoded_with_the_registered_columns(df):
+    trained = encode_features(df, 'dense')
+    later = df[df['zone_id'] == df['zone_id'].iloc[0]].copy()
+    later.loc[later.index[0], 'phase'] = 'night'
+    scored = encode_features(later, 'dense', feature_columns=trained['feature_columns'])
+    assert scored['feature_columns'] == trained['feature_columns']
+    assert 'phase_night' not in scored['X'].columns
+
+
+def test_ordinal_codes_follow_the_vocabulary(df):
+    trained = encode_features(df, 'ordinal')
+    assert all(trained['categorical'][trained['feature_columns'].index(col)] for col in ('zone_id', 'phase'))
+    later = df.head(3).copy()
+    later['zone_id'] = ['Z99', df['zone_id'].iloc[1], df['zone_id'].iloc[2]]
+    scored = encode_features(later, 'ordinal', vocabulary=trained['vocabulary'])
+    assert np.isnan(scored['X']['zone_id'].iloc[0])
+    assert scored['X']['zone_id'].iloc[1] == trained['vocabulary']['zone_id'].index(df['zone_id'].iloc[1])
+
+
+def test_default_encoding_per_engine(df):
+    assert default_encoding('hist_gradient_boosting', df) == 'ordinal'
+    assert default_encoding('random_forest', df) == 'dense'
+    with pytest.raises(ValueError, match='encoding must be one of'):
+        encode_features(df, 'hashed')
@@ -0,0 +1,66 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+import footfall_engines
+from footfall_engines import MAX_TREES, UPDATE_TREES, ResidualBoosting, fit, pool_worker_init, update
+
+PARAMS = {
+    'random_forest': {'n_estimators': 10, 'random_state': 0},
+    'hist_gradient_boosting': {'max_iter': 20, 'random_state': 0},
+}
+
+
+def data(rows=200, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.random((rows, 3))
+    return X, 10 * X[:, 0] + rng.normal(0, 0.1, rows)
+
+
+def worker_model_jobs():
+    return footfall_engines.MODEL_JOBS
+
+
+@pytest.mark.parametrize('engine', ['random_forest', 'hist_gradient_boosting'])
+def test_update_returns_a_new_model_and_leaves_the_old_one(engine):
+    X, y = data()
+    model = fit(engine, PARAMS[engine], X, y)
+    before = model.predict(X[:5])
+    updated = update(engine, PARAMS[engine], model, *data(seed=1))
+    assert updated is not model
+    np.testing.assert_array_equal(model.predict(X[:5]), before)
+    assert np.abs(updated.predict(X) - y).mean() < 1.5
+
+
+def test_forest_updates_add_trees_up_to_the_cap():
+    params = PARAMS['random_forest']
+    model = fit('random_forest', params, *data())
+    model = update('random_forest', params, model, *data(seed=1))
+    assert len(model.estimators_) == params['n_estimators'] + UPDATE_TREES
+    for seed in range(MAX_TREES // UPDATE_TREES + 1):
+        model = update('random_forest', params, model, *data(rows=40, seed=seed))
+    assert len(model.estimators_) == MAX_TREES
+
+
+def test_boosting_updates_stack_residual_corrections():
+    params = PARAMS['hist_gradient_boosting']
+    model = update('hist_gradient_boosting', params, fit('hist_gradient_boosting', params, *data()), *data(seed=1))
+    model = update('hist_gradient_boosting', params, model, *data(seed=2))
+    assert isinstance(model, ResidualBoosting) and len(model.corrections) == 2
+
+
+def test_unknown_engine_and_sparse_boosting_are_rejected():
+    from scipy.sparse import csr_matrix
+
+    X, y = data()
+    with pytest.raises(ValueError, match='engine must be one of'):
+        fit('linear', {}, X, y)
+    with pytest.raises(ValueError, match='encoding=sparse'):
+        fit('hist_gradient_boosting', PARAMS['hist_gradient_boosting'], csr_matrix(X), y)
+
+
+def test_pool_workers_fit_on_one_core(monkeypatch):
+    monkeypatch.delenv('INNOAISLE_MODEL_JOBS', raising=False)
+    with ProcessPoolExecutor(max_workers=1, initializer=pool_worker_init) as pool:
+        assert pool.submit(worker_model_jobs).result() == 1
@@ -0,0 +1,84 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import forecasting
+from analysis import MODEL_PARAMS
+from forecasting import ForecastCache, fit_prophet, forecast_options, training_history, zone_forecasts
+
+
+def zone_hourly(zones=('Z1', 'Z2'), hours=24 * 10):
+    ds = pd.date_range('2024-01-01', periods=hours, freq='h')
+    rng = np.random.default_rng(0)
+    return pd.concat([pd.DataFrame({'zone_id': zone, 'ds': ds, 'y': 50 + 20 * np.sin(ds.hour / 24 * 2 * np.pi)
+                                    + rng.normal(0, 5, hours)}) for zone in zones], ignore_index=True)
+
+
+def methods(results):
+    return {zone: result.get('reason', result['method']) for zone, result in results.items()}
+
+
+@pytest.fixture
+def serial(monkeypatch):
+    monkeypatch.setattr(forecasting, '_zone_executor', None)
+
+
+def test_serial_fits_and_short_history_fallback(serial):
+    frame = pd.concat([zone_hourly(), zone_hourly(('Z3',), hours=24)])
+    results = zone_forecasts(frame, 24, MODEL_PARAMS['prophet'])
+    assert methods(results) == {'Z1': 'prophet', 'Z2': 'prophet', 'Z3': 'insufficient_history'}
+    assert all(len(result['forecast']) == 24 for result in results.values())
+
+
+def test_fits_run_inline_inside_a_pool_worker(monkeypatch):
+    # As in /jobs, /predict/batch and /evaluate workers, which inherit the server's executor
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        monkeypatch.setattr(forecasting, '_zone_executor', (lambda: pool, 1))
+        future = pool.submit(zone_forecasts, zone_hourly(), 24, MODEL_PARAMS['prophet'], 30)
+        assert methods(future.result(timeout=120)) == {'Z1': 'prophet', 'Z2': 'prophet'}
+
+
+def test_timeouts_fall_back_and_leave_the_shared_pool_usable(monkeypatch):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        monkeypatch.setattr(forecasting, '_zone_executor', (lambda: pool, 1))
+        results = zone_forecasts(zone_hourly(), 24, MODEL_PARAMS['prophet'], timeout=0)
+        assert methods(results) == {'Z1': 'timeout', 'Z2': 'timeout'}
+        assert pool.submit(sum, [1, 2]).result(timeout=60) == 3
+
+
+def test_training_history_window_and_downsampling():
+    series = zone_hourly(('Z1',), hours=24 * 60)[['ds', 'y']]
+    assert training_history(series, window_days=7)['ds'].min() == series['ds'].max() - pd.Timedelta(hours=7 * 24 - 1)
+    kept = training_history(series, downsample=5, full_resolution_days=28)
+    recent = kept['ds'] > series['ds'].max() - pd.Timedelta(days=28)
+    assert recent.sum() == 28 * 24
+    # Every 5th hour still cycles through every hour of the day
+    assert set(kept.loc[~recent, 'ds'].dt.hour) == set(range(24))
+    assert len(kept[~recent]) == pytest.approx(32 * 24 / 5, abs=1)
+
+
+def test_forecast_options_validation():
+    assert forecast_options(7, 5, 'noise') == {'window_days': 7, 'downsample': 5, 'intervals': 'noise',
+                                               'warm_start': False}
+    for bad in ({'window_days': 'x'}, {'window_days': -1}, {'downsample': 0}, {'intervals': 'exact'}):
+        with pytest.raises(ValueError):
+            forecast_options(**bad)
+
+
+def test_warm_start_noise_intervals_and_forecast_cache(monkeypatch):
+    series = zone_hourly(('Z1',))[['ds', 'y']]
+    model, warm = fit_prophet(series, MODEL_PARAMS['prophet'], intervals='noise')
+    assert not warm
+    refit, warm = fit_prophet(series, MODEL_PARAMS['prophet'], init=model)
+    assert warm
+    assert not fit_prophet(series.iloc[24:], MODEL_PARAMS['prophet'], init=model)[1]
+
+    cache = ForecastCache(items=2)
+    start = series['ds'].max() + pd.Timedelta(hours=1)
+    records = cache.forecast(model, start, 24)
+    assert len(records) == 24
+    assert all(record['yhat_lower'] < record['yhat'] < record['yhat_upper'] for record in records)
+    monkeypatch.setattr(forecasting, 'predict_records', None)
+    assert cache.forecast(model, start, 24) == records
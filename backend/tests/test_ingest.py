@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as server
+
+
+def sensor_rows(hours=72, zones=4, seed=0):
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range('2024-01-01', periods=hours, freq='h').repeat(zones)
+    categories = np.array(['Dairy', 'Frozen', 'Bakery', 'Drinks'])
+    return pd.DataFrame({
+        'timestamp': timestamps.astype(str),
+        'zone_id': np.tile(['Z%d' % (i + 1) for i in range(zones)], hours),
+        'footfall': rng.integers(10, 100, len(timestamps)),
+        'zone_temp': rng.normal(20, 3, len(timestamps)).round(1),
+        'sales_volume': rng.integers(100, 3000, len(timestamps)),
+        'phase': np.where(timestamps.hour < 12, 'morning', 'evening'),
+        'product_category': categories[rng.integers(0, len(categories), len(timestamps))],
+        'day_of_week': timestamps.day_name(),
+    })
+
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+
+def test_ingest_rejects_rows_missing_analysis_columns(client):
+    response = client.post('/ingest?store_id=partial', json={'rows': [
+        {'timestamp': '2024-01-01 10:00', 'zone_id': 'Z1', 'footfall': 70},
+    ]})
+    assert response.status_code == 400
+    assert 'phase' in response.get_json()['error']
+
+
+def test_ingest_then_predict_from_store(client):
+    rows = sensor_rows()
+    response = client.post('/ingest?store_id=roundtrip', json={'rows': rows.to_dict(orient='records')})
+    assert response.status_code == 200
+    assert response.get_json()['appended_rows'] == len(rows)
+
+    response = client.post('/predict', data={'store_id': 'roundtrip', 'source': 'store'})
+    assert response.status_code == 200, response.get_json()
+    result = response.get_json()
+    assert {zone['zone'] for zone in result['zone_summary']} == {'Z1', 'Z2', 'Z3', 'Z4'}
+    assert len(result['prophet_forecast']) == 168
@@ -0,0 +1,57 @@
+import io
+import time
+
+import pytest
+
+import app as server
+from instrumentation import DeadlineExceeded, MetricsRegistry, StageRecorder, server_timing
+
+
+def test_stage_recorder_times_each_stage_until_the_next():
+    recorder = StageRecorder()
+    recorder('parse')
+    time.sleep(0.01)
+    recorder('features')
+    recorder.annotate(rows=10)
+    summary = recorder.summary()
+    assert list(summary['stages']) == ['parse', 'features']
+    assert summary['stages']['parse']['wall_ms'] >= 10
+    assert summary['input'] == {'rows': 10}
+    assert server_timing(summary).startswith('parse;dur=')
+    assert server_timing(summary).endswith('total;dur=%.1f' % summary['total_ms'])
+
+
+def test_deadline_is_checked_as_a_stage_starts():
+    recorder = StageRecorder(deadline=0.01)
+    recorder('parse')
+    time.sleep(0.02)
+    with pytest.raises(DeadlineExceeded, match='features'):
+        recorder('features')
+
+
+def test_metrics_render_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests', ['path'])
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1))
+    requests.inc(path='/a "b"')
+    requests.inc(2, path='/a "b"')
+    latency.observe(0.5)
+    text = registry.render()
+    assert 'requests_total{path="/a \\"b\\""} 3.0' in text
+    assert 'latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{le="1.0"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 1' in text
+    assert 'latency_seconds_count 1' in text
+
+
+def test_predict_reports_timings_and_metrics(sample_csv):
+    client = server.app.test_client()
+    # A trailing newline keeps the upload out of other tests' cache entries
+    response = client.post('/predict?timings=1', data={'file': (io.BytesIO(sample_csv + b'\n'), 'm.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert 'parse' in response.get_json()['timings']['stages']
+    assert 'total;dur=' in response.headers['Server-Timing']
+    metrics = client.get('/metrics')
+    assert metrics.mimetype == 'text/plain'
+    assert 'innoaisle_stage_duration_seconds_count{stage="parse"}' in metrics.get_data(as_text=True)
@@ -0,0 +1,72 @@
+import io
+import os
+import runpy
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import app as server
+import footfall_engines
+import forecasting
+from jobs import FAILED, SUCCEEDED, JobManager
+
+
+def add(a, b, progress=None):
+    progress('add')
+    return {'sum': a + b}
+
+
+def crash(progress=None):
+    os._exit(1)
+
+
+def wait_for(manager, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job['status'] in (SUCCEEDED, FAILED):
+            return job
+        time.sleep(0.05)
+    raise AssertionError('job %s did not finish' % job_id)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return JobManager(max_workers=1, state_dir=str(tmp_path))
+
+
+def test_job_runs_in_worker_and_reports_result(manager):
+    job = wait_for(manager, manager.submit(add, (1, 2)))
+    assert job['status'] == SUCCEEDED
+    assert job['result'] == {'sum': 3}
+
+
+def test_pool_is_replaced_after_a_worker_dies(manager):
+    assert wait_for(manager, manager.submit(crash, ()))['status'] == FAILED
+    assert wait_for(manager, manager.submit(add, (2, 2)))['result'] == {'sum': 4}
+
+
+def test_submit_validates_input(sample_csv):
+    client = server.app.test_client()
+    assert client.post('/jobs/predict').status_code == 400
+    response = client.post('/jobs/predict?engine=bogus', data={'file': (io.BytesIO(sample_csv), 's.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+
+
+def test_post_fork_gives_each_worker_its_share_of_the_cores(monkeypatch):
+    for name in ('INNOAISLE_BATCH_WORKERS', 'INNOAISLE_JOB_WORKERS', 'INNOAISLE_MODEL_JOBS'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('INNOAISLE_ENV', 'development')
+    monkeypatch.setattr(os, 'cpu_count', lambda: 16)
+    monkeypatch.setattr(server, 'BATCH_WORKERS', server.BATCH_WORKERS)
+    monkeypatch.setattr(server.job_manager, 'max_workers', server.job_manager.max_workers)
+    monkeypatch.setattr(footfall_engines, 'MODEL_JOBS', footfall_engines.MODEL_JOBS)
+    monkeypatch.setattr(forecasting, '_zone_executor', forecasting._zone_executor)
+    config = runpy.run_path(os.path.join(os.path.dirname(server.__file__), 'gunicorn.conf.py'))
+    config['post_fork'](SimpleNamespace(num_workers=8), None)
+    assert server.BATCH_WORKERS == 2
+    assert server.job_manager.max_workers == 2
+    assert footfall_engines.MODEL_JOBS == 2
+    assert forecasting._zone_executor == (server.batch_executor, 2)
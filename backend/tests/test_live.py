@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+import app as server
+from live import LiveHub, parse_readings
+
+
+def readings(zone, *footfalls):
+    return parse_readings([{'zone_id': zone, 'footfall': value, 'zone_temp': 20, 'sales_volume': 5}
+                           for value in footfalls])
+
+
+def zones(snapshot):
+    return {zone['zone']: zone for zone in snapshot['zones']}
+
+
+def test_readings_reach_every_hub_sharing_the_log(tmp_path):
+    writer, reader = LiveHub(window=4, state_dir=str(tmp_path)), LiveHub(window=4, state_dir=str(tmp_path))
+    assert reader.snapshot('s1') is None
+    event = writer.add('s1', readings('Z1', 70, 80) + readings('Z2', 10))
+    assert event['seq'] == 1 and event['readings'] == 3
+    assert [e['seq'] for e in reader.events_after('s1', 0, 1)] == [1]
+    reader.add('s1', readings('Z1', 50))
+    assert writer.events_after('s1', 1, 1)[0]['zones'][0]['readings'] == 3
+    assert zones(writer.snapshot('s1')) == zones(reader.snapshot('s1'))
+    assert reader.events_after('s1', 2, 0) == []
+
+
+def test_log_is_compacted_to_the_retained_readings(tmp_path):
+    hub = LiveHub(window=3, state_dir=str(tmp_path))
+    for value in range(40):
+        hub.add('s1', readings('Z1', value) + readings('Z2', 100 - value))
+    with open(os.path.join(str(tmp_path), 's1.jsonl'), 'rb') as f:
+        assert len(f.readlines()) < 13
+    # A process starting now replays the compacted log into the same windows
+    fresh = LiveHub(window=3, state_dir=str(tmp_path))
+    assert fresh.snapshot('s1') == hub.snapshot('s1')
+    assert zones(fresh.snapshot('s1'))['Z1']['footfall'] == pytest.approx(38)
+    assert fresh.snapshot('s1')['seq'] == 40
+
+
+def test_partial_line_of_a_dead_writer_is_dropped(tmp_path):
+    hub = LiveHub(window=4, state_dir=str(tmp_path))
+    hub.add('s1', readings('Z1', 10))
+    with open(os.path.join(str(tmp_path), 's1.jsonl'), 'ab') as f:
+        f.write(b'{"seq": 2, "readi')
+    assert hub.snapshot('s1')['seq'] == 1
+    assert hub.add('s1', readings('Z1', 30))['seq'] == 2
+    assert LiveHub(window=4, state_dir=str(tmp_path)).snapshot('s1') == hub.snapshot('s1')
+
+
+def test_streams_beyond_the_limit_get_503(monkeypatch):
+    monkeypatch.setattr(server.live_hub, 'max_streams', 1)
+    assert server.live_hub.open_stream()
+    try:
+        response = server.app.test_client().get('/live/s1/events')
+        assert response.status_code == 503
+        assert response.headers['Retry-After']
+    finally:
+        server.live_hub.close_stream()
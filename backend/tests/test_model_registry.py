@@ -0,0 +1,34 @@
+import io
+
+import pytest
+
+import app as server
+from model_registry import validate_store_id
+
+
+def predict(client, csv, **params):
+    response = client.post('/predict', data=dict(params, file=(io.BytesIO(csv), 'store.csv')),
+                           content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_train_score_and_update_versions(sample_csv):
+    client = server.app.test_client()
+    trained = predict(client, sample_csv, store_id='registry-a')
+    assert trained['model']['version'] == 1
+
+    scored = predict(client, sample_csv, store_id='registry-a', mode='score')
+    assert scored['model']['version'] == 1
+    assert scored['rmse'] is not None
+
+    updated = predict(client, sample_csv, store_id='registry-a', mode='update')
+    assert updated['model']['version'] == 2
+    assert server.model_registry.versions('registry-a') == [1, 2]
+    assert server.model_registry.metadata('registry-a')['updated_from'] == 1
+
+
+@pytest.mark.parametrize('store_id', ['', '../other', '.hidden', 'a/b'])
+def test_store_ids_cannot_escape_the_registry(store_id):
+    with pytest.raises(ValueError):
+        validate_store_id(store_id)
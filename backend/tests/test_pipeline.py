@@ -0,0 +1,29 @@
+import io
+
+import app as server
+from analysis import OUTPUTS, PIPELINE, analyze, load_csv, required_stages
+from conftest import SAMPLE_CSV
+
+
+def test_required_stages_pull_in_dependencies_in_pipeline_order():
+    assert required_stages(['heat_zone_summary']) == ['features', 'footfall_model', 'heat_zones']
+    assert required_stages(['layout_moves']) == ['aggregates', 'blueprint', 'rearrangement', 'layout_moves']
+    assert set(required_stages(OUTPUTS)) == set(PIPELINE)
+
+
+def test_unrequested_stages_are_never_run():
+    stages = []
+    result, models = analyze(load_csv(SAMPLE_CSV), progress=stages.append, outputs=['blueprint_layout', 'layout_moves'])
+    assert set(result) == {'timestamp', 'blueprint_layout', 'layout_moves'}
+    assert 'random_forest' not in stages and 'prophet' not in stages
+    assert models == {}
+
+
+def test_predict_fields_run_only_their_stages(sample_csv):
+    response = server.app.test_client().post(
+        '/predict?fields=heat_zone_summary,timings&timings=1', data={'file': (io.BytesIO(sample_csv + b'\n\n'), 'p.csv')},
+        content_type='multipart/form-data')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert list(body) == ['heat_zone_summary', 'timings']
+    assert 'random_forest' in body['timings']['stages'] and 'prophet' not in body['timings']['stages']
@@ -0,0 +1,52 @@
+import gzip
+import io
+import json
+
+import msgpack
+import numpy as np
+import pytest
+
+import app as server
+from response_encoding import columnar, encode, records_to_columns, select_fields
+
+
+def test_select_fields_keeps_the_named_keys_in_order():
+    payload = {'a': 1, 'b': 2, 'c': 3}
+    assert select_fields(payload, 'c, a') == {'c': 3, 'a': 1}
+    assert select_fields(payload, None) is payload
+    with pytest.raises(ValueError, match='Unknown fields: d'):
+        select_fields(payload, 'a,d')
+
+
+def test_columnar_turns_records_and_layout_maps_into_columns():
+    assert records_to_columns([{'a': 1, 'b': 2}, {'a': 3}]) == {'a': [1, 3], 'b': [2, None]}
+    shaped = columnar({'rows': [{'zone': 'Z1', 'n': 1}], 'blueprint_layout': {'Z1': {'x': 0}, 'Z2': {'x': 5}},
+                       'rmse': 1.5, 'empty': []})
+    assert shaped == {'rows': {'zone': ['Z1'], 'n': [1]}, 'blueprint_layout': {'x': [0, 5]}, 'rmse': 1.5, 'empty': []}
+
+
+def test_encode_handles_numpy_scalars():
+    payload = {'count': np.int64(3), 'mean': np.float32(0.5)}
+    assert json.loads(encode(payload, 'json')) == {'count': 3, 'mean': 0.5}
+    assert msgpack.unpackb(encode(payload, 'msgpack')) == {'count': 3, 'mean': 0.5}
+
+
+def test_predict_honours_fields_orient_format_and_compression(sample_csv):
+    client = server.app.test_client()
+
+    def predict(query, **headers):
+        return client.post('/predict' + query, data={'file': (io.BytesIO(sample_csv), 'e.csv')},
+                           content_type='multipart/form-data', headers=headers)
+
+    response = predict('?fields=heat_zone_summary,cache_hit&orient=columns')
+    body = response.get_json()
+    assert list(body) == ['heat_zone_summary', 'cache_hit']
+    assert isinstance(body['heat_zone_summary']['zone'], list)
+
+    response = predict('?format=msgpack', **{'Accept-Encoding': 'gzip'})
+    assert response.mimetype == 'application/msgpack'
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'prophet_forecast' in msgpack.unpackb(gzip.decompress(response.get_data()))
+
+    assert predict('?fields=nope').status_code == 400
+    assert predict('?orient=rows').status_code == 400
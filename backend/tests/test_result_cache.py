@@ -0,0 +1,39 @@
+import os
+
+from result_cache import ResultCache, content_key
+
+
+def test_content_key_depends_on_data_and_params():
+    key = content_key(b'a,b\n1,2\n', {'engine': 'random_forest'})
+    assert key == content_key(b'a,b\n1,2\n', {'engine': 'random_forest'})
+    assert key != content_key(b'a,b\n1,3\n', {'engine': 'random_forest'})
+    assert key != content_key(b'a,b\n1,2\n', {'engine': 'hist_gradient_boosting'})
+
+
+def test_get_or_compute_hits_after_first_call():
+    cache = ResultCache(memory_items=4)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'value': 42}
+
+    key = content_key(b'data')
+    assert cache.get_or_compute(key, compute) == ({'value': 42}, False)
+    assert cache.get_or_compute(key, compute) == ({'value': 42}, True)
+    assert len(calls) == 1
+
+
+def test_disk_entries_are_shared_between_instances(tmp_path):
+    key = content_key(b'data')
+    ResultCache(disk_dir=str(tmp_path)).get_or_compute(key, lambda: {'value': 1})
+    value, hit = ResultCache(disk_dir=str(tmp_path)).get_or_compute(key, lambda: {'value': 2})
+    assert (value, hit) == ({'value': 1}, True)
+
+
+def test_eviction_reaps_lock_files(tmp_path):
+    cache = ResultCache(disk_dir=str(tmp_path), disk_max_bytes=0)
+    for i in range(5):
+        cache.get_or_compute(content_key(b'%d' % i), lambda: {'value': 'x' * 100})
+    # Only the last key's lock was held while its put evicted the others
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.lock')]) <= 1
@@ -0,0 +1,52 @@
+import io
+
+import pytest
+
+import app as server
+
+
+@pytest.fixture
+def client(sample_csv):
+    client = server.app.test_client()
+    if not server.model_registry.versions('sim-store'):
+        response = client.post('/predict?store_id=sim-store', data={'file': (io.BytesIO(sample_csv), 's.csv')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+    return client
+
+
+def simulate(client, candidates, store_id='sim-store'):
+    return client.post('/simulate?store_id=' + store_id, json={'candidates': candidates})
+
+
+def test_candidates_are_scored_against_the_baseline(client):
+    response = simulate(client, [
+        {'name': 'same', 'moves': [{'from_zone': 'Z1', 'to_zone': 'Z3'}, {'from_zone': 'Z3', 'to_zone': 'Z1'}]},
+        {'name': 'swap', 'moves': [{'from_zone': 'Z1', 'to_zone': 'Z3'}]},
+        {'layout': {'Z2': 'Electronics'}},
+    ])
+    assert response.status_code == 200
+    body = response.get_json()
+    same, swap, relabel = body['candidates']
+    assert same['changed_zones'] == [] and same['energy_change'] == 0
+    assert same['simulated_energy_usage'] == body['baseline']['simulated_energy_usage']
+    assert [zone['zone'] for zone in swap['changed_zones']] == ['Z1', 'Z3']
+    assert swap['changed_zones'][0]['products_from'] == 'Z3'
+    assert relabel['name'] == 'candidate-2'
+    assert relabel['changed_zones'][0]['product_category'] == 'Electronics'
+    assert body['model']['version'] == 1
+
+
+def test_repeated_candidates_give_the_same_totals(client):
+    candidate = {'moves': [{'from_zone': 'Z2', 'to_zone': 'Z4'}]}
+    first = simulate(client, [candidate]).get_json()['candidates'][0]
+    again = simulate(client, [candidate, candidate]).get_json()['candidates']
+    assert again[0]['simulated_energy_usage'] == again[1]['simulated_energy_usage'] == first['simulated_energy_usage']
+
+
+def test_invalid_candidates_and_unknown_stores(client):
+    assert simulate(client, []).status_code == 400
+    response = simulate(client, [{'moves': [{'from_zone': 'Z1', 'to_zone': 'Z99'}]}])
+    assert response.status_code == 400 and 'Z99' in response.get_json()['error']
+    assert simulate(client, [{'layout': {'Z1': 'Spaceships'}}]).status_code == 400
+    assert simulate(client, [{}], store_id='no-such-store').status_code == 404
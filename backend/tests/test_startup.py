@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+import app as server
+
+
+def test_app_import_leaves_the_model_libraries_unloaded(tmp_path):
+    env = dict(os.environ, INNOAISLE_WARMUP='0', INNOAISLE_CACHE_DIR=str(tmp_path))
+    code = "import sys, app; print(sorted(m for m in ('prophet', 'sklearn', 'scipy') if m in sys.modules))"
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(server.__file__), env=env,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip().splitlines()[-1] == '[]'
+
+
+def test_readyz_follows_the_warm_up(monkeypatch):
+    client = server.app.test_client()
+    assert client.get('/healthz').get_json()['status'] == 'ok'
+    assert client.get('/readyz').get_json() == {'status': 'ready', 'warmed': False}
+
+    monkeypatch.setattr(server, 'WARMUP', True)
+    monkeypatch.setattr(server, 'readiness', {'state': 'cold', 'phases': {}, 'error': None})
+    assert client.get('/readyz').status_code == 503
+    monkeypatch.setattr(server, 'warm_up', lambda: {'import_sklearn': 0.5})
+    server._run_warmup()
+    response = client.get('/readyz')
+    assert response.status_code == 200
+    assert response.get_json()['phases'] == {'import_sklearn': 0.5}
+
+
+def test_failed_warm_up_is_reported(monkeypatch):
+    monkeypatch.setattr(server, 'WARMUP', True)
+    monkeypatch.setattr(server, 'readiness', {'state': 'cold', 'phases': {}, 'error': None})
+
+    def fail():
+        raise ImportError('no prophet')
+
+    monkeypatch.setattr(server, 'warm_up', fail)
+    server._run_warmup()
+    response = server.app.test_client().get('/readyz')
+    assert response.status_code == 503
+    assert response.get_json() == {'status': 'failed', 'error': 'no prophet'}
@@ -0,0 +1,31 @@
+import io
+import os
+import sys
+
+import pandas as pd
+
+from analysis import REQUIRED_COLUMNS, check_columns, load_csv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from synthetic import category_names, generate, generate_csv  # noqa: E402
+
+
+def test_generated_rows_follow_the_upload_schema():
+    df = generate(500, zones=5, days=3, categories=15)
+    assert len(df) == 500
+    assert set(REQUIRED_COLUMNS) <= set(df.columns)
+    assert set(df['zone_id']) <= {'Z%d' % (i + 1) for i in range(5)}
+    assert category_names(15)[-3:] == ['Category 1', 'Category 2', 'Category 3']
+    assert set(df['product_category']) <= set(category_names(15))
+    assert df['timestamp'].is_monotonic_increasing
+    assert set(df['phase']) <= {'morning', 'afternoon', 'evening'}
+    assert (df['footfall'] >= 0).all()
+
+
+def test_csv_is_deterministic_and_parses_like_an_upload():
+    data = generate_csv(200, seed=3)
+    assert data == generate_csv(200, seed=3)
+    assert data != generate_csv(200, seed=4)
+    df = check_columns(load_csv(io.BytesIO(data)))
+    assert len(df) == 200
+    assert pd.api.types.is_datetime64_any_dtype(df['timestamp'])
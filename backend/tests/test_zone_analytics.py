@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from zone_analytics import assign_targets, detailed_zone_suggestions, lowest_traffic_target, rearrangement_suggestions
+
+
+def test_lowest_traffic_target_skips_the_zone_itself():
+    traffic = np.array([50.0, 10.0, 30.0, np.nan])
+    eligible = np.array([True, True, True, True])
+    # The lowest zone points at the runner-up; zones without traffic are never targets
+    assert lowest_traffic_target(traffic, eligible).tolist() == [1, 2, 1, 1]
+    assert lowest_traffic_target(traffic, np.zeros(4, dtype=bool)).tolist() == [-1, -1, -1, -1]
+
+
+def test_detailed_suggestions_follow_the_cooling_and_relocation_rules():
+    zones = ['Z1', 'Z2', 'Z3', 'Z4', 'Z5']
+    zone_traffic = pd.DataFrame({'zone': zones, 'traffic_score': [45.0, 35.0, 60.0, 20.0, 10.0],
+                                 'proximity_penalty': [90.0, 70.0, 0.0, 0.0, 0.0]})
+    suggestions = {s['zone']: s for s in detailed_zone_suggestions(zones, zone_traffic, ['Z1', 'Z2'])}
+    assert suggestions['Z1']['suggestion'].startswith('Increase cooling')
+    assert suggestions['Z1']['penalty'] == 90.0
+    assert suggestions['Z2']['suggestion'].startswith('Monitor cooling')
+    assert 'Zone Z5' in suggestions['Z3']['suggestion']
+    assert suggestions['Z3']['penalty'] == 50.0
+    assert suggestions['Z4']['suggestion'] == 'No adjustment needed.'
+
+
+def test_assign_targets_with_more_sources_than_targets():
+    traffic = np.array([80.0, 75.0, 70.0, 20.0, 10.0])
+    eligible = np.array([False, False, False, True, True])
+    target = assign_targets(traffic, np.array([0, 1, 2]), eligible)
+    assert sorted(target[target >= 0]) == [3, 4]
+    assert (target == -1).sum() == 1
+
+
+def test_rearrangement_reports_unassigned_zones_separately():
+    zone_traffic = pd.DataFrame({'zone': ['Z1', 'Z2', 'Z3', 'Z4'], 'traffic_score': [80.0, 75.0, 70.0, 20.0],
+                                 'proximity_penalty': [10.0, 10.0, 10.0, 0.0]})
+    products = {zone: ['Dairy'] for zone in zone_traffic['zone']}
+    moves, unassigned = rearrangement_suggestions(zone_traffic, products, ['Z1', 'Z2'])
+    assert len(moves) == 2 and len(unassigned) == 1
+    assert all(move['to_zone'] is not None and move['type'] != 'unassigned' for move in moves)
+    assert len({move['to_zone'] for move in moves}) == 2
+    assert sorted(m['from_zone'] for m in moves + unassigned) == ['Z1', 'Z2', 'Z3']
+    assert set(unassigned[0]) == {'from_zone', 'current_traffic', 'penalty', 'product'}
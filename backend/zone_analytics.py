@@ -0,0 +1,186 @@
+"""
+Vectorised per-zone analytics: globally assigned rearrangement moves and detailed cooling/layout suggestions
+"""
+
+import numpy as np
+import pandas as pd
+
+TRAFFIC_IMPACT_FACTOR = 0.2
+MAX_SAFE_TRAFFIC = 70
+MAX_CAPACITY = 80
+BASE_TEMP = 22.0
+ADJACENCY_ZONES = ['Z3', 'Z4']
+
+# Rearrangement assignment costs per move: going over the safe limit or the
+# capacity outweighs any traffic difference, and blueprint distance (per
+# layout unit) only separates targets with similar traffic. Over-capacity
+# moves are penalised rather than forbidden, so they are still suggested
+# (as 'exceeds_capacity') when no better target is left.
+SAFE_LIMIT_COST = 1e3
+CAPACITY_COST = 1e6
+DISTANCE_COST = 0.01
+_FORBIDDEN = 1e12
+
+
+def lowest_traffic_target(traffic, eligible):
+    """For each zone position, the position of the lowest-traffic eligible zone other than itself.
+
+    Only the overall minimum and the runner-up are needed, so this is O(zones)
+    instead of a scan per zone. Ties resolve to the first position (like
+    Series.idxmin); -1 marks zones with no eligible target.
+    """
+    n = len(traffic)
+    scores = np.where(eligible & ~np.isnan(traffic), traffic, np.inf)
+    if n == 0 or not np.isfinite(scores.min()):
+        return np.full(n, -1)
+    best = int(np.argmin(scores))
+    scores[best] = np.inf
+    second = int(np.argmin(scores))
+    target = np.full(n, best)
+    target[best] = second if np.isfinite(scores[second]) else -1
+    return target
+
+
+def _move_type(new_target_traffic):
+    # Written as negated <= so NaN traffic is classified like the original comparisons
+    return np.select(
+        [~(new_target_traffic <= MAX_CAPACITY), ~(new_target_traffic <= MAX_SAFE_TRAFFIC)],
+        ['exceeds_capacity', 'warning'],
+        'safe',
+    )
+
+
+def assignment_costs(source_traffic, target_traffic, distance=None):
+    """Cost matrix (sources x targets) of moving each source zone's items to each target zone.
+
+    A move costs the target's new traffic, plus SAFE_LIMIT_COST per unit
+    above MAX_SAFE_TRAFFIC, plus a flat CAPACITY_COST when it goes over
+    MAX_CAPACITY, plus DISTANCE_COST per unit of blueprint distance.
+    """
+    new_target_traffic = target_traffic[None, :] + source_traffic[:, None] * TRAFFIC_IMPACT_FACTOR
+    cost = (new_target_traffic
+            + SAFE_LIMIT_COST * np.maximum(new_target_traffic - MAX_SAFE_TRAFFIC, 0)
+            + CAPACITY_COST * (new_target_traffic > MAX_CAPACITY))
+    if distance is not None:
+        cost = cost + DISTANCE_COST * np.nan_to_num(distance)
+    return cost
+
+
+def assign_targets(traffic, sources, eligible, positions=None):
+    """Distinct target position for each source position (-1 if none), at minimum total cost.
+
+    Solves the whole assignment at once (scipy's linear_sum_assignment), so
+    no two sources are sent to the same zone. With more sources than
+    eligible targets the costliest moves are left unassigned. `positions`
+    (zones x 2, NaN where unknown) adds blueprint distance to the cost.
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    target = np.full(len(sources), -1)
+    candidates = np.flatnonzero(eligible & ~np.isnan(traffic))
+    if len(sources) == 0 or len(candidates) == 0:
+        return target
+    distance = None
+    if positions is not None:
+        offsets = positions[sources][:, None, :] - positions[candidates][None, :, :]
+        distance = np.sqrt((offsets ** 2).sum(axis=2))
+    cost = assignment_costs(np.nan_to_num(traffic[sources]), traffic[candidates], distance)
+    cost[sources[:, None] == candidates[None, :]] = _FORBIDDEN
+    rows, cols = linear_sum_assignment(cost)
+    assigned = cost[rows, cols] < _FORBIDDEN
+    target[rows[assigned]] = candidates[cols[assigned]]
+    return target
+
+
+def rearrangement_suggestions(zone_traffic, zone_products, refrigeration_zones, positions=None):
+    """Move every penalised zone to its own non-refrigeration zone, assigned globally.
+
+    `positions` optionally maps zone -> (x, y) blueprint centre. Returns
+    (moves, unassigned): penalised zones left without a target (more of them
+    than eligible zones) are listed separately in `unassigned`.
+    """
+    zones = zone_traffic['zone'].to_numpy()
+    traffic = zone_traffic['traffic_score'].to_numpy(dtype=float)
+    penalty = zone_traffic['proximity_penalty'].to_numpy()
+    eligible = ~zone_traffic['zone'].isin(refrigeration_zones).to_numpy()
+
+    sources = np.flatnonzero(penalty > 0)
+    coordinates = None
+    if positions is not None:
+        coordinates = np.array([positions.get(zone, (np.nan, np.nan)) for zone in zones], dtype=float).reshape(-1, 2)
+    target = assign_targets(traffic, sources, eligible, coordinates)
+    rows, targets = sources[target >= 0], target[target >= 0]
+    new_target_traffic = traffic[targets] + traffic[rows] * TRAFFIC_IMPACT_FACTOR
+    moves = pd.DataFrame({
+        'from_zone': zones[rows],
+        'to_zone': zones[targets],
+        'current_traffic': traffic[rows],
+        'target_traffic': traffic[targets],
+        'new_target_traffic': new_target_traffic,
+        'penalty': penalty[rows],
+        'product': [zone_products[zone][0] for zone in zones[rows]],
+        'type': _move_type(new_target_traffic),
+    }).to_dict('records')
+    unassigned = [{
+        'from_zone': zones[row],
+        'current_traffic': traffic[row].item(),
+        'penalty': penalty[row].item(),
+        'product': zone_products[zones[row]][0],
+    } for row in sources[target < 0]]
+    return moves, unassigned
+
+
+def detailed_zone_suggestions(zones, zone_traffic, refrigeration_zones):
+    """Cooling/relocation advice for every zone, in zone order"""
+    ordered = sorted(zones)
+    lookup = zone_traffic.set_index('zone')['traffic_score']
+    traffic = lookup.reindex(ordered, fill_value=0).to_numpy(dtype=float)
+    is_refrigeration = np.isin(ordered, refrigeration_zones)
+    is_adjacent = np.isin(ordered, ADJACENCY_ZONES)
+
+    adjacency_factor = np.where(is_adjacent & (traffic > 50), 50, 0)
+    penalty = np.where(is_refrigeration & (traffic > 30), traffic * 2, adjacency_factor)
+
+    # Relocation targets are searched in the zones' original order, among
+    # non-refrigeration zones that have a traffic score
+    candidate_traffic = lookup.reindex(zones).to_numpy(dtype=float)
+    candidate_ok = ~np.isin(zones, refrigeration_zones)
+    target = lowest_traffic_target(candidate_traffic, candidate_ok)
+    position = {zone: i for i, zone in enumerate(zones)}
+    other_candidates = candidate_ok.sum() - candidate_ok[[position[zone] for zone in ordered]]
+
+    relocate = ~is_refrigeration & is_adjacent & (traffic > 50)
+    ordered_target = target[[position[zone] for zone in ordered]]
+    target_traffic = np.where(ordered_target >= 0, candidate_traffic[ordered_target], np.nan)
+    new_target_traffic = target_traffic + traffic * TRAFFIC_IMPACT_FACTOR
+    move_type = _move_type(new_target_traffic)
+
+    suggestions = []
+    for i, zone in enumerate(ordered):
+        if is_refrigeration[i] and traffic[i] > 40:
+            adj_temp = BASE_TEMP - 2
+            suggestion = f"Increase cooling: Adjust temperature from {BASE_TEMP:.1f}°C to {adj_temp:.1f}°C."
+        elif is_refrigeration[i] and traffic[i] > 30:
+            suggestion = "Monitor cooling; consider adjustment if footfall exceeds 40."
+        elif relocate[i]:
+            if other_candidates[i] == 0:
+                suggestion = "No available zones for relocation."
+            elif ordered_target[i] < 0:
+                suggestion = "No suitable target zone found."
+            else:
+                target_zone = zones[ordered_target[i]]
+                if move_type[i] == 'safe':
+                    suggestion = f"Suggest relocating high-traffic items to Zone {target_zone} (Current Traffic: {target_traffic[i]:.2f}, New Traffic: {new_target_traffic[i]:.2f}). Recommend redistributing items to balance traffic across zones."
+                elif move_type[i] == 'warning':
+                    suggestion = f"Warning: Moving to Zone {target_zone} (Current Traffic: {target_traffic[i]:.2f}, New Traffic: {new_target_traffic[i]:.2f}) exceeds safe limit ({MAX_SAFE_TRAFFIC}) but within capacity ({MAX_CAPACITY}). Consider partial move or redistribute items with monitoring."
+                else:
+                    suggestion = f"No suitable zone found. New traffic ({new_target_traffic[i]:.2f}) exceeds capacity ({MAX_CAPACITY}). Suggest partial redistribution to balance traffic."
+        else:
+            suggestion = "No adjustment needed."
+        suggestions.append({
+            "zone": zone,
+            "predicted_footfall": float(traffic[i]),
+            "penalty": float(penalty[i]),
+            "suggestion": suggestion
+        })
+    return suggestions
@@ -1,4 +1,4 @@
-import { useState, useCallback } from 'react';
+import { useState, useCallback, useEffect } from 'react';
 import { DataProcessor, ProcessedZoneData, ProcessedMetrics, MLInsights } from '@/lib/dataProcessor';
 import { LayoutSuggestion, RearrangementSuggestion } from '@/components/EnergyOptimizer';
 
@@ -45,8 +45,27 @@ export interface StoreMetrics {
 
 export interface DataIntegrationOptions {
   dataSource?: 'api' | 'file' | 'simulation';
+  // With dataSource 'api', subscribe to this store's live sensor readings
+  storeId?: string;
 }
 
+interface LiveZoneSummary {
+  zone: string;
+  readings: number;
+  footfall: number;
+  zone_temp: number;
+  sales_volume: number;
+  heat_zone_probability: number;
+  cooling_energy: number;
+  cooling_active: boolean;
+}
+
+const mergeBySummaryZone = <T extends { zone: string }>(prev: T[], updates: T[]): T[] => {
+  const merged = new Map(prev.map(item => [item.zone, item]));
+  updates.forEach(item => merged.set(item.zone, item));
+  return Array.from(merged.values());
+};
+
 interface UseRealTimeDataReturn {
   zones: ZoneData[];
   metrics: StoreMetrics | null;
@@ -74,6 +93,7 @@ interface UseRealTimeDataReturn {
 export const useRealTimeData = (options: DataIntegrationOptions = {}): UseRealTimeDataReturn => {
   const {
     dataSource = 'file',
+    storeId,
   } = options;
 
   const [dataProcessor] = useState(() => new DataProcessor());
@@ -97,6 +117,62 @@ export const useRealTimeData = (options: DataIntegrationOptions = {}): UseRealTi
   const [layoutMoves, setLayoutMoves] = useState<any[]>([]);
 
 
+  // Live sensor stream: the backend pushes per-zone window summaries over Server-Sent Events
+  useEffect(() => {
+    if (dataSource !== 'api' || !storeId) {
+      return;
+    }
+    const source = new EventSource(`http://localhost:5000/live/${encodeURIComponent(storeId)}/events`);
+    const applyLive = (event: MessageEvent) => {
+      const summaries: LiveZoneSummary[] = JSON.parse(event.data).zones || [];
+      if (summaries.length === 0) {
+        return;
+      }
+      const now = new Date();
+      setZones(prev => {
+        const byId = new Map(prev.map(zone => [zone.id, zone]));
+        summaries.forEach(live => {
+          const zone = byId.get(live.zone);
+          byId.set(live.zone, {
+            ...(zone || {
+              id: live.zone,
+              name: live.zone,
+              x: 0,
+              y: 0,
+              width: 100,
+              height: 80,
+              products: [],
+              isRefrigeration: false,
+            }),
+            footfall: Math.round(live.footfall),
+            temperature: live.zone_temp,
+            heatProduction: Math.round(live.footfall * 15),
+            energyConsumption: Math.round(live.cooling_energy),
+            heatZoneProbability: live.heat_zone_probability,
+            coolingEnergy: live.cooling_energy,
+            lastUpdated: now,
+          } as ZoneData);
+        });
+        return Array.from(byId.values());
+      });
+      setHeatZoneSummary(prev => mergeBySummaryZone(prev, summaries.map(live => ({
+        zone: live.zone,
+        heat_zone_probability: live.heat_zone_probability,
+      }))));
+      setCoolingSummary(prev => mergeBySummaryZone(prev, summaries.map(live => ({
+        zone: live.zone,
+        cooling_energy: live.cooling_energy,
+      }))));
+      setLastUpdate(now);
+    };
+    source.addEventListener('snapshot', applyLive);
+    source.addEventListener('update', applyLive);
+    source.onopen = () => setIsConnected(true);
+    // EventSource reconnects by itself; report the gap meanwhile
+    source.onerror = () => setIsConnected(false);
+    return () => source.close();
+  }, [dataSource, storeId]);
+
   const updateZoneData = useCallback((zoneId: string, data: Partial<ZoneData>) => {
     setZones(prev => prev.map(zone => 
       zone.id === zoneId 
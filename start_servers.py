@@ -3,13 +3,22 @@
 Script to start both the Flask backend and React frontend servers
 """
 
+import argparse
+import json
 import subprocess
 import sys
 import time
 import os
+import urllib.error
+import urllib.request
 from pathlib import Path
 
-def check_dependencies():
+BACKEND_URL = "http://localhost:5000"
+# Seconds to wait for the backend to report ready; importing Prophet and sklearn
+# can take a while on slow disks
+BACKEND_READY_TIMEOUT = float(os.environ.get("INNOAISLE_READY_TIMEOUT", 120))
+
+def check_dependencies(mode="development"):
     """Check if required dependencies are installed"""
     print("Checking dependencies...")
     
@@ -31,6 +40,14 @@ def check_dependencies():
         print(f"✗ Missing Python package: {e}")
         print("Please run: cd backend && pip install -r requirements.txt")
         return False
+
+    if mode == "production":
+        try:
+            import gunicorn
+            print("✓ gunicorn is installed")
+        except ImportError:
+            print("✗ Production mode needs gunicorn (Linux/macOS): cd backend && pip install -r requirements.txt")
+            return False
     
     return True
 
@@ -43,39 +60,77 @@ def install_frontend_dependencies():
     else:
         print("✓ Frontend dependencies already installed")
 
-def start_backend():
-    """Start the Flask backend server"""
-    print("Starting Flask backend server...")
+def start_backend(mode="development", workers=None):
+    """Start the Flask backend server: the debug server in development, gunicorn in production"""
+    print(f"Starting Flask backend server ({mode} mode)...")
     backend_dir = Path("backend")
     if not backend_dir.exists():
         print("✗ Backend directory not found")
         return None
     
     try:
-        # Start Flask server
-        backend_process = subprocess.Popen(
-            [sys.executable, "app.py"],
-            cwd=backend_dir,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        # Wait a moment for server to start
-        time.sleep(3)
-        
-        if backend_process.poll() is None:
-            print("✓ Flask backend server started on http://localhost:5000")
-            return backend_process
+        env = dict(os.environ, INNOAISLE_ENV=mode)
+        if mode == "production":
+            # Pre-forked workers; see backend/gunicorn.conf.py for the settings
+            command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+            if workers:
+                env["INNOAISLE_WORKERS"] = str(workers)
         else:
-            stdout, stderr = backend_process.communicate()
-            print(f"✗ Failed to start backend: {stderr}")
-            return None
-            
+            command = [sys.executable, "app.py"]
+
+        # Start Flask server; its output (including startup timings) goes to this terminal
+        started = time.monotonic()
+        # In production gunicorn gets its own session, so Ctrl+C here does not hit it
+        # with SIGINT (immediate shutdown); main() sends SIGTERM for a graceful stop
+        backend_process = subprocess.Popen(command, cwd=backend_dir, env=env,
+                                           start_new_session=(mode == "production"))
+
+        if wait_for_backend(backend_process, started):
+            print(f"✓ Flask backend server ready on {BACKEND_URL} ({time.monotonic() - started:.1f}s)")
+            return backend_process
+        if backend_process.poll() is None:
+            backend_process.terminate()
+        print("✗ Failed to start backend")
+        return None
+
     except Exception as e:
         print(f"✗ Error starting backend: {e}")
         return None
 
+def _get_json(path):
+    """GET a backend endpoint; returns (status, body) or None if nothing is listening yet"""
+    try:
+        with urllib.request.urlopen(BACKEND_URL + path, timeout=2) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        try:
+            return e.code, json.load(e)
+        except ValueError:
+            return e.code, {}
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+
+def wait_for_backend(backend_process, started):
+    """Poll /healthz until the server answers, then /readyz until the models are warm"""
+    alive = False
+    while time.monotonic() - started < BACKEND_READY_TIMEOUT:
+        if backend_process.poll() is not None:
+            return False
+        if not alive:
+            alive = _get_json("/healthz") is not None
+            if alive:
+                print(f"  backend accepting requests after {time.monotonic() - started:.1f}s, warming up models...")
+        if alive:
+            ready = _get_json("/readyz")
+            if ready is not None and ready[0] == 200:
+                return True
+            if ready is not None and ready[1].get("status") == "failed":
+                print(f"✗ Backend warm-up failed: {ready[1].get('error')}")
+                return False
+        time.sleep(0.5)
+    print(f"✗ Backend not ready after {BACKEND_READY_TIMEOUT:.0f}s")
+    return False
+
 def start_frontend():
     """Start the React frontend server"""
     print("Starting React frontend server...")
@@ -104,20 +159,31 @@ def start_frontend():
         print(f"✗ Error starting frontend: {e}")
         return None
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Start the InnoAisle backend and frontend servers")
+    parser.add_argument("--mode", choices=["development", "production"],
+                        default=os.environ.get("INNOAISLE_ENV", "development"),
+                        help="development: Flask debug server with auto-reload; "
+                             "production: gunicorn with pre-forked workers (default: $INNOAISLE_ENV or development)")
+    parser.add_argument("--workers", type=int,
+                        help="backend worker processes in production mode (default: $INNOAISLE_WORKERS or CPU count)")
+    return parser.parse_args()
+
 def main():
     """Main function to start both servers"""
+    args = parse_args()
     print("🚀 Starting InnoAisle - Walmart Store Intelligence Platform")
     print("=" * 60)
     
     # Check dependencies
-    if not check_dependencies():
+    if not check_dependencies(args.mode):
         sys.exit(1)
     
     # Install frontend dependencies if needed
     install_frontend_dependencies()
     
     # Start backend
-    backend_process = start_backend()
+    backend_process = start_backend(args.mode, args.workers)
     if not backend_process:
         sys.exit(1)
     
@@ -155,6 +221,11 @@ def main():
         print("\n🛑 Stopping servers...")
         backend_process.terminate()
         frontend_process.terminate()
+        try:
+            # Let in-flight requests finish (gunicorn's graceful_timeout)
+            backend_process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            backend_process.kill()
         print("✓ Servers stopped")
 
 if __name__ == "__main__":